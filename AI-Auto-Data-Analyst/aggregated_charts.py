@@ -0,0 +1,594 @@
+"""
+Aggregated charts with bounded rendering cost.
+
+Plotting raw rows scales with the dataset: a 10M-point scatter or line chart
+takes minutes to rasterize. The builders here reduce the data first, in one
+vectorized pass, to a fixed number of marks:
+
+- line charts: LTTB (largest triangle three buckets) after a min/max
+  preselection, or plain min/max decimation, keeping peaks and dips;
+- scatter plots: the raw points when there are few, otherwise a binned 2-D
+  density grid (datashader-style rasterization);
+- bar charts, histograms and box plots: group aggregates.
+
+Each builder returns an ``AggregatedChart`` holding only the reduced data,
+which renders as an interactive Altair chart in the browser or as a
+matplotlib Figure. The plot agent exposes the builders to generated code as
+``charts``.
+"""
+
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+if TYPE_CHECKING:
+    from matplotlib.figure import Figure
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_POINTS = 2_000
+# Upper bound on marks sent to the browser; also Altair's default row limit.
+MAX_POINTS_LIMIT = 5_000
+# LTTB runs on this many min/max-preselected points per output point.
+MINMAX_PRESELECT_RATIO = 4
+DEFAULT_GRID_BINS = 64
+DEFAULT_HIST_BINS = 50
+DEFAULT_TOP_N = 20
+MAX_SERIES = 10
+FIGSIZE = (8, 4.5)
+
+AGGREGATIONS = ("sum", "mean", "median", "min", "max", "count")
+
+
+# ---------------------------------------------------------------------------
+# Reduction kernels
+# ---------------------------------------------------------------------------
+
+
+def minmax_indices(y: np.ndarray, n_buckets: int) -> np.ndarray:
+    """
+    Indices of the minimum and maximum of ``y`` in each of ``n_buckets``
+    equal-count buckets, plus the first and last point.
+
+    Args:
+        y: Values without NaN, in x order.
+        n_buckets: Number of buckets (about two points are kept per bucket).
+
+    Returns:
+        Sorted, unique indices into ``y``.
+    """
+    n = len(y)
+    if n_buckets <= 0 or 2 * n_buckets + 2 >= n:
+        return np.arange(n)
+    size = n // n_buckets
+    usable = size * n_buckets
+    blocks = y[:usable].reshape(n_buckets, size)
+    offsets = np.arange(n_buckets) * size
+    parts = [offsets + blocks.argmin(axis=1), offsets + blocks.argmax(axis=1), [0, n - 1]]
+    if usable < n:
+        tail = y[usable:]
+        parts.append([usable + int(tail.argmin()), usable + int(tail.argmax())])
+    return np.unique(np.concatenate(parts).astype(np.int64))
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+
+    Keeps the first and last point and, from each bucket in between, the
+    point forming the largest triangle with the previously kept point and
+    the average of the next bucket.
+
+    Args:
+        x: Increasing x values (float).
+        y: Values without NaN (float).
+        n_out: Number of points to keep.
+
+    Returns:
+        Sorted indices into ``x`` / ``y``.
+    """
+    n = len(x)
+    if n_out >= n or n <= 2:
+        return np.arange(n)
+    if n_out < 3:
+        return np.array([0, n - 1])
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_hi = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[hi:next_hi].mean()
+        avg_y = y[hi:next_hi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(area.argmax())
+        out[i + 1] = a
+    return out
+
+
+def decimate_indices(
+    x: np.ndarray,
+    y: np.ndarray,
+    max_points: int,
+    method: str = "lttb",
+) -> np.ndarray:
+    """
+    Choose at most about ``max_points`` indices of a series.
+
+    Args:
+        x: Increasing x values (float).
+        y: Values without NaN (float).
+        max_points: Target number of points.
+        method: "lttb" (visually faithful) or "minmax" (keeps every
+            bucket's extremes).
+
+    Returns:
+        Sorted indices.
+    """
+    n = len(y)
+    if n <= max_points:
+        return np.arange(n)
+    if method == "minmax":
+        # Two points per bucket plus the endpoints and a remainder bucket.
+        return minmax_indices(y, max((max_points - 4) // 2, 1))
+    if method != "lttb":
+        raise ValueError(f"Unknown decimation method {method!r}; use 'lttb' or 'minmax'.")
+    # MinMaxLTTB: preselecting extremes keeps LTTB's Python loop short on
+    # long series while preserving the points it would pick.
+    if n > MINMAX_PRESELECT_RATIO * max_points:
+        pre = minmax_indices(y, MINMAX_PRESELECT_RATIO * max_points // 2)
+        return pre[lttb_indices(x[pre], y[pre], max_points)]
+    return lttb_indices(x, y, max_points)
+
+
+def _as_float(series: pd.Series) -> np.ndarray:
+    """
+    Numeric view of a numeric or datetime column (datetimes as ns).
+
+    Raises:
+        ValueError: If the column holds values that are neither numbers nor
+            dates, which would otherwise all be dropped as missing.
+    """
+    if pd.api.types.is_datetime64_any_dtype(series):
+        values = series.to_numpy(dtype="datetime64[ns]").astype(np.int64).astype(np.float64)
+        values[series.isna().to_numpy()] = np.nan
+        return values
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype(series.cat.categories.dtype)
+    values = pd.to_numeric(series, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+    lost = np.isnan(values) & series.notna().to_numpy()
+    if lost.any():
+        example = series[lost].iloc[0]
+        raise ValueError(
+            f"Column {series.name!r} ({series.dtype}) is not numeric or datetime "
+            f"(e.g. {example!r}); use charts.bar for categorical columns."
+        )
+    return values
+
+
+def density_grid(
+    x: np.ndarray,
+    y: np.ndarray,
+    bins: int = DEFAULT_GRID_BINS,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Bin points into a ``bins`` × ``bins`` count grid (NaNs ignored).
+
+    Returns:
+        Tuple of (counts[x_bin, y_bin], x_edges, y_edges).
+    """
+    mask = np.isfinite(x) & np.isfinite(y)
+    x, y = x[mask], y[mask]
+    if not len(x):
+        return np.zeros((bins, bins)), np.linspace(0, 1, bins + 1), np.linspace(0, 1, bins + 1)
+    x_range = (x.min(), x.max()) if x.max() > x.min() else (x.min() - 0.5, x.max() + 0.5)
+    y_range = (y.min(), y.max()) if y.max() > y.min() else (y.min() - 0.5, y.max() + 0.5)
+    return np.histogram2d(x, y, bins=bins, range=[x_range, y_range])
+
+
+# ---------------------------------------------------------------------------
+# Chart container
+# ---------------------------------------------------------------------------
+
+
+def _vega_type(series: pd.Series) -> str:
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return "temporal"
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return "quantitative"
+    return "nominal"
+
+
+@dataclass
+class AggregatedChart:
+    """
+    A chart reduced to a bounded number of marks.
+
+    ``data`` uses fixed column names per kind ("x", "y", "series", bin
+    bounds, box statistics); ``labels`` holds the axis titles. Instances are
+    small and picklable, so they also travel back from sandbox workers.
+    """
+
+    kind: str
+    data: pd.DataFrame
+    labels: Dict[str, str] = field(default_factory=dict)
+    types: Dict[str, str] = field(default_factory=dict)
+    title: str | None = None
+    rows_in: int = 0
+    method: str = "raw"
+    meta: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def marks(self) -> int:
+        """Number of rows (points, cells, bars) that are drawn."""
+        return len(self.data)
+
+    def caption(self) -> str:
+        """One line describing how the data was reduced."""
+        if self.method == "raw":
+            return f"{self.marks:,} points, not reduced."
+        return f"{self.rows_in:,} rows reduced to {self.marks:,} marks ({self.method})."
+
+    def to_altair(self) -> Any:
+        """Interactive Altair chart (zoom/pan and tooltips where sensible)."""
+        import altair as alt
+
+        x_title = self.labels.get("x", "x")
+        y_title = self.labels.get("y", "y")
+        base = alt.Chart(self.data)
+        if self.title:
+            base = base.properties(title=self.title)
+
+        if self.kind in ("line", "points"):
+            if self.kind == "line":
+                mark = base.mark_line()
+            else:
+                mark = base.mark_circle(size=12, opacity=0.5)
+            encoding = {
+                "x": alt.X("x", type=self.types.get("x", "quantitative"), title=x_title),
+                "y": alt.Y("y", type="quantitative", title=y_title),
+                "tooltip": ["x", "y"],
+            }
+            if "series" in self.data:
+                encoding["color"] = alt.Color("series:N", title=self.labels.get("series"))
+                encoding["tooltip"] = ["series", "x", "y"]
+            return mark.encode(**encoding).interactive()
+
+        if self.kind == "density":
+            return base.mark_rect().encode(
+                x=alt.X("x_start:Q", title=x_title),
+                x2="x_end:Q",
+                y=alt.Y("y_start:Q", title=y_title),
+                y2="y_end:Q",
+                color=alt.Color("count:Q", scale=alt.Scale(type="log"), title="rows"),
+                tooltip=["x_start", "x_end", "y_start", "y_end", "count"],
+            ).interactive()
+
+        if self.kind == "bar":
+            return base.mark_bar().encode(
+                x=alt.X("x:N", sort="-y", title=x_title),
+                y=alt.Y("y:Q", title=y_title),
+                tooltip=["x", "y"],
+            )
+
+        if self.kind == "histogram":
+            return base.mark_bar().encode(
+                x=alt.X("bin_start:Q", title=x_title),
+                x2="bin_end:Q",
+                y=alt.Y("count:Q", title="count"),
+                tooltip=["bin_start", "bin_end", "count"],
+            )
+
+        if self.kind == "box":
+            x = alt.X("x:N", title=self.labels.get("x", ""))
+            whiskers = base.mark_rule().encode(
+                x=x, y=alt.Y("whislo:Q", title=y_title), y2="whishi:Q"
+            )
+            boxes = base.mark_bar(size=24).encode(
+                x=x, y="q1:Q", y2="q3:Q", tooltip=["x", "q1", "med", "q3", "whislo", "whishi"]
+            )
+            medians = base.mark_tick(color="white", size=24).encode(x=x, y="med:Q")
+            return alt.layer(whiskers, boxes, medians)
+
+        raise ValueError(f"Unknown chart kind {self.kind!r}.")
+
+    def to_figure(self) -> Figure:
+        """Static matplotlib rendering of the reduced data."""
+        from matplotlib.colors import LogNorm
+        from matplotlib.figure import Figure
+
+        fig = Figure(figsize=FIGSIZE)
+        ax = fig.subplots()
+        data = self.data
+
+        if self.kind in ("line", "points"):
+            groups = data.groupby("series", sort=False) if "series" in data else [(None, data)]
+            for name, part in groups:
+                if self.kind == "line":
+                    ax.plot(part["x"], part["y"], linewidth=1, label=name)
+                else:
+                    ax.scatter(part["x"], part["y"], s=4, alpha=0.5, label=name)
+            if "series" in data:
+                ax.legend(title=self.labels.get("series"), fontsize="small")
+        elif self.kind == "density":
+            x_edges, y_edges = np.asarray(self.meta["x_edges"]), np.asarray(self.meta["y_edges"])
+            grid = np.zeros((len(x_edges) - 1, len(y_edges) - 1))
+            grid[data["x_bin"].to_numpy(), data["y_bin"].to_numpy()] = data["count"].to_numpy()
+            masked = np.ma.masked_equal(grid.T, 0)
+            mesh = ax.pcolormesh(x_edges, y_edges, masked, norm=LogNorm(), cmap="viridis")
+            fig.colorbar(mesh, ax=ax, label="rows")
+        elif self.kind == "bar":
+            ax.bar(data["x"].astype(str), data["y"])
+            ax.tick_params(axis="x", labelrotation=45)
+        elif self.kind == "histogram":
+            widths = data["bin_end"] - data["bin_start"]
+            ax.bar(data["bin_start"], data["count"], width=widths, align="edge")
+        elif self.kind == "box":
+            stats = [
+                {
+                    "label": str(row.x),
+                    "q1": row.q1,
+                    "med": row.med,
+                    "q3": row.q3,
+                    "whislo": row.whislo,
+                    "whishi": row.whishi,
+                    "fliers": [],
+                }
+                for row in data.itertuples()
+            ]
+            ax.bxp(stats, showfliers=False)
+        else:
+            raise ValueError(f"Unknown chart kind {self.kind!r}.")
+
+        ax.set_xlabel(self.labels.get("x", ""))
+        ax.set_ylabel(self.labels.get("y", "count" if self.kind == "histogram" else ""))
+        if self.title:
+            ax.set_title(self.title)
+        fig.tight_layout()
+        return fig
+
+
+# ---------------------------------------------------------------------------
+# Builders
+# ---------------------------------------------------------------------------
+
+
+def _cap(max_points: int) -> int:
+    return int(min(max(max_points, 10), MAX_POINTS_LIMIT))
+
+
+def _top_groups(df: pd.DataFrame, column: str, limit: int) -> List[Any]:
+    return df[column].value_counts(dropna=True).index[:limit].tolist()
+
+
+def _decimated_frame(
+    x_values: pd.Series,
+    y_values: pd.Series,
+    max_points: int,
+    method: str,
+) -> Tuple[pd.DataFrame, str]:
+    """Sort by x, drop NaNs and reduce one series to ``max_points``."""
+    xf, yf = _as_float(x_values), _as_float(y_values)
+    mask = np.isfinite(xf) & np.isfinite(yf)
+    positions = np.flatnonzero(mask)
+    xf, yf = xf[mask], yf[mask]
+    if len(xf) > 1 and not np.all(xf[1:] >= xf[:-1]):
+        order = np.argsort(xf, kind="stable")
+        positions, xf, yf = positions[order], xf[order], yf[order]
+    keep = decimate_indices(xf, yf, max_points, method)
+    rows = positions[keep]
+    frame = pd.DataFrame({"x": x_values.iloc[rows].to_numpy(), "y": yf[keep]})
+    return frame, method if len(keep) < len(xf) else "raw"
+
+
+class ChartBuilder:
+    """
+    Chart builders available to generated plot code as ``charts``.
+
+    Every method aggregates or downsamples first, so drawing cost does not
+    depend on the number of rows.
+    """
+
+    def line(
+        self,
+        df: pd.DataFrame,
+        x: str,
+        y: str,
+        color: str | None = None,
+        max_points: int = DEFAULT_MAX_POINTS,
+        method: str = "lttb",
+        title: str | None = None,
+    ) -> AggregatedChart:
+        """
+        Line chart of ``y`` over ``x`` (sorted by x), downsampled with LTTB
+        or min/max decimation; ``color`` draws one line per group (the
+        largest MAX_SERIES groups).
+
+        Raises:
+            ValueError: If ``x`` or ``y`` is neither numeric nor datetime.
+        """
+        max_points = _cap(max_points)
+        labels = {"x": str(x), "y": str(y)}
+        if color is None:
+            data, used = _decimated_frame(df[x], df[y], max_points, method)
+        else:
+            groups = _top_groups(df, color, MAX_SERIES)
+            per_series = max(max_points // max(len(groups), 1), 10)
+            parts = []
+            used = "raw"
+            subset = df[df[color].isin(groups)]
+            for group, part in subset.groupby(color, observed=True, sort=False):
+                frame, reduced = _decimated_frame(part[x], part[y], per_series, method)
+                parts.append(frame.assign(series=str(group)))
+                used = reduced if reduced != "raw" else used
+            data = (
+                pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=["x", "y"])
+            )
+            labels["series"] = str(color)
+        return AggregatedChart(
+            "line",
+            data,
+            labels=labels,
+            types={"x": _vega_type(df[x])},
+            title=title,
+            rows_in=len(df),
+            method=used,
+        )
+
+    def scatter(
+        self,
+        df: pd.DataFrame,
+        x: str,
+        y: str,
+        color: str | None = None,
+        max_points: int = DEFAULT_MAX_POINTS,
+        bins: int = DEFAULT_GRID_BINS,
+        title: str | None = None,
+    ) -> AggregatedChart:
+        """
+        Scatter plot of ``y`` against ``x``. Up to ``max_points`` rows are
+        drawn as points; beyond that the plot becomes a density grid of
+        ``bins`` × ``bins`` cells coloured by row count (``color`` is then
+        ignored).
+        """
+        max_points = _cap(max_points)
+        labels = {"x": str(x), "y": str(y)}
+        if len(df) <= max_points:
+            columns = {"x": df[x].to_numpy(), "y": df[y].to_numpy()}
+            if color is not None:
+                columns["series"] = df[color].astype(str).to_numpy()
+                labels["series"] = str(color)
+            data = pd.DataFrame(columns).dropna(subset=["x", "y"])
+            return AggregatedChart(
+                "points",
+                data,
+                labels=labels,
+                types={"x": _vega_type(df[x])},
+                title=title,
+                rows_in=len(df),
+            )
+
+        bins = int(min(max(bins, 4), int(MAX_POINTS_LIMIT**0.5)))
+        counts, x_edges, y_edges = density_grid(_as_float(df[x]), _as_float(df[y]), bins)
+        x_bin, y_bin = np.nonzero(counts)
+        data = pd.DataFrame(
+            {
+                "x_bin": x_bin,
+                "y_bin": y_bin,
+                "x_start": x_edges[x_bin],
+                "x_end": x_edges[x_bin + 1],
+                "y_start": y_edges[y_bin],
+                "y_end": y_edges[y_bin + 1],
+                "count": counts[x_bin, y_bin].astype(np.int64),
+            }
+        )
+        return AggregatedChart(
+            "density",
+            data,
+            labels=labels,
+            title=title,
+            rows_in=len(df),
+            method=f"{bins}x{bins} density grid",
+            meta={"x_edges": x_edges.tolist(), "y_edges": y_edges.tolist()},
+        )
+
+    def bar(
+        self,
+        df: pd.DataFrame,
+        x: str,
+        y: str | None = None,
+        agg: str = "sum",
+        top_n: int = DEFAULT_TOP_N,
+        title: str | None = None,
+    ) -> AggregatedChart:
+        """
+        Bar chart of ``agg`` of ``y`` per ``x`` value (row counts when ``y``
+        is None), limited to the ``top_n`` largest bars.
+        """
+        if agg not in AGGREGATIONS:
+            raise ValueError(f"Unknown aggregation {agg!r}; use one of {AGGREGATIONS}.")
+        grouped = df.groupby(x, observed=True, dropna=True)
+        values = grouped.size() if y is None or agg == "count" else grouped[y].agg(agg)
+        values = values.sort_values(ascending=False).head(min(max(top_n, 1), MAX_POINTS_LIMIT))
+        data = pd.DataFrame({"x": values.index.astype(str), "y": values.to_numpy()})
+        counted = y is None or agg == "count"
+        return AggregatedChart(
+            "bar",
+            data,
+            labels={"x": str(x), "y": "count" if counted else f"{agg}({y})"},
+            title=title,
+            rows_in=len(df),
+            method="group count" if counted else f"group {agg}",
+        )
+
+    def histogram(
+        self,
+        df: pd.DataFrame,
+        column: str,
+        bins: int = DEFAULT_HIST_BINS,
+        title: str | None = None,
+    ) -> AggregatedChart:
+        """Histogram of a numeric column with ``bins`` equal-width bins."""
+        values = _as_float(df[column])
+        values = values[np.isfinite(values)]
+        counts, edges = np.histogram(values, bins=int(min(max(bins, 1), MAX_POINTS_LIMIT)))
+        data = pd.DataFrame({"bin_start": edges[:-1], "bin_end": edges[1:], "count": counts})
+        return AggregatedChart(
+            "histogram",
+            data,
+            labels={"x": str(column), "y": "count"},
+            title=title,
+            rows_in=len(df),
+            method=f"{len(counts)} bins",
+        )
+
+    def box(
+        self,
+        df: pd.DataFrame,
+        y: str,
+        by: str | None = None,
+        top_n: int = DEFAULT_TOP_N,
+        title: str | None = None,
+    ) -> AggregatedChart:
+        """
+        Box plot of ``y`` (quartiles, 1.5 IQR whiskers, no fliers), one box
+        per ``by`` value for the ``top_n`` most frequent values.
+        """
+        if by is None:
+            groups = [(str(y), pd.to_numeric(df[y], errors="coerce"))]
+        else:
+            keep = _top_groups(df, by, min(max(top_n, 1), MAX_SERIES * 5))
+            subset = df[df[by].isin(keep)]
+            groups = [
+                (str(name), pd.to_numeric(part, errors="coerce"))
+                for name, part in subset.groupby(by, observed=True)[y]
+            ]
+
+        rows = []
+        for name, values in groups:
+            values = values.dropna()
+            if values.empty:
+                continue
+            q1, med, q3 = values.quantile([0.25, 0.5, 0.75]).to_numpy()
+            iqr = q3 - q1
+            lo = values[values >= q1 - 1.5 * iqr].min()
+            hi = values[values <= q3 + 1.5 * iqr].max()
+            rows.append({"x": name, "q1": q1, "med": med, "q3": q3, "whislo": lo, "whishi": hi})
+        return AggregatedChart(
+            "box",
+            pd.DataFrame(rows, columns=["x", "q1", "med", "q3", "whislo", "whishi"]),
+            labels={"x": str(by) if by is not None else "", "y": str(y)},
+            title=title,
+            rows_in=len(df),
+            method="box statistics",
+        )
+
+
+charts = ChartBuilder()
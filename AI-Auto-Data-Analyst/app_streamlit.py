@@ -5,23 +5,37 @@ Streamlit frontend for the Auto Analyst project.
 from __future__ import annotations
 
 import logging
+import uuid
 
 import pandas as pd
 import streamlit as st
-from matplotlib.figure import Figure  # for isinstance checks
 
-from config import settings
-from pipeline.data_ingestion import infer_column_types
+from config import get_settings
+from pipeline.aggregated_charts import AggregatedChart
+from pipeline.cache import ResultCache, hash_bytes
+from pipeline.correlation import compute_correlations
+from pipeline.data_ingestion import infer_column_types, load_csv, optimize_dtypes
+from pipeline.dataset_store import DatasetStore
+from pipeline.llm_cache import CachedModel, LLMResponseCache, schema_fingerprint
+from pipeline.llm_client import LLMClient, dispatch
+from pipeline.llm_model import get_gemini_model
+from pipeline.memory_governor import configure_governor
 from pipeline.profiling import build_summary
+from pipeline.render_scheduler import prerender
+from pipeline.sandbox import SandboxExecutor, create_executor
+from pipeline.sql_engine import select_engine
+from pipeline.summary_encoder import encode_summary
+from pipeline.tracing import get_tracer, span
 from pipeline.visualization import (
-    create_histograms,
-    create_boxplots,
-    create_correlation_heatmap,
-    create_categorical_bars,
+    LazyFigure,
+    lazy_histograms,
+    lazy_boxplots,
+    lazy_correlation_heatmap,
+    lazy_categorical_bars,
 )
-from pipeline.llm_insights import init_gemini, generate_insights
-from pipeline.qa_agent import init_qa_model, run_data_query
-from pipeline.plot_agent import init_plot_model, run_plot_query  # NEW
+from pipeline.llm_insights import stream_insights
+from pipeline.qa_agent import run_data_query
+from pipeline.plot_agent import run_plot_query  # NEW
 
 
 # ---------------- Logging ----------------
@@ -44,37 +58,134 @@ st.markdown(
     "answer questions about your dataset."
 )
 
-# Initialize models lazily (only when needed)
-_gemini_insights_model = None
-_gemini_qa_model = None
-_gemini_plot_model = None  # NEW
-
-
-def get_insights_model():
-    global _gemini_insights_model
-    if _gemini_insights_model is None:
-        _gemini_insights_model = init_gemini(settings)
-    return _gemini_insights_model
-
-
-def get_qa_model():
-    global _gemini_qa_model
-    if _gemini_qa_model is None:
-        _gemini_qa_model = init_qa_model(settings)
-    return _gemini_qa_model
-
-
-def get_plot_model():
-    """Lazy init for the visualization Gemini model."""
-    global _gemini_plot_model
-    if _gemini_plot_model is None:
-        _gemini_plot_model = init_plot_model(settings)
-    return _gemini_plot_model
+settings = get_settings()
+
+
+@st.cache_resource
+def get_model():
+    """
+    The one Gemini model shared by insights, Q&A and charts across sessions.
+    The SDK is imported on the first AI request, not at startup.
+    """
+    return get_gemini_model(settings)
+
+
+@st.cache_resource
+def get_result_cache() -> ResultCache:
+    """Process-wide cache of pipeline results keyed by upload content hash."""
+    return ResultCache(max_bytes=settings.cache_max_mb * 1024 * 1024)
+
+
+@st.cache_resource
+def get_dataset_store() -> DatasetStore | None:
+    """Parsed uploads, stored once per content hash and shared by all sessions."""
+    if not settings.dataset_store_dir:
+        return None
+    return DatasetStore(
+        settings.dataset_store_dir, max_bytes=settings.dataset_store_max_mb * 1024 * 1024
+    )
+
+
+@st.cache_resource
+def get_llm_cache() -> LLMResponseCache | None:
+    """Persistent cache of model responses shared by all sessions."""
+    if not settings.llm_cache_path:
+        return None
+    ttl_hours = settings.llm_cache_ttl_hours
+    return LLMResponseCache(
+        settings.llm_cache_path,
+        max_bytes=settings.llm_cache_max_mb * 1024 * 1024,
+        ttl_seconds=ttl_hours * 3600 if ttl_hours is not None else None,
+    )
+
+
+@st.cache_resource
+def get_sandbox() -> SandboxExecutor | None:
+    """Pre-warmed worker processes that run generated code under limits."""
+    if settings.sandbox_workers <= 0:
+        return None
+    return create_executor(
+        workers=settings.sandbox_workers,
+        timeout=settings.sandbox_timeout_seconds,
+        memory_limit_mb=settings.sandbox_memory_limit_mb,
+    )
+
+
+def with_llm_cache(model):
+    """Serve repeat prompts about this dataset's schema from the LLM cache."""
+    llm_cache = get_llm_cache()
+    if llm_cache is None:
+        return model
+    return CachedModel(model, llm_cache, fingerprint=schema_fingerprint(df))
+
+
+def make_client(model) -> LLMClient:
+    """Cached model behind timeouts, retries and streaming."""
+    return LLMClient(
+        with_llm_cache(model),
+        timeout=settings.llm_timeout_seconds,
+        max_retries=settings.llm_max_retries,
+    )
+
+
+def get_upload_digest(uploaded) -> str:
+    """Hash the upload once per file and remember it across reruns."""
+    file_key = getattr(uploaded, "file_id", None) or f"{uploaded.name}:{uploaded.size}"
+    digests = st.session_state.setdefault("upload_digests", {})
+    if file_key not in digests:
+        digests[file_key] = hash_bytes(uploaded.getvalue())
+    return digests[file_key]
+
+
+# Charts drawn up front per section; the rest are rendered on request.
+DEFAULT_VISIBLE_CHARTS = 6
+
+
+def show_lazy_figures(
+    figures: dict[str, LazyFigure], stage: str, key: str, default_count: int
+) -> None:
+    """
+    Render only the charts the user selected, as cached PNG bytes, then
+    re-account the cached ``stage`` entry for the PNGs it now holds.
+    """
+    selected = st.multiselect(
+        "Columns to plot",
+        options=list(figures),
+        default=list(figures)[:default_count],
+        key=key,
+    )
+    pending = [figures[col] for col in selected if not figures[col].rendered]
+    with span("charts.render", section=key, charts=len(selected), rendered=len(pending)):
+        if len(pending) > 1 and settings.render_workers != 1:
+            with st.spinner(f"Rendering {len(pending)} charts..."):
+                prerender(df, pending, max_workers=settings.render_workers)
+        for col in selected:
+            st.image(figures[col].png(df), use_container_width=True)
+    if pending:
+        result_cache.resize(digest, stage)
 
 
 # ---------------- Sidebar ----------------
 st.sidebar.header("Settings")
 st.sidebar.write(f"Model: `{settings.gemini_model_name}`")
+if not settings.llm_configured:
+    st.sidebar.warning(
+        "GEMINI_API_KEY is not set: profiling and charts work, "
+        "AI insights, questions and chart generation are disabled."
+    )
+cache_stats = get_result_cache().stats()
+st.sidebar.caption(
+    f"Result cache: {cache_stats['entries']} entries, "
+    f"{cache_stats['bytes'] / 1e6:.1f} / {cache_stats['max_bytes'] / 1e6:.0f} MB"
+)
+get_tracer().enabled = settings.tracing_enabled
+show_debug = settings.tracing_enabled and st.sidebar.toggle("Show debug panel", key="debug_panel")
+if get_llm_cache() is not None:
+    llm_stats = get_llm_cache().stats()
+    st.sidebar.caption(
+        f"LLM cache: {llm_stats['entries']} responses, "
+        f"{llm_stats['hits']} hits / {llm_stats['misses']} misses"
+    )
 
 uploaded_file = st.file_uploader("Upload a CSV file", type=["csv"])
 
@@ -82,66 +193,163 @@ if not uploaded_file:
     st.info("👆 Upload a CSV file to begin.")
     st.stop()
 
+result_cache = get_result_cache()
+digest = get_upload_digest(uploaded_file)
+
+
+def cached_stage(stage: str, compute, **attrs):
+    """Run a cached pipeline stage inside a trace span that records cache hits."""
+    with span(f"stage.{stage}", **attrs) as current:
+        current.set(cache_hit=(digest, stage) in result_cache)
+        return result_cache.get_or_compute(digest, stage, compute)
+
+
 # ---------------- Load Data ----------------
+def load_optimized_frame():
+    def ingest():
+        with span("ingest.read_csv", upload_bytes=uploaded_file.size) as current:
+            raw_df = load_csv(uploaded_file, memory_limit_mb=settings.ingest_memory_limit_mb)
+            current.set(rows=len(raw_df), cols=raw_df.shape[1])
+        with span("ingest.optimize_dtypes", rows=len(raw_df), cols=raw_df.shape[1]):
+            return optimize_dtypes(raw_df)
+
+    # Parse each distinct upload once; later loads memory-map the stored copy.
+    store = get_dataset_store()
+    if store is None:
+        return ingest()
+    return store.get_or_ingest(digest, ingest)
+
+
 try:
-    df = pd.read_csv(uploaded_file)
+    df, dtype_report = cached_stage("frame", load_optimized_frame)
 except Exception as exc:  # noqa: BLE001
     st.error(f"Failed to read CSV: {exc}")
     st.stop()
 
+# Sessions on the same upload share the frame above; keep everything derived
+# from all sessions' datasets within the global memory budget.
+session_id = st.session_state.setdefault("session_id", uuid.uuid4().hex)
+governor = configure_governor(
+    result_cache,
+    budget_bytes=settings.memory_budget_mb * 1024 * 1024,
+    session_ttl=settings.session_idle_minutes * 60,
+)
+governor.touch(session_id, digest)
+governor.enforce()
+
 st.subheader("📄 Dataset Preview")
 st.dataframe(df.head(), use_container_width=True)
 
-numeric_cols, categorical_cols = infer_column_types(df)
+if dtype_report:
+    saved_mb = sum(item["bytes_saved"] for item in dtype_report.values()) / 1e6
+    with st.expander(f"Memory optimization ({saved_mb:.1f} MB saved)"):
+        st.dataframe(
+            pd.DataFrame.from_dict(dtype_report, orient="index"),
+            use_container_width=True,
+        )
+
+frame_shape = {"rows": len(df), "cols": df.shape[1]}
+numeric_cols, categorical_cols = cached_stage(
+    "column_types", lambda: infer_column_types(df), **frame_shape
+)
 
 # ---------------- Summary ----------------
 st.subheader("📊 Dataset Summary")
-summary = build_summary(df)
+summary = cached_stage("summary", lambda: build_summary(df), **frame_shape)
 st.json(summary)
 
 # ---------------- Auto Visualizations ----------------
 st.subheader("📈 Auto Visualizations")
 
-hist_figs = create_histograms(df, numeric_cols)
-box_figs = create_boxplots(df, numeric_cols)
-corr_fig = create_correlation_heatmap(df, numeric_cols)
-cat_figs = create_categorical_bars(df, categorical_cols)
+def get_correlations():
+    """Correlation result shared by the heatmap and the insights prompt."""
+    return cached_stage(
+        "correlations",
+        lambda: compute_correlations(df, numeric_cols),
+        rows=len(df),
+        cols=len(numeric_cols),
+    )
+
+
+# Lazy handles are cheap to build; each chart is drawn the first time it is
+# shown and its PNG bytes are reused on every later rerun. The handles do not
+# hold the frame, so evicting "frame" really frees it.
+hist_figs = cached_stage("histograms", lambda: lazy_histograms(numeric_cols))
+box_figs = cached_stage("boxplots", lambda: lazy_boxplots(numeric_cols))
+cat_figs = cached_stage("categorical_bars", lambda: lazy_categorical_bars(categorical_cols))
 
 with st.expander("Numeric Distributions (Histograms)", expanded=True):
     if hist_figs:
-        for col, fig in hist_figs.items():
-            st.pyplot(fig, use_container_width=True)
+        show_lazy_figures(hist_figs, "histograms", "hist_cols", DEFAULT_VISIBLE_CHARTS)
     else:
         st.write("No numeric columns available.")
 
 with st.expander("Outliers (Boxplots)"):
     if box_figs:
-        for col, fig in box_figs.items():
-            st.pyplot(fig, use_container_width=True)
+        show_lazy_figures(box_figs, "boxplots", "box_cols", 0)
     else:
         st.write("No numeric columns available.")
 
 with st.expander("Correlation Heatmap"):
-    if corr_fig:
-        st.pyplot(corr_fig, use_container_width=True)
+    if len(numeric_cols) >= 2:
+        if st.toggle("Show correlation heatmap", key="show_corr"):
+            correlations = get_correlations()
+            corr_fig = cached_stage(
+                "correlation_heatmap",
+                lambda: lazy_correlation_heatmap(numeric_cols, correlations=correlations),
+            )
+            drawn = not corr_fig.rendered
+            with span(
+                "charts.render",
+                section="correlation_heatmap",
+                charts=1,
+                rendered=int(drawn),
+            ):
+                st.image(corr_fig.png(df), use_container_width=True)
+            if drawn:
+                result_cache.resize(digest, "correlation_heatmap")
+            if correlations is not None:
+                st.markdown("**Strongest correlations**")
+                st.dataframe(correlations.top_pairs_dict(), use_container_width=True)
     else:
         st.write("Not enough numeric columns to compute correlations.")
 
 with st.expander("Categorical Distributions (Bar Charts)"):
     if cat_figs:
-        for col, fig in cat_figs.items():
-            st.pyplot(fig, use_container_width=True)
+        show_lazy_figures(cat_figs, "categorical_bars", "cat_cols", 0)
     else:
         st.write("No categorical columns available.")
 
 # ---------------- AI Insights ----------------
 st.subheader("🧠 AI-Generated Insights")
 
-if st.button("Generate AI Insights"):
-    with st.spinner("Asking Gemini for insights..."):
-        model = get_insights_model()
-        insights_text = generate_insights(model, summary)
-        st.markdown(insights_text)
+def get_insights_summary():
+    """Dataset summary plus the strongest correlations, for the insights prompt."""
+    correlations = get_correlations() if len(numeric_cols) >= 2 else None
+    insights_summary = dict(summary)
+    if correlations is not None:
+        insights_summary["top_correlations"] = correlations.top_pairs_dict(10)
+    return insights_summary
+
+
+def show_insights():
+    """Stream the report so text appears as soon as the first tokens arrive."""
+    client = make_client(get_model())
+    with span("insights.encode_summary") as current:
+        encoded = encode_summary(get_insights_summary(), settings.insights_token_budget)
+        current.set(**encoded.stats())
+    st.caption(
+        f"Summary sent as ~{encoded.tokens:,} tokens "
+        f"({encoded.compression_ratio:.1f}× smaller than the full summary; "
+        f"{len(encoded.detailed_columns)} columns in detail, "
+        f"{len(encoded.collapsed_columns)} summarized)."
+    )
+    st.write_stream(stream_insights(client, encoded))
+
+
+if st.button("Generate AI Insights", disabled=not settings.llm_configured):
+    with span("insights"):
+        show_insights()
 
 # ---------------- Q&A Agent ----------------
 st.subheader("💬 Ask Questions About Your Data")
@@ -150,17 +358,33 @@ question = st.text_input(
     "Ask a data question (e.g., 'Which region has the highest revenue?')"
 )
 
-if st.button("Run Query") and question:
-    with st.spinner("Thinking and executing on your data..."):
-        qa_model = get_qa_model()
-        code, result = run_data_query(qa_model, question, df)
+qa_engine = select_engine(len(df), settings.qa_engine, settings.sql_engine_min_rows)
+if qa_engine == "sql":
+    st.caption("Large dataset: questions are answered with SQL (DuckDB).")
 
+
+def show_query_result(code, result):
     st.markdown("**🔍 AI-Generated Code:**")
-    st.code(code, language="python")
+    st.code(code, language="sql" if qa_engine == "sql" else "python")
 
     st.markdown("**✅ Result:**")
     st.write(result)
 
+
+if st.button("Run Query", disabled=not settings.llm_configured) and question:
+    with st.spinner("Thinking and executing on your data..."):
+        qa_model = make_client(get_model())
+        code, result = run_data_query(
+            qa_model,
+            question,
+            df,
+            dataset_key=digest,
+            executor=get_sandbox(),
+            engine=qa_engine,
+        )
+
+    show_query_result(code, result)
+
 # ---------------- Visual Q&A (Charts) ----------------
 st.subheader("📊 Ask for Visualizations")
 
@@ -168,7 +392,8 @@ st.markdown(
     "Describe the chart you want. For example:\n"
     "- `Bar chart of total revenue by region`\n"
     "- `Line chart of units_sold over date for laptops`\n"
-    "- `Boxplot of revenue by region`"
+    "- `Boxplot of revenue by region`\n"
+    "- `Scatter of price against revenue`"
 )
 
 viz_question = st.text_input(
@@ -176,25 +401,127 @@ viz_question = st.text_input(
     key="viz_question",
 )
 
-if st.button("Generate Chart", key="viz_button") and viz_question.strip():
-    with st.spinner("Asking Gemini to design your chart..."):
-        plot_model = get_plot_model()
-        plot_code, plot_result = run_plot_query(plot_model, viz_question, df)
-
+def show_plot_result(plot_code, plot_result):
     st.markdown("**🧠 AI-Generated Plot Code:**")
     st.code(plot_code, language="python")
 
     st.markdown("**📈 Chart:**")
-    if isinstance(plot_result, Figure):
+    from matplotlib.figure import Figure  # for isinstance checks
+
+    if isinstance(plot_result, AggregatedChart):
+        # Only the reduced data goes to the browser, as an interactive chart.
+        with span("charts.render", kind=plot_result.kind, marks=plot_result.marks):
+            try:
+                st.altair_chart(plot_result.to_altair(), use_container_width=True)
+            except ImportError:
+                st.pyplot(plot_result.to_figure(), use_container_width=True)
+        st.caption(plot_result.caption())
+    elif isinstance(plot_result, Figure):
         st.pyplot(plot_result, use_container_width=True)
     elif isinstance(plot_result, list) and all(
         isinstance(f, Figure) for f in plot_result
     ):
         for fig in plot_result:
             st.pyplot(fig, use_container_width=True)
+    elif isinstance(plot_result, bytes):
+        # Rendered to PNG in the sandbox
+        st.image(plot_result, use_container_width=True)
+    elif isinstance(plot_result, list) and all(
+        isinstance(png, bytes) for png in plot_result
+    ):
+        for png in plot_result:
+            st.image(png, use_container_width=True)
     else:
         # Either an error string or explanatory message
         st.write(plot_result)
 
+
+if (
+    st.button("Generate Chart", key="viz_button", disabled=not settings.llm_configured)
+    and viz_question.strip()
+):
+    with st.spinner("Asking Gemini to design your chart..."):
+        plot_model = make_client(get_model())
+        plot_code, plot_result = run_plot_query(
+            plot_model, viz_question, df, dataset_key=digest, executor=get_sandbox()
+        )
+
+    show_plot_result(plot_code, plot_result)
+
+# ---------------- Run Everything ----------------
+st.subheader("⚡ Run Everything Together")
+st.caption(
+    "Answers the question and draws the chart above in the background "
+    "while the insights report streams in."
+)
+
+if st.button(
+    "Run insights, query and chart", key="run_all", disabled=not settings.llm_configured
+):
+    # Clients are built here: Streamlit caches are not reachable from workers.
+    sandbox = get_sandbox()
+    background = {}
+    if question:
+        qa_client = make_client(get_model())
+        background["query"] = lambda: run_data_query(
+            qa_client, question, df, dataset_key=digest, executor=sandbox, engine=qa_engine
+        )
+    if viz_question.strip():
+        plot_client = make_client(get_model())
+        background["chart"] = lambda: run_plot_query(
+            plot_client, viz_question, df, dataset_key=digest, executor=sandbox
+        )
+    futures = dispatch(background)
+
+    st.markdown("**🧠 Insights**")
+    show_insights()
+
+    for name, show in (("query", show_query_result), ("chart", show_plot_result)):
+        if name in futures:
+            try:
+                show(*futures[name].result())
+            except Exception as exc:  # noqa: BLE001
+                st.error(f"The {name} request failed: {exc}")
+
+# ---------------- Debug Panel ----------------
+def show_debug_panel():
+    """Per-stage timings, memory and cache hits recorded by the tracer."""
+    tracer = get_tracer()
+    st.subheader("🐞 Debug: Pipeline Traces")
+
+    totals = pd.DataFrame.from_dict(tracer.totals(), orient="index")
+    if not totals.empty:
+        totals["mean_wall_ms"] = totals["wall_seconds"] * 1000 / totals["count"]
+        st.markdown("**Per-stage totals**")
+        st.dataframe(totals.sort_values("wall_seconds", ascending=False), use_container_width=True)
+
+    rows = [
+        {
+            "span": "  " * depth + item.name,
+            "wall_ms": round(item.wall_seconds * 1000, 1),
+            "cpu_ms": round(item.cpu_seconds * 1000, 1),
+            "rss_delta_mb": round(item.rss_delta_bytes / 1e6, 1),
+            "peak_rss_delta_mb": round(item.peak_rss_delta_bytes / 1e6, 1),
+            "attrs": str(item.attrs),
+            "error": item.error,
+        }
+        for root in reversed(tracer.traces())
+        for depth, item in root.walk()
+    ]
+    st.markdown("**Recent spans** (newest first)")
+    st.dataframe(pd.DataFrame(rows), use_container_width=True)
+
+    col1, col2, col3 = st.columns(3)
+    col1.download_button("Download JSON", tracer.to_json(), "traces.json", "application/json")
+    col2.download_button(
+        "Download Prometheus metrics", tracer.to_prometheus(), "metrics.prom", "text/plain"
+    )
+    if col3.button("Reset traces"):
+        tracer.reset()
+
+
+if show_debug:
+    show_debug_panel()
+
 st.markdown("---")
 st.caption("Made with ❤️ using Streamlit + Gemini + pandas")
@@ -0,0 +1,679 @@
+"""
+Headless batch analysis of many CSV files.
+
+Every dataset goes through the same pipeline as the Streamlit app (load,
+dtype optimization, summary, correlations, charts, AI insights) and gets its
+own report directory:
+
+    <output>/<dataset>/summary.json   summary, dtype report, correlations
+    <output>/<dataset>/charts/*.png   histograms, boxplots, heatmap, bar charts
+    <output>/<dataset>/insights.md    AI insights (when an API key is set)
+    <output>/<dataset>/report.md      Markdown report linking all of the above
+    <output>/<dataset>/status.json    stages completed, for resuming
+
+Analysis runs on a process pool sized for the CPUs. Insights are requested
+from a separate, smaller thread pool as analyses finish, so the number of
+concurrent LLM calls is limited independently of CPU parallelism. Outputs
+are written atomically and a stage is recorded in ``status.json`` only once
+its files exist, so a rerun after a crash skips finished work (unless the
+source file changed) and resumes unfinished stages. If an analysis process
+dies outright (e.g. killed for running out of memory), the file it was
+working on is marked failed and the rest continue on a fresh pool.
+
+Usage:
+    python -m pipeline.batch data/drops/ --output reports/
+    python -m pipeline.batch --manifest files.txt --output reports/ --workers 8 --llm-concurrency 2
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import time
+from collections import deque
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+    wait,
+)
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Iterator, List, Tuple
+
+os.environ.setdefault("MPLBACKEND", "Agg")  # no display in batch mode
+
+import numpy as np
+
+from config import Settings, get_settings
+
+logger = logging.getLogger(__name__)
+
+STATUS_FILE = "status.json"
+SUMMARY_FILE = "summary.json"
+INSIGHTS_FILE = "insights.md"
+REPORT_FILE = "report.md"
+CHARTS_DIR = "charts"
+DEFAULT_MAX_CHARTS = 20
+DEFAULT_GLOB = "*.csv"
+# Rows of the missing-value table in the Markdown report.
+REPORT_TOP_MISSING = 15
+
+
+@dataclass
+class BatchItem:
+    """One input file and where its reports go."""
+
+    source: str
+    output_dir: str
+
+    @property
+    def name(self) -> str:
+        return os.path.basename(self.output_dir)
+
+
+# ---------------------------------------------------------------------------
+# Inputs and resume state
+# ---------------------------------------------------------------------------
+
+
+def discover_inputs(
+    paths: List[str],
+    manifest: str | None = None,
+    pattern: str = DEFAULT_GLOB,
+    recursive: bool = False,
+) -> List[str]:
+    """
+    Collect CSV paths from files, directories and an optional manifest.
+
+    Args:
+        paths: Files or directories; directories are searched for ``pattern``.
+        manifest: Text file with one path per line (``#`` starts a comment)
+            or a JSON list of paths. Relative paths are resolved against the
+            manifest's directory.
+        pattern: Glob used inside directories.
+        recursive: Search directories recursively.
+
+    Returns:
+        Absolute paths, sorted and without duplicates.
+    """
+    import fnmatch
+
+    candidates: List[str] = []
+    if manifest:
+        base = os.path.dirname(os.path.abspath(manifest))
+        with open(manifest, encoding="utf-8") as handle:
+            content = handle.read()
+        if content.lstrip().startswith("["):
+            entries = [str(entry) for entry in json.loads(content)]
+        else:
+            entries = [line.split("#", 1)[0].strip() for line in content.splitlines()]
+        candidates += [os.path.join(base, entry) for entry in entries if entry]
+
+    for path in paths:
+        if not os.path.isdir(path):
+            candidates.append(path)
+            continue
+        for root, dirs, files in os.walk(path):
+            if not recursive:
+                dirs.clear()
+            candidates += [os.path.join(root, f) for f in fnmatch.filter(files, pattern)]
+
+    found = []
+    for path in candidates:
+        if os.path.isfile(path):
+            found.append(os.path.abspath(path))
+        else:
+            logger.warning("Skipping %s: not a file.", path)
+    return sorted(set(found))
+
+
+def plan_outputs(sources: List[str], output_root: str) -> List[BatchItem]:
+    """
+    Give each source a stable, unique report directory: the file name plus a
+    short hash of its absolute path, so equal names in different folders do
+    not collide.
+    """
+    items = []
+    for source in sources:
+        stem = os.path.splitext(os.path.basename(source))[0]
+        stem = re.sub(r"[^A-Za-z0-9_.-]+", "_", stem).strip("._") or "dataset"
+        suffix = hashlib.blake2b(source.encode("utf-8"), digest_size=4).hexdigest()
+        items.append(BatchItem(source, os.path.join(output_root, f"{stem}-{suffix}")))
+    return items
+
+
+def source_stamp(path: str) -> Dict[str, Any]:
+    """Size and modification time identifying the version of a source file."""
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+def _write_atomic(path: str, data: bytes | str) -> None:
+    """Write via a temporary file and rename, so readers never see partial files."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp-{os.getpid()}"
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    with open(tmp, "wb") as handle:
+        handle.write(data)
+    os.replace(tmp, path)
+
+
+def _write_json(path: str, payload: Any) -> None:
+    _write_atomic(path, json.dumps(payload, indent=2, default=_json_default))
+
+
+def read_status(item: BatchItem) -> Dict[str, Any]:
+    """
+    Stages already completed for ``item``'s current source version.
+
+    Returns:
+        The stored status, or an empty one if there is none, it is unreadable
+        or the source file changed since.
+    """
+    path = os.path.join(item.output_dir, STATUS_FILE)
+    try:
+        with open(path, encoding="utf-8") as handle:
+            status = json.load(handle)
+    except (OSError, ValueError):
+        return {}
+    if status.get("source") != item.source or status.get("stamp") != source_stamp(item.source):
+        logger.info("%s changed since its last run; reprocessing.", item.source)
+        return {}
+    return status
+
+
+def _update_status(item: BatchItem, **changes: Any) -> Dict[str, Any]:
+    status = read_status(item) or {"source": item.source, "stamp": source_stamp(item.source)}
+    status.update(changes, updated=time.strftime("%Y-%m-%dT%H:%M:%S"))
+    _write_json(os.path.join(item.output_dir, STATUS_FILE), status)
+    return status
+
+
+# ---------------------------------------------------------------------------
+# CPU stage (process pool)
+# ---------------------------------------------------------------------------
+
+
+def _render_charts(
+    df: Any,
+    numeric_cols: List[str],
+    categorical_cols: List[str],
+    correlations: Any,
+    charts_dir: str,
+    max_charts: int,
+) -> List[Dict[str, str]]:
+    """Render the app's charts to PNG files; returns their manifest."""
+    from pipeline.visualization import (
+        lazy_boxplots,
+        lazy_categorical_bars,
+        lazy_correlation_heatmap,
+        lazy_histograms,
+    )
+
+    sections = [
+        ("histogram", lazy_histograms(numeric_cols[:max_charts])),
+        ("boxplot", lazy_boxplots(numeric_cols[:max_charts])),
+        ("bar", lazy_categorical_bars(categorical_cols[:max_charts])),
+    ]
+    heatmap = lazy_correlation_heatmap(numeric_cols, correlations=correlations)
+    if heatmap is not None:
+        sections.append(("correlation", {"heatmap": heatmap}))
+
+    charts = []
+    for kind, figures in sections:
+        for index, (column, figure) in enumerate(figures.items()):
+            safe = re.sub(r"[^A-Za-z0-9_.-]+", "_", str(column))[:60]
+            filename = f"{kind}-{index:03d}-{safe}.png"
+            try:
+                _write_atomic(os.path.join(charts_dir, filename), figure.png(df))
+            except Exception:  # noqa: BLE001
+                logger.exception("Failed to render %s chart for %s.", kind, column)
+                continue
+            charts.append({"kind": kind, "column": str(column), "file": f"{CHARTS_DIR}/{filename}"})
+    return charts
+
+
+def analyze_file(
+    item: BatchItem,
+    settings: Settings,
+    max_charts: int = DEFAULT_MAX_CHARTS,
+) -> Dict[str, Any]:
+    """
+    Run the CPU-bound part of the pipeline for one file and write its
+    summary, charts and a preliminary report.
+
+    Runs inside a pool worker, so profiling and correlations use a single
+    thread each; parallelism comes from processing several files at once.
+
+    Returns:
+        The summary document written to ``summary.json``.
+    """
+    from pipeline.correlation import compute_correlations
+    from pipeline.data_ingestion import infer_column_types, load_csv, optimize_dtypes
+    from pipeline.llm_cache import schema_fingerprint
+    from pipeline.profiling import build_summary
+
+    start = time.perf_counter()
+    raw_df = load_csv(item.source, memory_limit_mb=settings.ingest_memory_limit_mb)
+    df, dtype_report = optimize_dtypes(raw_df)
+    del raw_df
+    numeric_cols, categorical_cols = infer_column_types(df)
+
+    summary = build_summary(df, n_jobs=1)
+    correlations = (
+        compute_correlations(df, numeric_cols, n_jobs=1) if len(numeric_cols) >= 2 else None
+    )
+    if correlations is not None:
+        summary["top_correlations"] = correlations.top_pairs_dict(10)
+
+    charts = _render_charts(
+        df,
+        numeric_cols,
+        categorical_cols,
+        correlations,
+        os.path.join(item.output_dir, CHARTS_DIR),
+        max_charts,
+    )
+
+    document = {
+        "source": item.source,
+        "schema_fingerprint": schema_fingerprint(df),
+        "numeric_columns": [str(col) for col in numeric_cols],
+        "categorical_columns": [str(col) for col in categorical_cols],
+        "dtype_report": dtype_report,
+        "summary": summary,
+        "charts": charts,
+        "analysis_seconds": round(time.perf_counter() - start, 3),
+    }
+    _write_json(os.path.join(item.output_dir, SUMMARY_FILE), document)
+    _write_atomic(os.path.join(item.output_dir, REPORT_FILE), render_report(document, None))
+    _update_status(item, analysis=True, error=None)
+    logger.info("Analyzed %s in %.1fs.", item.source, document["analysis_seconds"])
+    return document
+
+
+def _analyze_worker(item: BatchItem, settings: Settings, max_charts: int) -> Dict[str, Any]:
+    """Pool entry point: record failures in the status file instead of raising."""
+    try:
+        document = analyze_file(item, settings, max_charts)
+        return {"ok": True, "seconds": document["analysis_seconds"]}
+    except Exception as exc:  # noqa: BLE001
+        logger.exception("Analysis of %s failed.", item.source)
+        error = f"{type(exc).__name__}: {exc}"
+        try:
+            _update_status(item, analysis=False, error=error)
+        except OSError:
+            pass
+        return {"ok": False, "error": error}
+
+
+def _crashed(item: BatchItem, exc: BaseException) -> Dict[str, Any]:
+    """Record a file whose analysis process died as failed."""
+    error = f"Analysis process died: {exc}"
+    logger.error("%s: %s", item.source, error)
+    try:
+        _update_status(item, analysis=False, error=error)
+    except OSError:
+        pass
+    return {"ok": False, "error": error}
+
+
+def _analyze_on_pool(
+    items: List[BatchItem],
+    settings: Settings,
+    max_charts: int,
+    workers: int,
+) -> Iterator[Tuple[BatchItem, Dict[str, Any]]]:
+    """
+    Analyze ``items`` on a process pool, yielding (item, result) as they finish.
+
+    At most ``workers`` files are in flight, so when a worker dies the files
+    it may have been handling are known. If more than one was in flight they
+    are retried one at a time on a fresh single-process pool, where a second
+    crash identifies the culprit; the remaining files continue on a fresh
+    full-size pool.
+    """
+    queued: Deque[BatchItem] = deque(items)
+    suspects: Deque[BatchItem] = deque()
+    while queued or suspects:
+        isolate = bool(suspects)
+        source = suspects if isolate else queued
+        size = 1 if isolate else max(1, workers)
+        broken: List[Tuple[BatchItem, BaseException]] = []
+        with ProcessPoolExecutor(max_workers=size) as pool:
+            running: Dict[Future, BatchItem] = {}
+            while True:
+                while source and len(running) < size and not broken:
+                    item = source.popleft()
+                    try:
+                        running[pool.submit(_analyze_worker, item, settings, max_charts)] = item
+                    except BrokenProcessPool as exc:
+                        broken.append((item, exc))
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    item = running.pop(future)
+                    try:
+                        result = future.result()
+                    except BrokenProcessPool as exc:
+                        broken.append((item, exc))
+                        continue
+                    yield item, result
+
+        if len(broken) == 1 or isolate:
+            for item, exc in broken:
+                yield item, _crashed(item, exc)
+        elif broken:
+            logger.warning(
+                "An analysis process died; retrying %d in-flight files one at a time.",
+                len(broken),
+            )
+            suspects.extend(item for item, _ in broken)
+
+
+# ---------------------------------------------------------------------------
+# LLM stage (thread pool)
+# ---------------------------------------------------------------------------
+
+
+def make_llm_client(settings: Settings) -> Any:
+    """
+    The shared Gemini model behind the response cache, timeouts and retries,
+    or None when no API key is configured.
+    """
+    if not settings.llm_configured:
+        return None
+    from pipeline.llm_client import LLMClient
+    from pipeline.llm_model import get_gemini_model
+
+    return LLMClient(
+        get_gemini_model(settings),
+        timeout=settings.llm_timeout_seconds,
+        max_retries=settings.llm_max_retries,
+    )
+
+
+def _with_llm_cache(client: Any, cache: Any, fingerprint: str) -> Any:
+    """Route ``client``'s model through the response cache for one dataset."""
+    if cache is None:
+        return client
+    from pipeline.llm_cache import CachedModel
+    from pipeline.llm_client import LLMClient
+
+    return LLMClient(
+        CachedModel(client.model, cache, fingerprint=fingerprint),
+        timeout=client.timeout,
+        max_retries=client.max_retries,
+    )
+
+
+def write_insights(item: BatchItem, client: Any, settings: Settings, cache: Any = None) -> None:
+    """Generate insights from the stored summary and finish the report."""
+    from pipeline.llm_insights import generate_insights
+
+    with open(os.path.join(item.output_dir, SUMMARY_FILE), encoding="utf-8") as handle:
+        document = json.load(handle)
+    model = _with_llm_cache(client, cache, document.get("schema_fingerprint", ""))
+    insights = generate_insights(model, document["summary"], settings.insights_token_budget)
+    _write_atomic(os.path.join(item.output_dir, INSIGHTS_FILE), insights + "\n")
+    _write_atomic(os.path.join(item.output_dir, REPORT_FILE), render_report(document, insights))
+    _update_status(item, insights=True, error=None)
+
+
+# ---------------------------------------------------------------------------
+# Markdown report
+# ---------------------------------------------------------------------------
+
+
+def _md(value: Any) -> str:
+    return str(value).replace("|", "\\|").replace("\n", " ")
+
+
+def _fmt(value: Any) -> str:
+    if isinstance(value, float):
+        return f"{value:.4g}"
+    return _md(value)
+
+
+def render_report(document: Dict[str, Any], insights: str | None) -> str:
+    """Markdown report for one dataset."""
+    summary = document["summary"]
+    rows = max(int(summary.get("rows") or 0), 1)
+    lines = [
+        f"# {os.path.basename(document['source'])}",
+        "",
+        f"- Source: `{document['source']}`",
+        f"- Rows: {summary.get('rows', 0):,}",
+        f"- Columns: {summary.get('cols', 0):,} "
+        f"({len(document['numeric_columns'])} numeric, "
+        f"{len(document['categorical_columns'])} categorical)",
+    ]
+    saved = sum(entry["bytes_saved"] for entry in document["dtype_report"].values())
+    if saved:
+        lines.append(
+            f"- Dtype optimization saved {saved / 1024**2:.1f} MB "
+            f"across {len(document['dtype_report'])} columns"
+        )
+
+    missing = sorted(
+        ((col, n) for col, n in summary.get("missing_values", {}).items() if n),
+        key=lambda pair: -pair[1],
+    )
+    lines += ["", "## Missing values", ""]
+    if missing:
+        lines += ["| column | missing | % |", "|---|---:|---:|"]
+        for col, n in missing[:REPORT_TOP_MISSING]:
+            lines.append(f"| {_md(col)} | {n:,} | {100 * n / rows:.1f} |")
+        if len(missing) > REPORT_TOP_MISSING:
+            lines.append(f"\n{len(missing) - REPORT_TOP_MISSING} more columns have missing values.")
+    else:
+        lines.append("No missing values.")
+
+    numeric = summary.get("numeric_summary", {})
+    if numeric:
+        fields = ("mean", "std", "min", "50%", "max")
+        lines += ["", "## Numeric columns", ""]
+        lines += ["| column | " + " | ".join(fields) + " |", "|---" + "|---:" * len(fields) + "|"]
+        for col, stats in numeric.items():
+            cells = " | ".join(_fmt(stats.get(f, "")) for f in fields)
+            lines.append(f"| {_md(col)} | {cells} |")
+
+    correlations = summary.get("top_correlations") or []
+    if correlations:
+        lines += ["", "## Strongest correlations", "", "| a | b | r |", "|---|---|---:|"]
+        for pair in correlations:
+            lines.append(f"| {_md(pair['a'])} | {_md(pair['b'])} | {pair['r']:.2f} |")
+
+    if document["charts"]:
+        lines += ["", "## Charts", ""]
+        for chart in document["charts"]:
+            lines.append(f"![{_md(chart['kind'])}: {_md(chart['column'])}]({chart['file']})")
+
+    lines += ["", "## AI insights", ""]
+    lines.append(insights.strip() if insights else "_Not generated._")
+    return "\n".join(lines) + "\n"
+
+
+# ---------------------------------------------------------------------------
+# Driver
+# ---------------------------------------------------------------------------
+
+
+def run_batch(
+    items: List[BatchItem],
+    settings: Settings,
+    workers: int | None = None,
+    llm_concurrency: int = 4,
+    insights: bool = True,
+    max_charts: int = DEFAULT_MAX_CHARTS,
+    force: bool = False,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Process ``items``, skipping stages already completed by earlier runs.
+
+    Args:
+        items: Files and their report directories.
+        settings: App settings (ingest limit, LLM key, cache, timeouts).
+        workers: Analysis processes (defaults to the CPU count).
+        llm_concurrency: Maximum concurrent insight requests.
+        insights: Generate AI insights (skipped without an API key).
+        max_charts: Charts per kind and dataset.
+        force: Ignore previous results and redo everything.
+
+    Returns:
+        Mapping from source path to its outcome ({"status": ..., ...}).
+    """
+    client = make_llm_client(settings) if insights else None
+    if insights and client is None:
+        logger.warning("GEMINI_API_KEY is not set; reports are written without AI insights.")
+
+    llm_cache = None
+    if client is not None and settings.llm_cache_path:
+        from pipeline.llm_cache import LLMResponseCache
+
+        ttl_hours = settings.llm_cache_ttl_hours
+        llm_cache = LLMResponseCache(
+            settings.llm_cache_path,
+            max_bytes=settings.llm_cache_max_mb * 1024 * 1024,
+            ttl_seconds=ttl_hours * 3600 if ttl_hours is not None else None,
+        )
+
+    outcomes: Dict[str, Dict[str, Any]] = {}
+    to_analyze: List[BatchItem] = []
+    to_explain: List[BatchItem] = []
+    for item in items:
+        status = {} if force else read_status(item)
+        if not status.get("analysis"):
+            to_analyze.append(item)
+        elif client is not None and not status.get("insights"):
+            to_explain.append(item)
+        else:
+            outcomes[item.source] = {"status": "skipped"}
+    logger.info(
+        "%d files: %d to analyze, %d awaiting insights, %d already done.",
+        len(items),
+        len(to_analyze),
+        len(to_explain),
+        len(outcomes),
+    )
+
+    llm_pool = ThreadPoolExecutor(
+        max_workers=max(1, llm_concurrency), thread_name_prefix="batch-llm"
+    )
+    llm_futures: Dict[Future, BatchItem] = {}
+
+    def explain(item: BatchItem) -> None:
+        llm_futures[llm_pool.submit(write_insights, item, client, settings, llm_cache)] = item
+
+    try:
+        for item in to_explain:
+            explain(item)
+
+        cpu_workers = workers or os.cpu_count() or 1
+        for item, result in _analyze_on_pool(to_analyze, settings, max_charts, cpu_workers):
+            if not result["ok"]:
+                outcomes[item.source] = {"status": "failed", "error": result["error"]}
+            elif client is not None:
+                explain(item)
+            else:
+                outcomes[item.source] = {"status": "done"}
+
+        for future in as_completed(llm_futures):
+            item = llm_futures[future]
+            try:
+                future.result()
+                outcomes[item.source] = {"status": "done"}
+            except Exception as exc:  # noqa: BLE001
+                logger.exception("Insights for %s failed.", item.source)
+                error = f"{type(exc).__name__}: {exc}"
+                _update_status(item, insights=False, error=error)
+                outcomes[item.source] = {"status": "failed", "error": error}
+    finally:
+        llm_pool.shutdown(wait=True)
+    return outcomes
+
+
+def main(argv: List[str] | None = None) -> int:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Batch-analyze CSV files without the UI.")
+    parser.add_argument("inputs", nargs="*", help="CSV files or directories")
+    parser.add_argument("--manifest", help="file listing CSV paths (one per line, or a JSON list)")
+    parser.add_argument("--output", required=True, help="root directory for the reports")
+    parser.add_argument("--pattern", default=DEFAULT_GLOB, help="file pattern inside directories")
+    parser.add_argument("--recursive", action="store_true", help="search directories recursively")
+    parser.add_argument(
+        "--workers", type=int, default=settings.batch_workers, help="analysis processes"
+    )
+    parser.add_argument(
+        "--llm-concurrency",
+        type=int,
+        default=settings.batch_llm_concurrency,
+        help="concurrent insight requests",
+    )
+    parser.add_argument("--no-insights", action="store_true", help="skip AI insights")
+    parser.add_argument(
+        "--max-charts", type=int, default=DEFAULT_MAX_CHARTS, help="charts per kind and dataset"
+    )
+    parser.add_argument("--force", action="store_true", help="redo datasets that are already done")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args(argv)
+    if not args.inputs and not args.manifest:
+        parser.error("give input files/directories or --manifest")
+
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format="%(asctime)s %(levelname)s %(name)s - %(message)s",
+    )
+    sources = discover_inputs(args.inputs, args.manifest, args.pattern, args.recursive)
+    if not sources:
+        print("No input files found.", file=sys.stderr)
+        return 1
+
+    items = plan_outputs(sources, args.output)
+    outcomes = run_batch(
+        items,
+        settings,
+        workers=args.workers,
+        llm_concurrency=args.llm_concurrency,
+        insights=not args.no_insights,
+        max_charts=args.max_charts,
+        force=args.force,
+    )
+
+    counts: Dict[str, int] = {}
+    for outcome in outcomes.values():
+        counts[outcome["status"]] = counts.get(outcome["status"], 0) + 1
+    index = {
+        item.source: {
+            "report": os.path.join(item.name, REPORT_FILE),
+            **outcomes.get(item.source, {}),
+        }
+        for item in items
+    }
+    _write_json(os.path.join(args.output, "index.json"), index)
+
+    print(", ".join(f"{n} {status}" for status, n in sorted(counts.items())))
+    for source, outcome in outcomes.items():
+        if outcome["status"] == "failed":
+            print(f"FAILED {source}: {outcome['error']}", file=sys.stderr)
+    return 1 if counts.get("failed") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
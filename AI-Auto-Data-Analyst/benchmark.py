@@ -0,0 +1,420 @@
+"""
+Offline benchmark suite for the Auto Analyst pipeline.
+
+Synthetic datasets of several shapes are pushed through every stage
+(CSV ingestion, dtype optimization, profiling, correlations, chart
+rendering, insights, Q&A and plot agents). The agents talk to ``StubModel``,
+a deterministic stand-in for ``GenerativeModel`` that returns canned code,
+so no network or API key is needed. Each stage records its median wall time
+and its peak traced memory, and results can be compared against a stored
+baseline with a regression threshold.
+
+Usage:
+    python -m pipeline.benchmark --scale 0.1 --output results.json
+    python -m pipeline.benchmark --save-baseline benchmark_baseline.json
+    python -m pipeline.benchmark --baseline benchmark_baseline.json --threshold 0.25
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import io
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+os.environ.setdefault("MPLBACKEND", "Agg")  # headless chart rendering
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DATASETS = ("narrow_tall", "wide", "high_cardinality_text", "heavy_missing")
+DEFAULT_SCALE = 1.0
+DEFAULT_REPEAT = 3
+DEFAULT_THRESHOLD = 0.25
+# Stages faster than this are too noisy to flag on relative change alone.
+MIN_REGRESSION_SECONDS = 0.05
+MIN_REGRESSION_MB = 5.0
+CHARTS_PER_KIND = 6
+
+StageResult = Dict[str, float]
+Results = Dict[str, Any]
+
+
+# ---------------------------------------------------------------------------
+# Stub model
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class StubResponse:
+    text: str
+
+
+class StubModel:
+    """
+    Deterministic offline stand-in for ``genai.GenerativeModel``.
+
+    The prompt type is recognized from its opening line and answered with
+    canned code for the dataset's columns.
+
+    Args:
+        numeric_col: Numeric column used by the canned code.
+        group_col: Optional categorical column to group by.
+        latency: Simulated seconds per call (0 measures pipeline overhead only).
+    """
+
+    model_name = "stub"
+
+    def __init__(self, numeric_col: str, group_col: str | None = None, latency: float = 0.0) -> None:
+        self.numeric_col = numeric_col
+        self.group_col = group_col
+        self.latency = latency
+        self.calls = 0
+
+    def _answer(self, prompt: str) -> str:
+        col = json.dumps(self.numeric_col)
+        if "data visualization expert" in prompt:
+            return f"```python\nchart = charts.histogram(df, {col}, title={col})\n```"
+        if "DuckDB table" in prompt:
+            column = '"' + self.numeric_col.replace('"', '""') + '"'
+            return f"```sql\nSELECT AVG({column}) AS mean FROM df\n```"
+        if "senior data analyst" in prompt:
+            return "## Dataset Overview\nSynthetic benchmark dataset.\n## Key Statistical Insights\nNone."
+        if self.group_col is not None:
+            return f"```python\ndf.groupby({json.dumps(self.group_col)}, observed=True)[{col}].mean()\n```"
+        return f"```python\ndf[{col}].mean()\n```"
+
+    def generate_content(self, prompt: str, stream: bool = False) -> Any:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        response = StubResponse(self._answer(prompt))
+        if stream:
+            return iter([response])
+        return response
+
+
+# ---------------------------------------------------------------------------
+# Synthetic datasets
+# ---------------------------------------------------------------------------
+
+
+def make_dataset(kind: str, scale: float = DEFAULT_SCALE, seed: int = 0) -> pd.DataFrame:
+    """
+    Build a synthetic dataset of the given shape.
+
+    Args:
+        kind: One of ``DATASETS``.
+        scale: Row-count multiplier (1.0 = full size).
+        seed: Random seed; the same arguments always give the same frame.
+
+    Returns:
+        DataFrame with the requested shape.
+    """
+    rng = np.random.default_rng(seed)
+
+    def rows(n: int) -> int:
+        return max(int(n * scale), 100)
+
+    if kind == "narrow_tall":
+        n = rows(1_000_000)
+        return pd.DataFrame(
+            {
+                "order_id": np.arange(n),
+                "date": pd.date_range("2020-01-01", periods=n, freq="min").strftime("%Y-%m-%d"),
+                "region": rng.choice(["North", "South", "East", "West"], n),
+                "units": rng.integers(1, 50, n),
+                "price": rng.gamma(2.0, 20.0, n).round(2),
+                "revenue": rng.normal(500, 150, n).round(2),
+            }
+        )
+    if kind == "wide":
+        n = rows(5_000)
+        data = {f"feature_{i}": rng.normal(i % 13, 1 + i % 5, n) for i in range(500)}
+        data["segment"] = rng.choice(["a", "b", "c"], n)
+        return pd.DataFrame(data)
+    if kind == "high_cardinality_text":
+        n = rows(200_000)
+        words = np.array(["alpha", "beta", "gamma", "delta", "omega", "sigma", "kappa"])
+        return pd.DataFrame(
+            {
+                "user_id": [f"user-{i:08d}" for i in rng.permutation(n)],
+                "email": [f"name{i}@example{i % 97}.com" for i in range(n)],
+                "comment": [" ".join(rng.choice(words, 6)) for _ in range(n)],
+                "city": rng.choice([f"city_{i}" for i in range(5_000)], n),
+                "score": rng.normal(0, 1, n),
+            }
+        )
+    if kind == "heavy_missing":
+        n = rows(200_000)
+        data = {}
+        for i in range(30):
+            values = rng.normal(i, 2, n)
+            values[rng.random(n) < 0.6] = np.nan
+            data[f"sensor_{i}"] = values
+        labels = rng.choice(["ok", "warn", "fail"], n).astype(object)
+        labels[rng.random(n) < 0.6] = None
+        data["status"] = labels
+        return pd.DataFrame(data)
+    raise ValueError(f"Unknown dataset {kind!r}; expected one of {DATASETS}.")
+
+
+# ---------------------------------------------------------------------------
+# Stages
+# ---------------------------------------------------------------------------
+
+
+def _stages(kind: str, csv_bytes: bytes) -> Iterator[Tuple[str, Callable[[Dict[str, Any]], Any]]]:
+    """
+    Yield ``(stage, fn)`` pairs in pipeline order. Each ``fn`` receives a
+    shared state dict holding earlier stages' outputs.
+    """
+    from pipeline.aggregated_charts import AggregatedChart
+    from pipeline.correlation import compute_correlations
+    from pipeline.data_ingestion import infer_column_types, load_csv, optimize_dtypes
+    from pipeline.llm_insights import generate_insights
+    from pipeline.plot_agent import run_plot_query
+    from pipeline.profiling import build_summary
+    from pipeline.qa_agent import run_data_query
+    from pipeline.visualization import figure_to_png, lazy_categorical_bars, lazy_histograms
+
+    def ingest(state: Dict[str, Any]) -> None:
+        state["raw"] = load_csv(io.BytesIO(csv_bytes))
+
+    def optimize(state: Dict[str, Any]) -> None:
+        state["df"], _ = optimize_dtypes(state["raw"])
+        state["numeric"], state["categorical"] = infer_column_types(state["df"])
+
+    def profile(state: Dict[str, Any]) -> None:
+        state["summary"] = build_summary(state["df"])
+
+    def correlate(state: Dict[str, Any]) -> None:
+        state["correlations"] = compute_correlations(state["df"], state["numeric"])
+
+    def render(state: Dict[str, Any]) -> None:
+        df = state["df"]
+        figures = list(lazy_histograms(state["numeric"][:CHARTS_PER_KIND]).values())
+        figures += list(lazy_categorical_bars(state["categorical"][:CHARTS_PER_KIND]).values())
+        for figure in figures:
+            figure.png(df)
+
+    def model_for(state: Dict[str, Any]) -> StubModel:
+        group = state["categorical"][0] if state["categorical"] else None
+        return StubModel(state["numeric"][0], group)
+
+    def insights(state: Dict[str, Any]) -> None:
+        summary = dict(state["summary"])
+        if state.get("correlations") is not None:
+            summary["top_correlations"] = state["correlations"].top_pairs_dict(10)
+        generate_insights(model_for(state), summary)
+
+    def query(state: Dict[str, Any]) -> None:
+        # A fresh key per run, so memoized normalization is part of the cost.
+        key = f"bench-{kind}-{time.perf_counter_ns()}"
+        _, result = run_data_query(
+            model_for(state), "average by group", state["df"], dataset_key=key, engine="pandas"
+        )
+        if isinstance(result, str) and result.startswith("Error"):
+            raise RuntimeError(result)
+
+    def plot(state: Dict[str, Any]) -> None:
+        import matplotlib.pyplot as plt
+
+        key = f"bench-{kind}-{time.perf_counter_ns()}"
+        _, chart = run_plot_query(model_for(state), "histogram", state["df"], dataset_key=key)
+        if not isinstance(chart, AggregatedChart):
+            raise RuntimeError(str(chart))
+        figure_to_png(chart.to_figure())
+        plt.close("all")
+
+    yield "ingest.read_csv", ingest
+    yield "ingest.optimize_dtypes", optimize
+    yield "profiling.build_summary", profile
+    yield "correlation.compute", correlate
+    yield "visualization.render", render
+    yield "insights.generate", insights
+    yield "qa.run_data_query", query
+    yield "plot.run_plot_query", plot
+
+
+def run_dataset(kind: str, scale: float, repeat: int) -> Dict[str, StageResult]:
+    """
+    Benchmark every stage on one synthetic dataset.
+
+    Timings are the median of ``repeat`` runs without memory tracing; the
+    peak is measured in one extra run under ``tracemalloc``.
+
+    Returns:
+        Mapping from stage to ``{"seconds", "peak_mb"}``.
+    """
+    buffer = io.StringIO()
+    make_dataset(kind, scale).to_csv(buffer, index=False)
+    csv_bytes = buffer.getvalue().encode("utf-8")
+    stages = list(_stages(kind, csv_bytes))
+
+    timings: Dict[str, List[float]] = {name: [] for name, _ in stages}
+    for _ in range(repeat):
+        state: Dict[str, Any] = {}
+        for name, fn in stages:
+            gc.collect()
+            start = time.perf_counter()
+            fn(state)
+            timings[name].append(time.perf_counter() - start)
+
+    peaks: Dict[str, float] = {}
+    state = {}
+    tracemalloc.start()
+    try:
+        for name, fn in stages:
+            gc.collect()
+            tracemalloc.reset_peak()
+            baseline, _ = tracemalloc.get_traced_memory()
+            fn(state)
+            _, peak = tracemalloc.get_traced_memory()
+            peaks[name] = (peak - baseline) / 1e6
+    finally:
+        tracemalloc.stop()
+
+    results = {
+        name: {
+            "seconds": round(statistics.median(timings[name]), 4),
+            "peak_mb": round(peaks[name], 2),
+        }
+        for name, _ in stages
+    }
+    results["_dataset"] = {"csv_mb": round(len(csv_bytes) / 1e6, 2)}
+    return results
+
+
+def run_benchmarks(
+    datasets: List[str] | Tuple[str, ...] = DATASETS,
+    scale: float = DEFAULT_SCALE,
+    repeat: int = DEFAULT_REPEAT,
+) -> Results:
+    """
+    Run the suite.
+
+    Returns:
+        ``{"meta": {...}, "results": {dataset: {stage: {...}}}}``.
+    """
+    results = {}
+    for kind in datasets:
+        logger.info("Benchmarking %s (scale %g).", kind, scale)
+        results[kind] = run_dataset(kind, scale, repeat)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "scale": scale,
+            "repeat": repeat,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def compare(
+    current: Results,
+    baseline: Results,
+    threshold: float = DEFAULT_THRESHOLD,
+) -> List[Dict[str, Any]]:
+    """
+    List stages that got slower or hungrier than the baseline.
+
+    A stage regresses when its time (or peak memory) exceeds the baseline by
+    more than ``threshold`` (relative) and by more than a small absolute
+    margin, so tiny stages do not flag on noise.
+
+    Returns:
+        One dict per regression (dataset, stage, metric, baseline, current,
+        change).
+    """
+    if baseline.get("meta", {}).get("scale") != current.get("meta", {}).get("scale"):
+        logger.warning("Baseline was recorded at a different scale; comparison is approximate.")
+
+    regressions = []
+    for kind, stages in current["results"].items():
+        for stage, values in stages.items():
+            before = baseline.get("results", {}).get(kind, {}).get(stage)
+            if stage.startswith("_") or not before:
+                continue
+            for metric, margin in (("seconds", MIN_REGRESSION_SECONDS), ("peak_mb", MIN_REGRESSION_MB)):
+                old, new = before.get(metric), values.get(metric)
+                if old is None or new is None:
+                    continue
+                if new > old * (1 + threshold) and new - old > margin:
+                    regressions.append(
+                        {
+                            "dataset": kind,
+                            "stage": stage,
+                            "metric": metric,
+                            "baseline": old,
+                            "current": new,
+                            "change": round(new / old - 1, 3) if old else None,
+                        }
+                    )
+    return regressions
+
+
+def format_results(results: Results) -> str:
+    """Plain-text table of the results."""
+    lines = [f"{'dataset':<24}{'stage':<28}{'seconds':>10}{'peak MB':>10}"]
+    for kind, stages in results["results"].items():
+        for stage, values in stages.items():
+            if stage.startswith("_"):
+                continue
+            lines.append(f"{kind:<24}{stage:<28}{values['seconds']:>10.3f}{values['peak_mb']:>10.1f}")
+    return "\n".join(lines)
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline Auto Analyst benchmarks.")
+    parser.add_argument("--datasets", nargs="+", choices=DATASETS, default=list(DATASETS))
+    parser.add_argument("--scale", type=float, default=DEFAULT_SCALE, help="row-count multiplier")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="timed runs per stage")
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--baseline", help="compare against this results JSON")
+    parser.add_argument("--save-baseline", help="write results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed relative slowdown")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(name)s - %(message)s")
+    results = run_benchmarks(args.datasets, args.scale, args.repeat)
+    print(format_results(results))
+
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, "w", encoding="utf-8") as handle:
+            json.dump(results, handle, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as handle:
+            baseline = json.load(handle)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+            for item in regressions:
+                print(
+                    f"  {item['dataset']} / {item['stage']} {item['metric']}: "
+                    f"{item['baseline']} -> {item['current']}"
+                )
+            return 1
+        print(f"\nNo regressions beyond {args.threshold:.0%}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,414 @@
+"""
+In-process result cache keyed by upload content hash and pipeline stage.
+
+Each stage of the pipeline (parsed frame, summary, figures, ...) gets its own
+entry so that reruns with an unchanged upload can skip the expensive work.
+Entries are evicted in LRU order once the configured memory budget is exceeded.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+CacheKey = Tuple[str, str]
+
+# Frames longer than this are sized from a row sample.
+SIZE_SAMPLE_ROWS = 10_000
+
+
+def hash_bytes(data: bytes) -> str:
+    """
+    Compute a stable content hash for uploaded file bytes.
+
+    Args:
+        data: Raw file contents.
+
+    Returns:
+        Hex digest identifying the content.
+    """
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def estimate_nbytes(value: Any) -> int:
+    """
+    Roughly estimate the in-memory size of a cached value.
+
+    Args:
+        value: Any object stored in the cache.
+
+    Returns:
+        Approximate size in bytes.
+    """
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return _pandas_nbytes(value)
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            estimate_nbytes(k) + estimate_nbytes(v) for k, v in value.items()
+        )
+    if isinstance(value, (list, tuple, set)):
+        return sys.getsizeof(value) + sum(estimate_nbytes(v) for v in value)
+
+    # matplotlib Figures: the RGBA canvas buffer dominates.
+    get_size = getattr(value, "get_size_inches", None)
+    if callable(get_size):
+        width, height = get_size()
+        return int(width * height * value.dpi ** 2 * 4)
+
+    return sys.getsizeof(value)
+
+
+def _pandas_nbytes(obj: pd.DataFrame | pd.Series) -> int:
+    """
+    Size of a pandas object; string payloads of long frames are extrapolated
+    from a row sample instead of measuring every Python object.
+    """
+    if len(obj) <= SIZE_SAMPLE_ROWS * 10:
+        return int(np.sum(obj.memory_usage(deep=True)))
+
+    frame = obj.to_frame() if isinstance(obj, pd.Series) else obj
+    total = int(frame.memory_usage(deep=False).sum())
+    positions = np.linspace(0, len(frame) - 1, SIZE_SAMPLE_ROWS).astype(np.int64)
+    scale = len(frame) / len(positions)
+    for i, dtype in enumerate(frame.dtypes):
+        if dtype == object or isinstance(dtype, pd.StringDtype):
+            sample = frame.iloc[positions, i]
+            payload = sample.memory_usage(deep=True, index=False) - sample.memory_usage(
+                deep=False, index=False
+            )
+            total += int(payload * scale)
+    return total
+
+
+class ResultCache:
+    """
+    Thread-safe LRU cache with a memory budget.
+
+    Keys are ``(content_hash, stage)`` pairs, so every pipeline stage of a
+    given upload is stored and evicted independently.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[CacheKey, Tuple[Any, int]]" = OrderedDict()
+        self._last_used: Dict[CacheKey, float] = {}
+        self._lock = threading.RLock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, key: CacheKey) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    @property
+    def current_bytes(self) -> int:
+        """Total estimated size of all cached entries."""
+        return self._bytes
+
+    def get(self, digest: str, stage: str, default: Any = None) -> Any:
+        """
+        Look up a cached stage result and mark it as recently used.
+
+        Args:
+            digest: Content hash of the upload.
+            stage: Pipeline stage name.
+            default: Value returned on a miss.
+
+        Returns:
+            The cached value or ``default``.
+        """
+        key = (digest, stage)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self._last_used[key] = time.monotonic()
+            self.hits += 1
+            return entry[0]
+
+    def put(self, digest: str, stage: str, value: Any, nbytes: int | None = None) -> None:
+        """
+        Store a stage result, evicting least recently used entries if needed.
+
+        Args:
+            digest: Content hash of the upload.
+            stage: Pipeline stage name.
+            value: Result to cache.
+            nbytes: Optional precomputed size; estimated when omitted.
+        """
+        key = (digest, stage)
+        size = estimate_nbytes(value) if nbytes is None else nbytes
+
+        if size > self.max_bytes:
+            logger.warning(
+                "Not caching %s/%s: %d bytes exceeds budget of %d bytes.",
+                digest[:8],
+                stage,
+                size,
+                self.max_bytes,
+            )
+            return
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (value, size)
+            self._last_used[key] = time.monotonic()
+            self._bytes += size
+            self._evict()
+
+    def get_or_compute(
+        self,
+        digest: str,
+        stage: str,
+        compute: Callable[[], Any],
+    ) -> Any:
+        """
+        Return the cached stage result, computing and storing it on a miss.
+
+        Args:
+            digest: Content hash of the upload.
+            stage: Pipeline stage name.
+            compute: Zero-argument callable producing the stage result.
+
+        Returns:
+            Cached or freshly computed value.
+        """
+        sentinel = object()
+        value = self.get(digest, stage, sentinel)
+        if value is not sentinel:
+            return value
+
+        logger.info("Cache miss for %s/%s; computing.", digest[:8], stage)
+        value = compute()
+        self.put(digest, stage, value)
+        return value
+
+    def invalidate(self, digest: str | None = None) -> None:
+        """
+        Drop cached entries.
+
+        Args:
+            digest: If given, only entries for this upload are removed.
+        """
+        with self._lock:
+            keys = [k for k in self._entries if digest is None or k[0] == digest]
+            for key in keys:
+                self.discard(*key)
+
+    def discard(self, digest: str, stage: str) -> int:
+        """
+        Drop one entry.
+
+        Returns:
+            Bytes freed (0 if the entry was absent).
+        """
+        with self._lock:
+            entry = self._entries.pop((digest, stage), None)
+            self._last_used.pop((digest, stage), None)
+            if entry is None:
+                return 0
+            self._bytes -= entry[1]
+            return entry[1]
+
+    def refresh_sizes(self, skip_stages: Tuple[str, ...] = ()) -> None:
+        """
+        Re-estimate entry sizes, e.g. after lazily rendered figures cached
+        their PNG bytes.
+
+        Args:
+            skip_stages: Stages whose size cannot change (e.g. parsed frames).
+        """
+        with self._lock:
+            items = [(k, v) for k, (v, _) in self._entries.items() if k[1] not in skip_stages]
+        sizes = {key: estimate_nbytes(value) for key, value in items}
+        with self._lock:
+            for key, size in sizes.items():
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._bytes += size - entry[1]
+                    self._entries[key] = (entry[0], size)
+
+    def resize(self, digest: str, stage: str) -> None:
+        """
+        Re-estimate one entry's size after it grew in place, e.g. once its
+        lazy figures rendered their PNG bytes, and evict if over budget.
+        """
+        with self._lock:
+            entry = self._entries.get((digest, stage))
+        if entry is None:
+            return
+        size = estimate_nbytes(entry[0])
+        with self._lock:
+            current = self._entries.get((digest, stage))
+            if current is None or current[0] is not entry[0]:
+                return
+            self._bytes += size - current[1]
+            self._entries[(digest, stage)] = (current[0], size)
+            self._evict()
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """Describe cached entries (digest, stage, bytes, last use)."""
+        with self._lock:
+            return [
+                {
+                    "digest": digest,
+                    "stage": stage,
+                    "bytes": size,
+                    "last_used": self._last_used.get((digest, stage), 0.0),
+                }
+                for (digest, stage), (_, size) in self._entries.items()
+            ]
+
+    def stats(self) -> Dict[str, int]:
+        """Return counters describing cache usage."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _evict(self) -> None:
+        while self._bytes > self.max_bytes and self._entries:
+            (digest, stage), (_, size) = self._entries.popitem(last=False)
+            self._last_used.pop((digest, stage), None)
+            self._bytes -= size
+            self.evictions += 1
+            logger.info("Evicted %s/%s (%d bytes) from result cache.", digest[:8], stage, size)
+
+
+_memos: List["DatasetMemo"] = []
+
+
+def dataset_memos() -> List["DatasetMemo"]:
+    """All DatasetMemo instances created in this process."""
+    return list(_memos)
+
+
+class DatasetMemo:
+    """
+    Small LRU memo of one derived artifact per dataset version.
+
+    Entries are keyed by an explicit dataset key (e.g. the upload hash) or, if
+    none is given, by the identity of the source DataFrame; identity-keyed
+    entries are dropped when the frame is garbage-collected.
+    """
+
+    def __init__(self, name: str, max_entries: int = 4) -> None:
+        self.name = name
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Any, Any]" = OrderedDict()
+        self._last_used: Dict[Any, float] = {}
+        self._sizes: Dict[Any, int] = {}
+        self._lock = threading.Lock()
+        _memos.append(self)
+
+    def get_or_compute(
+        self,
+        df: pd.DataFrame,
+        compute: Callable[[pd.DataFrame], Any],
+        dataset_key: Any = None,
+    ) -> Any:
+        """
+        Return the memoized artifact for ``df``, computing it on a miss.
+
+        Args:
+            df: Source DataFrame, treated as read-only.
+            compute: Callable building the artifact from ``df``.
+            dataset_key: Stable identifier of the dataset version.
+
+        Returns:
+            The (possibly shared) artifact.
+        """
+        key = dataset_key if dataset_key is not None else ("id", id(df))
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._last_used[key] = time.monotonic()
+                return self._entries[key]
+
+        value = compute(df)
+
+        with self._lock:
+            self._entries[key] = value
+            self._last_used[key] = time.monotonic()
+            self._sizes.pop(key, None)
+            while len(self._entries) > self.max_entries:
+                old_key, _ = self._entries.popitem(last=False)
+                self._last_used.pop(old_key, None)
+                self._sizes.pop(old_key, None)
+
+        if dataset_key is None:
+            # id() values are reused once df is garbage-collected.
+            weakref.finalize(df, self.forget, key)
+        return value
+
+    def forget(self, key: Any) -> int:
+        """
+        Drop the entry for ``key`` if present.
+
+        Returns:
+            Estimated bytes freed.
+        """
+        with self._lock:
+            value = self._entries.pop(key, None)
+            self._last_used.pop(key, None)
+            size = self._sizes.pop(key, None)
+        if value is None:
+            return 0
+        return size if size is not None else estimate_nbytes(value)
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """Describe memoized artifacts (key, bytes, last use); sizes are cached."""
+        with self._lock:
+            items = list(self._entries.items())
+        described = []
+        for key, value in items:
+            size = self._sizes.get(key)
+            if size is None:
+                size = estimate_nbytes(value)
+                with self._lock:
+                    if key in self._entries:
+                        self._sizes[key] = size
+            described.append(
+                {
+                    "memo": self.name,
+                    "key": key,
+                    "bytes": size,
+                    "last_used": self._last_used.get(key, 0.0),
+                }
+            )
+        return described
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
@@ -0,0 +1,134 @@
+"""
+Bounded-cost column metadata for agent prompts.
+
+All statistics are taken from one uniform row sample of at most
+``DEFAULT_SAMPLE_ROWS`` rows, so building a prompt costs the same on a 1 GB
+frame as on a 1 MB one. The most frequent values of a text column are the
+heavy hitters of the sample. A value frequent enough to matter in a prompt
+is frequent in a uniform sample too; the full-column ``sketches.top_values``
+pass is kept for charts, whose counts must cover every row. Results are
+cached per dataset and shared by the Q&A and plot agents.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+from typing import Any, Dict, Hashable
+
+import numpy as np
+import pandas as pd
+
+from pipeline.cache import DatasetMemo
+from pipeline.sketches import top_values
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SAMPLE_ROWS = 50_000
+DEFAULT_SAMPLE_VALUES = 20
+
+_column_summaries = DatasetMemo("column_summary")
+
+
+def estimate_distinct(freq: np.ndarray, total_rows: int) -> int:
+    """
+    Estimate the number of distinct values in a column from a uniform sample.
+
+    Uses the GEE estimator: values seen once in the sample are scaled up by
+    ``sqrt(N / n)``, values seen more often are counted as-is.
+
+    Args:
+        freq: Occurrence count of each distinct value in the sample.
+        total_rows: Non-null rows in the full column.
+
+    Returns:
+        Estimated distinct count.
+    """
+    n = int(freq.sum())
+    if n == 0:
+        return 0
+    if n >= total_rows:
+        return int(freq.size)
+    singletons = int((freq == 1).sum())
+    if singletons == n:
+        # Every sampled value is unique: most likely a key-like column.
+        return int(total_rows)
+    estimate = math.sqrt(total_rows / n) * singletons + (freq.size - singletons)
+    return int(min(round(estimate), total_rows))
+
+
+def build_column_summary(
+    df: pd.DataFrame,
+    sample_rows: int = DEFAULT_SAMPLE_ROWS,
+    max_sample_values: int = DEFAULT_SAMPLE_VALUES,
+    seed: int = 0,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Collect dtype, null ratio, approximate cardinality and the most frequent
+    values of text-like columns in a single bounded pass over a row sample.
+
+    Args:
+        df: Input DataFrame.
+        sample_rows: Maximum rows sampled.
+        max_sample_values: Most frequent values reported per text column.
+        seed: Random seed for the row sample.
+
+    Returns:
+        Mapping from column name to metadata dict with ``dtype``,
+        ``null_ratio``, ``approx_distinct`` and, for text-like columns,
+        ``sample_values``.
+    """
+    rows = len(df)
+    if rows > sample_rows:
+        rng = np.random.default_rng(seed)
+        sample = df.take(np.sort(rng.choice(rows, size=sample_rows, replace=False)))
+    else:
+        sample = df
+    scale = rows / max(len(sample), 1)
+
+    summary: Dict[str, Dict[str, Any]] = {}
+    for col in df.columns:
+        series = sample[col]
+        present = series.dropna()
+        null_ratio = 1.0 - len(present) / len(series) if len(series) else 0.0
+        info: Dict[str, Any] = {
+            "dtype": str(df[col].dtype),
+            "null_ratio": round(null_ratio, 4),
+        }
+
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            info["approx_distinct"] = len(series.cat.categories)
+            top = [value for value, _, _ in top_values(series, top_n=max_sample_values)]
+        else:
+            counts = present.value_counts()
+            info["approx_distinct"] = estimate_distinct(
+                counts.to_numpy(), round(len(present) * scale)
+            )
+            top = counts.index[:max_sample_values]
+
+        # For text-like columns, include the most frequent values
+        if (
+            pd.api.types.is_object_dtype(series)
+            or pd.api.types.is_string_dtype(series)
+            or isinstance(series.dtype, pd.CategoricalDtype)
+        ):
+            info["sample_values"] = [str(value) for value in top]
+
+        summary[col] = info
+
+    logger.info("Built column summary for %d columns from %d sampled rows.", len(summary), len(sample))
+    return summary
+
+
+def get_column_summary(df: pd.DataFrame, dataset_key: Hashable | None = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Return the cached column summary for ``df``, building it on first use.
+
+    Args:
+        df: DataFrame the prompt describes (e.g. the normalized frame).
+        dataset_key: Stable identifier of the dataset version.
+
+    Returns:
+        Shared column summary (treat as read-only).
+    """
+    return _column_summaries.get_or_compute(df, build_column_summary, dataset_key)
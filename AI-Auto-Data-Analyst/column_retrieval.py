@@ -0,0 +1,190 @@
+"""
+Question-relevant column retrieval for agent prompts on wide datasets.
+
+A local TF-IDF index over character n-grams of each column's name, dtype and
+sample values is built once per dataset (no network access). Only the top-k
+columns for a question are described in the prompt; helpers report columns
+that generated code references but the prompt left out, so the agents can
+retry with them.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Any, Dict, Hashable, Iterable, List, Sequence, Tuple
+
+import pandas as pd
+
+from pipeline.cache import DatasetMemo
+from pipeline.column_metadata import get_column_summary
+
+logger = logging.getLogger(__name__)
+
+# Datasets with at most this many columns are always described in full.
+MAX_PROMPT_COLUMNS = 40
+NGRAM_RANGE = (3, 4)
+NAME_WEIGHT = 3
+
+_indexes = DatasetMemo("column_index")
+
+_STRING_LITERAL = re.compile(r"""(['"])(.*?)(?<!\\)\1""")
+_ATTRIBUTE = re.compile(r"\.([A-Za-z_][A-Za-z0-9_]*)")
+
+
+def _words(text: str) -> List[str]:
+    text = re.sub(r"([a-z0-9])([A-Z])", r"\1 \2", str(text))
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+def _ngrams(text: str) -> Counter:
+    grams: Counter = Counter()
+    for word in _words(text):
+        padded = f" {word} "
+        for n in range(NGRAM_RANGE[0], NGRAM_RANGE[1] + 1):
+            for i in range(max(len(padded) - n + 1, 1)):
+                grams[padded[i : i + n]] += 1
+    return grams
+
+
+class ColumnIndex:
+    """TF-IDF index over character n-grams describing each column."""
+
+    def __init__(self, column_summary: Dict[Any, Dict[str, Any]]) -> None:
+        self.columns: List[Any] = list(column_summary)
+        self._name_words = {col: " ".join(_words(col)) for col in self.columns}
+
+        docs: List[Counter] = []
+        for col, info in column_summary.items():
+            grams = Counter()
+            for gram, count in _ngrams(str(col)).items():
+                grams[gram] += NAME_WEIGHT * count
+            grams.update(_ngrams(info.get("dtype", "")))
+            grams.update(_ngrams(" ".join(map(str, info.get("sample_values", [])))))
+            docs.append(grams)
+
+        doc_freq: Counter = Counter()
+        for grams in docs:
+            doc_freq.update(grams.keys())
+        n_docs = len(docs)
+        self._idf = {
+            gram: math.log((1 + n_docs) / (1 + freq)) + 1.0 for gram, freq in doc_freq.items()
+        }
+
+        self._postings: Dict[str, List[Tuple[int, float]]] = defaultdict(list)
+        for idx, grams in enumerate(docs):
+            weights = {gram: count * self._idf[gram] for gram, count in grams.items()}
+            norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+            for gram, weight in weights.items():
+                self._postings[gram].append((idx, weight / norm))
+
+    def search(self, query: str, k: int) -> List[Any]:
+        """
+        Rank columns by relevance to ``query``.
+
+        Columns whose name appears verbatim in the query always rank first.
+
+        Args:
+            query: Natural-language question or identifier.
+            k: Number of columns to return.
+
+        Returns:
+            Up to ``k`` column names, most relevant first.
+        """
+        grams = _ngrams(query)
+        weights = {gram: count * self._idf[gram] for gram, count in grams.items() if gram in self._idf}
+        norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+
+        scores = [0.0] * len(self.columns)
+        for gram, weight in weights.items():
+            for idx, doc_weight in self._postings[gram]:
+                scores[idx] += weight / norm * doc_weight
+
+        query_words = f" {' '.join(_words(query))} "
+        for idx, col in enumerate(self.columns):
+            name = self._name_words[col]
+            if name and f" {name} " in query_words:
+                scores[idx] += 1.0
+
+        ranked = sorted(range(len(self.columns)), key=lambda i: (-scores[i], i))
+        return [self.columns[i] for i in ranked[:k]]
+
+
+def get_column_index(df_norm: pd.DataFrame, dataset_key: Hashable | None = None) -> ColumnIndex:
+    """
+    Return the cached column index for a (normalized) frame.
+
+    Args:
+        df_norm: Frame the agent prompts describe.
+        dataset_key: Stable identifier of the dataset version.
+
+    Returns:
+        Shared ColumnIndex.
+    """
+    return _indexes.get_or_compute(
+        df_norm,
+        lambda frame: ColumnIndex(get_column_summary(frame, dataset_key)),
+        dataset_key,
+    )
+
+
+def select_prompt_columns(
+    df_norm: pd.DataFrame,
+    question: str,
+    dataset_key: Hashable | None = None,
+    max_columns: int = MAX_PROMPT_COLUMNS,
+) -> List[Any]:
+    """
+    Pick the columns to describe in a prompt for ``question``.
+
+    Returns:
+        All columns for narrow frames; otherwise the ``max_columns`` most
+        relevant ones, in the frame's column order.
+    """
+    columns = df_norm.columns.tolist()
+    if len(columns) <= max_columns:
+        return columns
+
+    chosen = set(get_column_index(df_norm, dataset_key).search(question, max_columns))
+    logger.info("Selected %d of %d columns for the prompt.", len(chosen), len(columns))
+    return [col for col in columns if col in chosen]
+
+
+def referenced_columns(code: str, columns: Iterable[Any], selected: Sequence[Any]) -> List[Any]:
+    """
+    Columns referenced by generated code (as string literals or attributes)
+    that were not described in the prompt.
+
+    Args:
+        code: Generated Python code.
+        columns: All columns of the frame.
+        selected: Columns included in the prompt.
+
+    Returns:
+        Newly referenced column names, in frame order.
+    """
+    names = {match.group(2) for match in _STRING_LITERAL.finditer(code)}
+    names.update(match.group(1) for match in _ATTRIBUTE.finditer(code))
+    chosen = set(selected)
+    return [col for col in columns if col in names and col not in chosen]
+
+
+def suggest_columns(
+    df_norm: pd.DataFrame,
+    missing_name: str,
+    selected: Sequence[Any],
+    dataset_key: Hashable | None = None,
+    k: int = 5,
+) -> List[Any]:
+    """
+    Columns resembling a name the generated code used but that does not exist
+    (e.g. from a KeyError), excluding those already in the prompt.
+
+    Returns:
+        Up to ``k`` additional column names.
+    """
+    chosen = set(selected)
+    index = get_column_index(df_norm, dataset_key)
+    return [col for col in index.search(missing_name, k + len(chosen)) if col not in chosen][:k]
@@ -1,23 +1,44 @@
-from dotenv import load_dotenv
-load_dotenv()
-
 """
 Project configuration module.
 
 Loads environment variables and exposes strongly-typed settings
-for the rest of the application.
+for the rest of the application. Nothing is read at import time: the
+``.env`` file and environment are loaded on the first ``get_settings()``
+call (or first access to ``config.settings``).
 """
 
 from dataclasses import dataclass
 import os
-from typing import Optional
+import threading
+from typing import Any, Optional
 
 
 @dataclass
 class Settings:
     """Application-level configuration."""
-    gemini_api_key: str
+    gemini_api_key: Optional[str] = None
     gemini_model_name: str = "models/gemini-2.5-flash"
+    cache_max_mb: int = 2048
+    ingest_memory_limit_mb: Optional[float] = None
+    render_workers: Optional[int] = None
+    llm_cache_path: Optional[str] = ".cache/llm_responses.sqlite"
+    llm_cache_max_mb: int = 256
+    llm_cache_ttl_hours: Optional[float] = 168.0
+    llm_timeout_seconds: float = 60.0
+    llm_max_retries: int = 2
+    sandbox_workers: int = 2
+    sandbox_timeout_seconds: float = 30.0
+    sandbox_memory_limit_mb: float = 2048.0
+    qa_engine: str = "auto"
+    sql_engine_min_rows: int = 5_000_000
+    dataset_store_dir: Optional[str] = ".cache/datasets"
+    dataset_store_max_mb: int = 20480
+    memory_budget_mb: int = 4096
+    session_idle_minutes: float = 30.0
+    insights_token_budget: int = 2000
+    tracing_enabled: bool = True
+    batch_workers: Optional[int] = None
+    batch_llm_concurrency: int = 4
 
     @classmethod
     def from_env(cls) -> "Settings":
@@ -25,19 +46,108 @@ class Settings:
         Load settings from environment variables.
 
         Expected:
-            GEMINI_API_KEY: str
+            GEMINI_API_KEY: Optional[str] (AI features are disabled without it)
             GEMINI_MODEL_NAME: Optional[str]
+            CACHE_MAX_MB: Optional[int] (result cache memory budget)
+            INGEST_MEMORY_LIMIT_MB: Optional[float] (max size of a loaded upload)
+            RENDER_WORKERS: Optional[int] (chart rendering processes; 1 = serial)
+            LLM_CACHE_PATH: Optional[str] (response cache file; empty disables it)
+            LLM_CACHE_MAX_MB: Optional[int] (response cache size budget)
+            LLM_CACHE_TTL_HOURS: Optional[float] (response lifetime; empty = no expiry)
+            LLM_TIMEOUT_SECONDS: Optional[float] (per call, or per streamed chunk)
+            LLM_MAX_RETRIES: Optional[int] (retries after transient errors)
+            SANDBOX_WORKERS: Optional[int] (processes for generated code; 0 = in-process)
+            SANDBOX_TIMEOUT_SECONDS: Optional[float] (wall-clock limit per execution)
+            SANDBOX_MEMORY_LIMIT_MB: Optional[float] (memory limit per worker)
+            QA_ENGINE: Optional[str] ("auto", "pandas" or "sql")
+            SQL_ENGINE_MIN_ROWS: Optional[int] (rows from which "auto" uses SQL)
+            DATASET_STORE_DIR: Optional[str] (ingested dataset files; empty disables)
+            DATASET_STORE_MAX_MB: Optional[int] (disk budget of the dataset store)
+            MEMORY_BUDGET_MB: Optional[int] (frames and derived artifacts, all sessions)
+            SESSION_IDLE_MINUTES: Optional[float] (idle time before a session stops
+                pinning its dataset)
+            INSIGHTS_TOKEN_BUDGET: Optional[int] (approximate size of the summary
+                sent for insights)
+            TRACING_ENABLED: Optional[str] ("0"/"false" turns off stage tracing)
+            BATCH_WORKERS: Optional[int] (analysis processes in batch mode;
+                empty = CPU count)
+            BATCH_LLM_CONCURRENCY: Optional[int] (concurrent insight requests in
+                batch mode)
         """
-        api_key: Optional[str] = os.getenv("GEMINI_API_KEY")
-        if not api_key:
-            raise ValueError(
-                "GEMINI_API_KEY is not set. "
-                "Set it in your environment or .env file."
-            )
+        api_key: Optional[str] = os.getenv("GEMINI_API_KEY") or None
 
         model_name: str = os.getenv("GEMINI_MODEL_NAME", "models/gemini-2.5-flash")
-        return cls(gemini_api_key=api_key, gemini_model_name=model_name)
+        cache_max_mb: int = int(os.getenv("CACHE_MAX_MB", "2048"))
+        ingest_limit: Optional[str] = os.getenv("INGEST_MEMORY_LIMIT_MB")
+        render_workers: Optional[str] = os.getenv("RENDER_WORKERS")
+        llm_cache_path: str = os.getenv("LLM_CACHE_PATH", ".cache/llm_responses.sqlite")
+        llm_cache_max_mb: int = int(os.getenv("LLM_CACHE_MAX_MB", "256"))
+        llm_cache_ttl: str = os.getenv("LLM_CACHE_TTL_HOURS", "168")
+        llm_timeout: float = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+        llm_max_retries: int = int(os.getenv("LLM_MAX_RETRIES", "2"))
+        sandbox_workers: int = int(os.getenv("SANDBOX_WORKERS", "2"))
+        sandbox_timeout: float = float(os.getenv("SANDBOX_TIMEOUT_SECONDS", "30"))
+        sandbox_memory: float = float(os.getenv("SANDBOX_MEMORY_LIMIT_MB", "2048"))
+        qa_engine: str = os.getenv("QA_ENGINE", "auto")
+        sql_min_rows: int = int(os.getenv("SQL_ENGINE_MIN_ROWS", "5000000"))
+        store_dir: str = os.getenv("DATASET_STORE_DIR", ".cache/datasets")
+        store_max_mb: int = int(os.getenv("DATASET_STORE_MAX_MB", "20480"))
+        memory_budget_mb: int = int(os.getenv("MEMORY_BUDGET_MB", "4096"))
+        session_idle: float = float(os.getenv("SESSION_IDLE_MINUTES", "30"))
+        insights_budget: int = int(os.getenv("INSIGHTS_TOKEN_BUDGET", "2000"))
+        tracing: str = os.getenv("TRACING_ENABLED", "1")
+        batch_workers: Optional[str] = os.getenv("BATCH_WORKERS")
+        batch_llm_concurrency: int = int(os.getenv("BATCH_LLM_CONCURRENCY", "4"))
+        return cls(
+            gemini_api_key=api_key,
+            gemini_model_name=model_name,
+            cache_max_mb=cache_max_mb,
+            ingest_memory_limit_mb=float(ingest_limit) if ingest_limit else None,
+            render_workers=int(render_workers) if render_workers else None,
+            llm_cache_path=llm_cache_path or None,
+            llm_cache_max_mb=llm_cache_max_mb,
+            llm_cache_ttl_hours=float(llm_cache_ttl) if llm_cache_ttl else None,
+            llm_timeout_seconds=llm_timeout,
+            llm_max_retries=llm_max_retries,
+            sandbox_workers=sandbox_workers,
+            sandbox_timeout_seconds=sandbox_timeout,
+            sandbox_memory_limit_mb=sandbox_memory,
+            qa_engine=qa_engine,
+            sql_engine_min_rows=sql_min_rows,
+            dataset_store_dir=store_dir or None,
+            dataset_store_max_mb=store_max_mb,
+            memory_budget_mb=memory_budget_mb,
+            session_idle_minutes=session_idle,
+            insights_token_budget=insights_budget,
+            tracing_enabled=tracing.strip().lower() not in ("0", "false", "no", "off"),
+            batch_workers=int(batch_workers) if batch_workers else None,
+            batch_llm_concurrency=batch_llm_concurrency,
+        )
+
+    @property
+    def llm_configured(self) -> bool:
+        """Whether an API key is available for the Gemini features."""
+        return bool(self.gemini_api_key)
+
+
+_settings: Optional[Settings] = None
+_settings_lock = threading.Lock()
+
+
+def get_settings() -> Settings:
+    """Load ``.env`` and the environment once, then return the shared settings."""
+    global _settings
+    with _settings_lock:
+        if _settings is None:
+            from dotenv import load_dotenv
+
+            load_dotenv()
+            _settings = Settings.from_env()
+        return _settings
 
 
-# Convenience singleton
-settings = Settings.from_env()
+def __getattr__(name: str) -> Any:
+    # Convenience singleton: ``from config import settings`` loads it lazily.
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,256 @@
+"""
+Scalable correlation analysis for wide numeric frames.
+
+Columns are standardized once into a float32 buffer. The correlation matrix
+is computed block by block across a thread pool, so the full N x N matrix is
+never materialized. Missing values are handled pairwise, like
+``DataFrame.corr``. The result keeps only what the UI and the LLM need: the
+strongest pairs and a clustered heatmap of the most connected columns.
+"""
+
+from __future__ import annotations
+
+import heapq
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOP_K = 20
+DEFAULT_HEATMAP_COLS = 40
+DEFAULT_BLOCK_COLS = 256
+DEFAULT_MAX_ROWS = 1_000_000
+# Budget for the z-score buffer plus validity mask (8 bytes per cell).
+DEFAULT_MAX_BUFFER_BYTES = 512 * 1024 * 1024
+MIN_SAMPLE_ROWS = 1_000
+
+
+@dataclass
+class CorrelationResult:
+    """Strongest correlations plus a truncated, clustered heatmap matrix."""
+
+    columns: List[str]
+    top_pairs: List[Tuple[str, str, float]]
+    heatmap_columns: List[str]
+    heatmap: np.ndarray
+    rows_used: int
+
+    def top_pairs_dict(self, n: int | None = None) -> List[Dict[str, Any]]:
+        """JSON-friendly list of the strongest pairs, e.g. for LLM prompts."""
+        pairs = self.top_pairs if n is None else self.top_pairs[:n]
+        return [{"a": a, "b": b, "r": round(r, 4)} for a, b, r in pairs]
+
+    def heatmap_frame(self) -> pd.DataFrame:
+        """Heatmap matrix labelled with its (clustered) column order."""
+        return pd.DataFrame(self.heatmap, index=self.heatmap_columns, columns=self.heatmap_columns)
+
+
+def compute_correlations(
+    df: pd.DataFrame,
+    numeric_cols: List[str],
+    top_k: int = DEFAULT_TOP_K,
+    max_heatmap_cols: int = DEFAULT_HEATMAP_COLS,
+    block_cols: int = DEFAULT_BLOCK_COLS,
+    max_rows: int = DEFAULT_MAX_ROWS,
+    n_jobs: int | None = None,
+    max_buffer_bytes: int = DEFAULT_MAX_BUFFER_BYTES,
+) -> CorrelationResult | None:
+    """
+    Compute Pearson correlations in float32 column blocks.
+
+    Correlations are pairwise-complete: each pair uses only rows where both
+    columns are present (pairs with fewer than two such rows, or no spread in
+    them, report 0). Frames longer than ``max_rows`` are sampled uniformly;
+    wide frames are sampled further so the buffers fit ``max_buffer_bytes``.
+
+    Args:
+        df: Input DataFrame.
+        numeric_cols: Columns to correlate.
+        top_k: Number of strongest pairs (by absolute r) to keep.
+        max_heatmap_cols: Columns kept in the heatmap, chosen by total
+            absolute correlation with all other columns.
+        block_cols: Columns per matrix block.
+        max_rows: Row sample cap.
+        n_jobs: Worker threads (defaults to CPU count).
+        max_buffer_bytes: Memory for the column x row z-score buffer and
+            validity mask; lowers the row cap as columns are added (never
+            below MIN_SAMPLE_ROWS).
+
+    Returns:
+        CorrelationResult, or None if fewer than two usable columns.
+    """
+    rows = len(df)
+    buffer_rows = max_buffer_bytes // (8 * max(len(numeric_cols), 1))
+    max_rows = min(max_rows, max(MIN_SAMPLE_ROWS, buffer_rows))
+    row_idx = None
+    if rows > max_rows:
+        rng = np.random.default_rng(0)
+        row_idx = np.sort(rng.choice(rows, size=max_rows, replace=False))
+
+    z, mask, columns = _standardize(df, numeric_cols, row_idx)
+    if len(columns) < 2:
+        logger.info("Not enough non-constant numeric columns for correlations.")
+        return None
+
+    n_rows = z.shape[1]
+    p = len(columns)
+    starts = list(range(0, p, block_cols))
+    block_pairs = [(i, j) for i in starts for j in starts if j >= i]
+
+    def run_block(pair: Tuple[int, int]) -> Tuple[List[Tuple[float, int, int]], np.ndarray]:
+        i, j = pair
+        a, b = slice(i, i + block_cols), slice(j, j + block_cols)
+        block = _pairwise_corr(z, mask, a, b, n_rows)
+        abs_block = np.abs(block)
+
+        strength = np.zeros(p, dtype="float64")
+        strength[i : i + block.shape[0]] += abs_block.sum(axis=1)
+        if j != i:
+            strength[j : j + block.shape[1]] += abs_block.sum(axis=0)
+
+        if i == j:
+            abs_block = np.triu(abs_block, k=1)
+        flat = abs_block.ravel()
+        k = min(top_k, flat.size)
+        candidates = np.argpartition(flat, -k)[-k:] if k else []
+        best = []
+        for idx in candidates:
+            r_idx, c_idx = divmod(int(idx), block.shape[1])
+            if flat[idx] > 0:
+                best.append((float(block[r_idx, c_idx]), i + r_idx, j + c_idx))
+        return best, strength
+
+    workers = min(n_jobs or os.cpu_count() or 1, len(block_pairs))
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(run_block, block_pairs))
+    else:
+        results = [run_block(pair) for pair in block_pairs]
+
+    candidates: List[Tuple[float, int, int]] = []
+    strength = np.zeros(p, dtype="float64")
+    for best, block_strength in results:
+        candidates.extend(best)
+        strength += block_strength
+    strength -= 1.0  # self-correlation on the diagonal
+
+    top = heapq.nlargest(top_k, candidates, key=lambda item: abs(item[0]))
+    top_pairs = [(columns[a], columns[b], r) for r, a, b in top]
+
+    keep = np.sort(np.argsort(-strength, kind="stable")[:max_heatmap_cols])
+    sub = _pairwise_corr(z, mask, keep, keep, n_rows)
+    order = _cluster_order(sub)
+    heatmap_columns = [columns[keep[i]] for i in order]
+    heatmap = sub[np.ix_(order, order)]
+
+    logger.info(
+        "Computed correlations for %d columns (%d rows); heatmap shows %d.",
+        p,
+        n_rows,
+        len(heatmap_columns),
+    )
+    return CorrelationResult(
+        columns=columns,
+        top_pairs=top_pairs,
+        heatmap_columns=heatmap_columns,
+        heatmap=heatmap,
+        rows_used=n_rows,
+    )
+
+
+def _pairwise_corr(
+    z: np.ndarray,
+    mask: np.ndarray | None,
+    a: Any,
+    b: Any,
+    n_rows: int,
+) -> np.ndarray:
+    """
+    Correlations between column selections ``a`` and ``b`` of ``z``.
+
+    Without missing values this is a single product of z-scores. Otherwise the
+    per-pair count, sums and sums of squares come from products with the
+    validity mask, so every pair is normalized by its own complete rows.
+    """
+    za, zb = z[a], z[b]
+    if mask is None:
+        block = (za @ zb.T) / (n_rows - 1)
+    else:
+        ma, mb = mask[a], mask[b]
+        count = ma @ mb.T
+        sum_a = za @ mb.T
+        sum_b = ma @ zb.T
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cov = za @ zb.T - sum_a * sum_b / count
+            var_a = np.square(za) @ mb.T - sum_a * sum_a / count
+            var_b = ma @ np.square(zb).T - sum_b * sum_b / count
+            block = cov / np.sqrt(var_a * var_b)
+        block[~np.isfinite(block) | (count < 2)] = 0.0
+    np.clip(block, -1.0, 1.0, out=block)
+    return block
+
+
+def _standardize(
+    df: pd.DataFrame,
+    numeric_cols: List[str],
+    row_idx: np.ndarray | None,
+) -> Tuple[np.ndarray, np.ndarray | None, List[str]]:
+    """
+    Build a (columns, rows) float32 buffer of z-scores with NaNs set to 0, plus
+    a matching 0/1 validity mask (None when nothing is missing).
+    """
+    n_rows = len(df) if row_idx is None else len(row_idx)
+    z = np.empty((len(numeric_cols), n_rows), dtype="float32")
+    valid: np.ndarray | None = None
+    kept: List[str] = []
+
+    for col in numeric_cols:
+        values = df[col].to_numpy(dtype="float64", na_value=np.nan)
+        if row_idx is not None:
+            values = values[row_idx]
+        mask = np.isnan(values)
+        present = values[~mask]
+        if present.size < 2:
+            continue
+        std = present.std(ddof=1)
+        if not np.isfinite(std) or std == 0:
+            continue
+        row = z[len(kept)]
+        row[:] = (values - present.mean()) / std
+        row[mask] = 0.0
+        if mask.any():
+            if valid is None:
+                valid = np.ones((len(numeric_cols), n_rows), dtype="float32")
+            valid[len(kept)][mask] = 0.0
+        kept.append(col)
+
+    return z[: len(kept)], (valid[: len(kept)] if valid is not None else None), kept
+
+
+def _cluster_order(corr: np.ndarray) -> List[int]:
+    """
+    Leaf order of average-linkage clustering on ``1 - |r|`` so that strongly
+    correlated columns sit next to each other in the heatmap.
+    """
+    n = corr.shape[0]
+    dist = 1.0 - np.abs(corr.astype("float64"))
+    clusters: Dict[int, List[int]] = {i: [i] for i in range(n)}
+
+    while len(clusters) > 1:
+        ids = list(clusters)
+        best = None
+        for a_pos, a in enumerate(ids):
+            for b in ids[a_pos + 1 :]:
+                d = dist[np.ix_(clusters[a], clusters[b])].mean()
+                if best is None or d < best[0]:
+                    best = (d, a, b)
+        _, a, b = best
+        clusters[a] = clusters[a] + clusters.pop(b)
+
+    return next(iter(clusters.values())) if clusters else []
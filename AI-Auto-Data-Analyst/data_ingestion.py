@@ -5,21 +5,39 @@ Data ingestion and basic validation utilities.
 from __future__ import annotations
 
 import logging
-from typing import Tuple, List
+import warnings
+from typing import Any, Dict, IO, Iterator, Tuple, List, Union
 
 import pandas as pd
 import numpy as np
 
 logger = logging.getLogger(__name__)
 
+CsvSource = Union[str, IO]
 
-def load_csv(file_path: str, encoding: str | None = None) -> pd.DataFrame:
+DEFAULT_SAMPLE_ROWS = 10_000
+DEFAULT_CHUNK_MEMORY_MB = 256
+# Next wider dtype for a column whose later values do not fit the sampled one.
+# Columns that turn into text use the compact string dtype: they are re-read
+# from the first row, so their size counts against the whole memory ceiling.
+WIDER_DTYPES = {"boolean": "str", "Int64": "float64", "float64": "str"}
+TEXT_DTYPES = ("object", "str")
+
+
+def load_csv(
+    file_path: CsvSource,
+    encoding: str | None = None,
+    memory_limit_mb: float | None = None,
+) -> pd.DataFrame:
     """
     Load a CSV file into a pandas DataFrame.
 
     Args:
-        file_path: Path to the CSV file.
+        file_path: Path to the CSV file (or an open file-like object).
         encoding: Optional file encoding.
+        memory_limit_mb: Optional ceiling for the loaded frame. When set, the
+            file is streamed in chunks and loading stops as soon as the
+            ceiling is exceeded instead of exhausting the worker's memory.
 
     Returns:
         Loaded DataFrame.
@@ -27,12 +45,16 @@ def load_csv(file_path: str, encoding: str | None = None) -> pd.DataFrame:
     Raises:
         FileNotFoundError: If file does not exist.
         ValueError: If DataFrame is empty.
+        MemoryError: If the data does not fit within ``memory_limit_mb``.
     """
     logger.info("Loading CSV from %s", file_path)
     try:
-        df = pd.read_csv(file_path, encoding=encoding)
-    except FileNotFoundError as exc:
-        logger.error("File not found: %s", file_path)
+        if memory_limit_mb is None:
+            df = pd.read_csv(file_path, encoding=encoding)
+        else:
+            df = _load_csv_bounded(file_path, encoding, memory_limit_mb)
+    except (FileNotFoundError, MemoryError) as exc:
+        logger.error("Could not load %s: %s", file_path, exc)
         raise
     except Exception as exc:  # noqa: BLE001
         logger.exception("Unexpected error while reading CSV")
@@ -47,6 +69,225 @@ def load_csv(file_path: str, encoding: str | None = None) -> pd.DataFrame:
     return df
 
 
+def infer_csv_dtypes(
+    source: CsvSource,
+    sample_rows: int = DEFAULT_SAMPLE_ROWS,
+    encoding: str | None = None,
+) -> Tuple[Dict[str, Any], float]:
+    """
+    Infer per-column dtypes from the first rows of a CSV file.
+
+    Integer columns map to the nullable ``Int64`` dtype so that missing values
+    further down the file do not break parsing.
+
+    Args:
+        source: Path or file-like object. File-like objects are rewound.
+        sample_rows: Number of rows to sample.
+        encoding: Optional file encoding.
+
+    Returns:
+        Tuple of (dtype mapping for ``pd.read_csv``, estimated bytes per row).
+    """
+    _rewind(source)
+    sample = pd.read_csv(source, nrows=sample_rows, encoding=encoding)
+    _rewind(source)
+
+    dtypes: Dict[str, Any] = {}
+    for col, dtype in sample.dtypes.items():
+        if pd.api.types.is_bool_dtype(dtype):
+            dtypes[col] = "boolean"
+        elif pd.api.types.is_integer_dtype(dtype):
+            dtypes[col] = "Int64"
+        elif pd.api.types.is_float_dtype(dtype):
+            dtypes[col] = "float64"
+        else:
+            dtypes[col] = "object"
+
+    rows = max(len(sample), 1)
+    bytes_per_row = float(sample.memory_usage(deep=True, index=False).sum()) / rows
+    logger.info(
+        "Inferred dtypes for %d columns from %d sample rows (~%.0f bytes/row)",
+        len(dtypes),
+        len(sample),
+        bytes_per_row,
+    )
+    return dtypes, max(bytes_per_row, 1.0)
+
+
+def _widen_dtypes(
+    source: CsvSource,
+    dtypes: Dict[str, Any],
+    start: int,
+    nrows: int,
+    encoding: str | None,
+) -> List[str]:
+    """
+    Widen the pinned dtypes of columns whose values in rows
+    ``[start, start + nrows)`` do not fit them (Int64 -> float64 -> str,
+    boolean -> str).
+
+    Returns:
+        Names of the widened columns (``dtypes`` is updated in place).
+    """
+    _rewind(source)
+    skip = range(1, start + 1) if start else None
+    rows = pd.read_csv(source, skiprows=skip, nrows=nrows, encoding=encoding)
+
+    widened: List[str] = []
+    for col, dtype in list(dtypes.items()):
+        if col not in rows:
+            continue
+        while dtype in WIDER_DTYPES:
+            try:
+                rows[col].astype(dtype)
+                break
+            except (TypeError, ValueError):
+                dtype = WIDER_DTYPES[dtype]
+        if dtype != dtypes[col]:
+            logger.info("Column %r changes type after row %d; reading it as %s.", col, start, dtype)
+            dtypes[col] = dtype
+            widened.append(col)
+    return widened
+
+
+def iter_csv_chunks(
+    source: CsvSource,
+    chunk_memory_mb: float = DEFAULT_CHUNK_MEMORY_MB,
+    sample_rows: int = DEFAULT_SAMPLE_ROWS,
+    encoding: str | None = None,
+    dtypes: Dict[str, Any] | None = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Stream a CSV file as DataFrame chunks that each fit a memory ceiling.
+
+    Dtypes are inferred once from a sample and enforced for every chunk. When
+    a later chunk does not fit them (say an integer column turns into floats
+    or text), the drifting columns are widened and reading resumes at that
+    chunk. Chunks already yielded keep their narrower dtype: Int64 and
+    float64 chunks concatenate cleanly, but a column widened to ``str``
+    holds native values in earlier chunks and raw text in later ones. Callers
+    that need one representation pass ``dtypes`` and start over when a column
+    turns into text, as ``load_csv`` does. The chunk size is derived
+    from the sample's bytes per row and re-adjusted whenever a chunk turns
+    out larger or much smaller than the ceiling.
+
+    Args:
+        source: Path or seekable file-like object.
+        chunk_memory_mb: Target upper bound for a single chunk in memory.
+        sample_rows: Rows used for dtype and row-size inference.
+        encoding: Optional file encoding.
+        dtypes: Optional dtypes to pin; columns missing from it are inferred
+            and added. Widened columns are updated in this dict in place.
+
+    Yields:
+        DataFrame chunks with a contiguous RangeIndex across the whole file.
+
+    Raises:
+        ValueError: If a chunk cannot be parsed even with widened dtypes.
+    """
+    limit_bytes = chunk_memory_mb * 1024 * 1024
+    inferred, bytes_per_row = infer_csv_dtypes(source, sample_rows, encoding)
+    if dtypes is None:
+        dtypes = inferred
+    else:
+        for col, dtype in inferred.items():
+            dtypes.setdefault(col, dtype)
+    chunk_rows = max(int(limit_bytes / bytes_per_row), 1)
+
+    rows_read = 0
+    finished = False
+    while not finished:
+        # Re-opened after widening, skipping the rows already yielded.
+        _rewind(source)
+        skip = range(1, rows_read + 1) if rows_read else None
+        with pd.read_csv(
+            source, dtype=dtypes, skiprows=skip, encoding=encoding, iterator=True
+        ) as reader:
+            while True:
+                try:
+                    chunk = reader.get_chunk(chunk_rows)
+                except StopIteration:
+                    finished = True
+                    break
+                except (TypeError, ValueError) as exc:
+                    if not _widen_dtypes(source, dtypes, rows_read, chunk_rows, encoding):
+                        last = rows_read + chunk_rows
+                        raise ValueError(
+                            f"Could not parse CSV rows {rows_read + 1}-{last}: {exc}"
+                        ) from exc
+                    break
+
+                chunk.index = pd.RangeIndex(rows_read, rows_read + len(chunk))
+                rows_read += len(chunk)
+
+                chunk_bytes = int(chunk.memory_usage(deep=True, index=False).sum())
+                if chunk_bytes > limit_bytes or chunk_bytes < limit_bytes / 2:
+                    bytes_per_row = max(chunk_bytes / max(len(chunk), 1), 1.0)
+                    chunk_rows = max(int(limit_bytes / bytes_per_row), 1)
+                    logger.debug("Resized CSV chunks to %d rows", chunk_rows)
+
+                yield chunk
+
+    logger.info("Streamed %d rows from CSV", rows_read)
+
+
+def _load_csv_bounded(
+    source: CsvSource,
+    encoding: str | None,
+    memory_limit_mb: float,
+) -> pd.DataFrame:
+    """
+    Concatenate CSV chunks, failing fast once the memory ceiling is hit.
+
+    If a column turns into text partway through, the chunks collected so far
+    hold its values in the old dtype; loading then starts over with the
+    column read as text from the first row, so it has a single representation.
+    """
+    limit_bytes = memory_limit_mb * 1024 * 1024
+    chunk_memory_mb = min(DEFAULT_CHUNK_MEMORY_MB, memory_limit_mb / 4)
+
+    dtypes: Dict[str, Any] = {}
+    chunks: List[pd.DataFrame] = []
+    restart = True
+    while restart:
+        restart = False
+        chunks = []
+        total_bytes = 0
+        text_cols = {col for col, dtype in dtypes.items() if dtype in TEXT_DTYPES}
+        reader = iter_csv_chunks(
+            source, chunk_memory_mb=chunk_memory_mb, encoding=encoding, dtypes=dtypes
+        )
+        for chunk in reader:
+            widened = {col for col, dtype in dtypes.items() if dtype in TEXT_DTYPES} - text_cols
+            if widened and chunks:
+                logger.info(
+                    "Column(s) %s turned into text; re-reading the CSV from the start.",
+                    ", ".join(map(repr, sorted(widened))),
+                )
+                reader.close()
+                restart = True
+                break
+            text_cols |= widened
+            total_bytes += int(chunk.memory_usage(deep=True, index=False).sum())
+            if total_bytes > limit_bytes:
+                raise MemoryError(
+                    f"CSV exceeds the {memory_limit_mb:.0f} MB memory limit; "
+                    "use iter_csv_chunks to process it in chunks."
+                )
+            chunks.append(chunk)
+
+    if not chunks:
+        return pd.DataFrame()
+    return pd.concat(chunks) if len(chunks) > 1 else chunks[0]
+
+
+def _rewind(source: CsvSource) -> None:
+    """Seek file-like sources back to the start so they can be re-read."""
+    seek = getattr(source, "seek", None)
+    if callable(seek):
+        seek(0)
+
+
 def infer_column_types(df: pd.DataFrame) -> Tuple[List[str], List[str]]:
     """
     Infer numeric and categorical columns from a DataFrame.
@@ -70,3 +311,132 @@ def infer_column_types(df: pd.DataFrame) -> Tuple[List[str], List[str]]:
         len(categorical_cols),
     )
     return numeric_cols, categorical_cols
+
+
+def optimize_dtypes(
+    df: pd.DataFrame,
+    category_max_ratio: float = 0.5,
+    parse_sample_size: int = 1_000,
+) -> Tuple[pd.DataFrame, Dict[str, Dict[str, Any]]]:
+    """
+    Shrink a DataFrame's memory footprint using the column split from
+    ``infer_column_types``.
+
+    - Numeric columns are downcast to the smallest signed width that holds
+      every value (floats only when the round trip is lossless). Unsigned
+      types are avoided so that arithmetic on the result cannot wrap around.
+    - Text columns that look numeric or date-like are parsed into native dtypes.
+    - Remaining low-cardinality text columns become ``category``.
+
+    Args:
+        df: Input DataFrame (not modified).
+        category_max_ratio: Max ratio of unique values to rows for a text
+            column to be converted to ``category``.
+        parse_sample_size: Non-null values sampled to decide whether a text
+            column is worth parsing as numeric / datetime.
+
+    Returns:
+        Tuple of (optimized DataFrame, per-column report). The report maps each
+        changed column to its old/new dtype and bytes before/after/saved.
+    """
+    numeric_cols, categorical_cols = infer_column_types(df)
+    optimized: Dict[str, pd.Series] = {}
+
+    for col in numeric_cols:
+        converted = _downcast_numeric(df[col])
+        if converted is not None:
+            optimized[col] = converted
+
+    for col in categorical_cols:
+        series = df[col]
+        if not (pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series)):
+            continue
+        converted = _parse_text_column(series, parse_sample_size)
+        if converted is None:
+            converted = _to_category(series, category_max_ratio)
+        if converted is not None:
+            optimized[col] = converted
+
+    report: Dict[str, Dict[str, Any]] = {}
+    for col, new_series in optimized.items():
+        before = int(df[col].memory_usage(deep=True, index=False))
+        after = int(new_series.memory_usage(deep=True, index=False))
+        if after >= before:
+            continue
+        report[col] = {
+            "from": str(df[col].dtype),
+            "to": str(new_series.dtype),
+            "bytes_before": before,
+            "bytes_after": after,
+            "bytes_saved": before - after,
+        }
+
+    if not report:
+        return df, report
+
+    result = df.copy(deep=False)
+    for col in report:
+        result[col] = optimized[col]
+
+    logger.info(
+        "Optimized dtypes of %d columns, saving %d bytes",
+        len(report),
+        sum(item["bytes_saved"] for item in report.values()),
+    )
+    return result, report
+
+
+def _downcast_numeric(series: pd.Series) -> pd.Series | None:
+    """Downcast a numeric column to the narrowest safe dtype."""
+    if pd.api.types.is_bool_dtype(series):
+        return None
+
+    if pd.api.types.is_integer_dtype(series):
+        non_null = series.dropna()
+        if non_null.empty:
+            return None
+        return pd.to_numeric(series, downcast="integer")
+
+    if pd.api.types.is_float_dtype(series):
+        values = series.to_numpy(dtype="float64", na_value=np.nan)
+        finite = values[~np.isnan(values)]
+        if finite.size and np.all(np.isfinite(finite)) and np.array_equal(finite, np.round(finite)):
+            if finite.size == values.size:
+                return pd.to_numeric(series.astype("int64"), downcast="integer")
+        as_float32 = values.astype(np.float32)
+        if np.array_equal(as_float32.astype(np.float64), values, equal_nan=True):
+            return pd.Series(as_float32, index=series.index, name=series.name)
+
+    return None
+
+
+def _parse_text_column(series: pd.Series, sample_size: int) -> pd.Series | None:
+    """Parse numeric-looking or date-like text columns into native dtypes."""
+    non_null = series.dropna()
+    if non_null.empty:
+        return None
+    sample = non_null.sample(min(sample_size, len(non_null)), random_state=0)
+
+    if pd.to_numeric(sample, errors="coerce").notna().all():
+        parsed = pd.to_numeric(series, errors="coerce")
+        if parsed.notna().sum() == len(non_null):
+            downcast = _downcast_numeric(parsed)
+            return parsed if downcast is None else downcast
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        if pd.to_datetime(sample, errors="coerce").notna().all():
+            parsed = pd.to_datetime(series, errors="coerce")
+            if parsed.notna().sum() == len(non_null):
+                return parsed
+
+    return None
+
+
+def _to_category(series: pd.Series, max_ratio: float) -> pd.Series | None:
+    """Convert a text column to ``category`` when its cardinality is low."""
+    if len(series) == 0:
+        return None
+    if series.nunique(dropna=True) / len(series) > max_ratio:
+        return None
+    return series.astype("category")
@@ -0,0 +1,282 @@
+"""
+Mergeable, serializable dataset statistics.
+
+A DatasetStats object holds per-column counts, moments, min/max, missing
+counts and sketches. Statistics for ``old + delta`` are obtained by scanning
+only the delta and merging, and the result can be rendered in the same shape
+as ``profiling.build_summary``.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import math
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable
+
+import numpy as np
+import pandas as pd
+
+from pipeline.sketches import QuantileSketch, SpaceSaving
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SKETCH_K = 200
+DEFAULT_HEAVY_HITTERS = 1_000
+
+
+@dataclass
+class ColumnStats:
+    """Running statistics for a single column."""
+
+    dtype: str
+    numeric: bool
+    count: int = 0
+    missing: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+    min: float = math.nan
+    max: float = math.nan
+    quantiles: QuantileSketch | None = None
+    heavy_hitters: SpaceSaving | None = None
+
+    @classmethod
+    def from_series(cls, series: pd.Series) -> "ColumnStats":
+        """
+        Scan one column.
+
+        Args:
+            series: Column values.
+
+        Returns:
+            Statistics covering exactly this series.
+        """
+        numeric = pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+        stats = cls(dtype=str(series.dtype), numeric=numeric)
+
+        if numeric:
+            values = series.to_numpy(dtype="float64", na_value=np.nan)
+            present = values[~np.isnan(values)]
+            stats.count = int(present.size)
+            stats.missing = int(values.size - present.size)
+            stats.quantiles = QuantileSketch(DEFAULT_SKETCH_K).update(present)
+            if present.size:
+                stats.mean = float(present.mean())
+                stats.m2 = float(((present - stats.mean) ** 2).sum())
+                stats.min = float(present.min())
+                stats.max = float(present.max())
+        else:
+            present = series.dropna()
+            stats.count = int(present.size)
+            stats.missing = int(series.size - present.size)
+            stats.heavy_hitters = SpaceSaving(DEFAULT_HEAVY_HITTERS).update(present.astype(str))
+
+        return stats
+
+    @classmethod
+    def empty_like(cls, other: "ColumnStats", rows: int) -> "ColumnStats":
+        """Stats for ``rows`` rows where this column did not exist (all missing)."""
+        stats = cls(dtype=other.dtype, numeric=other.numeric, missing=rows)
+        if other.numeric:
+            stats.quantiles = QuantileSketch(DEFAULT_SKETCH_K)
+        else:
+            stats.heavy_hitters = SpaceSaving(DEFAULT_HEAVY_HITTERS)
+        return stats
+
+    def merge(self, other: "ColumnStats") -> "ColumnStats":
+        """
+        Fold statistics of disjoint rows into this object.
+
+        Means and second moments are combined with Chan's parallel update.
+
+        Args:
+            other: Statistics for other rows of the same column.
+
+        Returns:
+            The object itself, for chaining.
+        """
+        if other.dtype != self.dtype:
+            logger.warning("Merging column stats with dtypes %s and %s", self.dtype, other.dtype)
+
+        total = self.count + other.count
+        if other.count:
+            delta = other.mean - self.mean
+            self.mean += delta * other.count / total
+            self.m2 += other.m2 + delta * delta * self.count * other.count / total
+            self.min = other.min if math.isnan(self.min) else min(self.min, other.min)
+            self.max = other.max if math.isnan(self.max) else max(self.max, other.max)
+        self.count = total
+        self.missing += other.missing
+
+        if self.quantiles is not None and other.quantiles is not None:
+            self.quantiles.merge(other.quantiles)
+        if self.heavy_hitters is not None and other.heavy_hitters is not None:
+            self.heavy_hitters.merge(other.heavy_hitters)
+        return self
+
+    @property
+    def std(self) -> float:
+        """Sample standard deviation (ddof=1), matching pandas."""
+        if self.count < 2:
+            return math.nan
+        return math.sqrt(self.m2 / (self.count - 1))
+
+    def describe(self) -> Dict[str, float]:
+        """Numeric summary in the shape of ``DataFrame.describe()``."""
+        q25, q50, q75 = self.quantiles.quantiles([0.25, 0.5, 0.75]) if self.quantiles else [math.nan] * 3
+        return {
+            "count": float(self.count),
+            "mean": self.mean if self.count else math.nan,
+            "std": self.std,
+            "min": self.min,
+            "25%": q25,
+            "50%": q50,
+            "75%": q75,
+            "max": self.max,
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize to a JSON-compatible dict."""
+        return {
+            "dtype": self.dtype,
+            "numeric": self.numeric,
+            "count": self.count,
+            "missing": self.missing,
+            "mean": self.mean,
+            "m2": self.m2,
+            "min": None if math.isnan(self.min) else self.min,
+            "max": None if math.isnan(self.max) else self.max,
+            "quantiles": self.quantiles.to_dict() if self.quantiles else None,
+            "heavy_hitters": self.heavy_hitters.to_dict() if self.heavy_hitters else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ColumnStats":
+        """Rebuild stats serialized with ``to_dict``."""
+        return cls(
+            dtype=data["dtype"],
+            numeric=bool(data["numeric"]),
+            count=int(data["count"]),
+            missing=int(data["missing"]),
+            mean=float(data["mean"]),
+            m2=float(data["m2"]),
+            min=math.nan if data["min"] is None else float(data["min"]),
+            max=math.nan if data["max"] is None else float(data["max"]),
+            quantiles=QuantileSketch.from_dict(data["quantiles"]) if data["quantiles"] else None,
+            heavy_hitters=SpaceSaving.from_dict(data["heavy_hitters"]) if data["heavy_hitters"] else None,
+        )
+
+
+@dataclass
+class DatasetStats:
+    """Mergeable statistics for a whole dataset."""
+
+    rows: int = 0
+    columns: Dict[str, ColumnStats] = field(default_factory=dict)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "DatasetStats":
+        """
+        Scan a DataFrame.
+
+        Args:
+            df: Input data.
+
+        Returns:
+            Statistics covering exactly the rows of ``df``.
+        """
+        return cls(
+            rows=len(df),
+            columns={str(col): ColumnStats.from_series(df[col]) for col in df.columns},
+        )
+
+    @classmethod
+    def from_chunks(cls, chunks: Iterable[pd.DataFrame]) -> "DatasetStats":
+        """
+        Build statistics from a stream of frames, e.g. ``iter_csv_chunks``.
+
+        Args:
+            chunks: Iterable of DataFrames sharing a schema.
+
+        Returns:
+            Statistics over all chunks.
+        """
+        stats = cls()
+        for chunk in chunks:
+            stats.update(chunk)
+        return stats
+
+    def update(self, delta: pd.DataFrame) -> "DatasetStats":
+        """
+        Add newly appended rows by scanning only ``delta``.
+
+        Args:
+            delta: New rows.
+
+        Returns:
+            The object itself, for chaining.
+        """
+        return self.merge(DatasetStats.from_frame(delta))
+
+    def merge(self, other: "DatasetStats") -> "DatasetStats":
+        """
+        Fold statistics of disjoint rows into this object. Columns present on
+        only one side are treated as missing on the other.
+
+        Args:
+            other: Statistics over other rows.
+
+        Returns:
+            The object itself, for chaining.
+        """
+        for name, col_stats in other.columns.items():
+            if name not in self.columns:
+                self.columns[name] = ColumnStats.empty_like(col_stats, self.rows)
+            self.columns[name].merge(col_stats)
+        for name, col_stats in self.columns.items():
+            if name not in other.columns:
+                col_stats.missing += other.rows
+
+        self.rows += other.rows
+        return self
+
+    def to_summary(self) -> Dict[str, Any]:
+        """
+        Render the statistics in the shape returned by ``build_summary``.
+
+        Quartiles come from the quantile sketches and are approximate.
+        """
+        return {
+            "rows": self.rows,
+            "cols": len(self.columns),
+            "dtypes": {name: col.dtype for name, col in self.columns.items()},
+            "missing_values": {name: col.missing for name, col in self.columns.items()},
+            "numeric_summary": {
+                name: col.describe() for name, col in self.columns.items() if col.numeric
+            },
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize to a JSON-compatible dict."""
+        return {
+            "rows": self.rows,
+            "columns": {name: col.to_dict() for name, col in self.columns.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "DatasetStats":
+        """Rebuild statistics serialized with ``to_dict``."""
+        return cls(
+            rows=int(data["rows"]),
+            columns={name: ColumnStats.from_dict(col) for name, col in data["columns"].items()},
+        )
+
+    def to_json(self) -> str:
+        """Serialize to a JSON string."""
+        return json.dumps(self.to_dict())
+
+    @classmethod
+    def from_json(cls, text: str) -> "DatasetStats":
+        """Rebuild statistics from ``to_json`` output."""
+        return cls.from_dict(json.loads(text))
@@ -0,0 +1,221 @@
+"""
+Content-addressed columnar store for ingested datasets.
+
+An uploaded CSV is parsed and dtype-optimized once, then written as an
+uncompressed Arrow IPC file named by the upload's content hash. Later loads,
+from any session or process, memory-map that file instead of re-parsing the
+CSV: numeric and categorical columns come back without copying. Files are
+pruned in least recently used order once the store exceeds its disk budget.
+
+Object and categorical columns mixing types Arrow cannot convert (e.g.
+numbers and strings) are stored as text, so such uploads are still parsed
+only once.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, List, Tuple
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROOT = os.path.join(".cache", "datasets")
+DEFAULT_MAX_MB = 20 * 1024
+_METADATA_KEY = b"auto_analyst"
+
+DtypeReport = Dict[str, Dict[str, Any]]
+
+
+def _to_arrow(df: pd.DataFrame) -> Tuple[Any, List[Any]]:
+    """
+    Convert a frame to an Arrow table, turning object columns (or the
+    categories of categorical columns) Arrow cannot convert into text, with
+    nulls kept.
+
+    Returns:
+        Tuple of (pyarrow Table, names of the columns stored as text).
+    """
+    import pyarrow as pa
+
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False), []
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        pass
+
+    frame = df.copy(deep=False)
+    stringified = []
+    for col in frame.columns:
+        series = frame[col]
+        categorical = isinstance(series.dtype, pd.CategoricalDtype)
+        if series.dtype != object and not categorical:
+            continue
+        try:
+            pa.array(series, from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            text = series.astype(object).map(str, na_action="ignore")
+            # Categories may collide as text (False and "False"), so rebuild them.
+            frame[col] = text.astype("category") if categorical else text
+            stringified.append(col)
+    return pa.Table.from_pandas(frame, preserve_index=False), stringified
+
+
+class DatasetStore:
+    """
+    Directory of Arrow IPC files keyed by upload content hash.
+
+    Args:
+        root: Directory holding the files.
+        max_bytes: Disk budget; oldest-used files are removed beyond it.
+    """
+
+    def __init__(self, root: str = DEFAULT_ROOT, max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024) -> None:
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def path_for(self, digest: str) -> str:
+        return os.path.join(self.root, f"{digest}.arrow")
+
+    def __contains__(self, digest: str) -> bool:
+        return os.path.exists(self.path_for(digest))
+
+    def put(self, digest: str, df: pd.DataFrame, dtype_report: DtypeReport | None = None) -> str:
+        """
+        Write a frame under ``digest`` (no-op if it is already stored).
+
+        Args:
+            digest: Content hash of the source upload.
+            df: Optimized frame.
+            dtype_report: Report from ``optimize_dtypes``, kept alongside.
+
+        Returns:
+            Path of the stored file.
+        """
+        import pyarrow as pa
+
+        path = self.path_for(digest)
+        if os.path.exists(path):
+            return path
+
+        table, stringified = _to_arrow(df)
+        if stringified:
+            logger.warning(
+                "Storing mixed-type column(s) of %s as text: %s",
+                digest,
+                ", ".join(map(str, stringified)),
+            )
+        extra = {
+            "object_columns": [str(col) for col in df.columns if df[col].dtype == object],
+            "stringified_columns": [str(col) for col in stringified],
+            "dtype_report": dtype_report or {},
+        }
+        metadata = dict(table.schema.metadata or {})
+        metadata[_METADATA_KEY] = json.dumps(extra, default=str).encode("utf-8")
+        table = table.replace_schema_metadata(metadata)
+
+        # Write to a private temp file and rename, so concurrent writers of
+        # the same upload never expose a partial file.
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+        logger.info("Stored dataset %s (%.1f MB).", digest, os.path.getsize(path) / 1e6)
+
+        self.prune()
+        return path
+
+    def open(self, digest: str) -> Tuple[pd.DataFrame, DtypeReport] | None:
+        """
+        Memory-map a stored dataset.
+
+        Args:
+            digest: Content hash of the source upload.
+
+        Returns:
+            Tuple of (DataFrame, dtype report), or None if not stored. Columns
+            that were plain ``object`` text are restored as such (the only
+            columns that are copied); the rest stay views of the mapped file.
+        """
+        import pyarrow as pa
+
+        path = self.path_for(digest)
+        try:
+            source = pa.memory_map(path, "r")
+        except FileNotFoundError:
+            return None
+
+        table = pa.ipc.open_file(source).read_all()
+        raw_meta = (table.schema.metadata or {}).get(_METADATA_KEY)
+        extra = json.loads(raw_meta) if raw_meta else {}
+
+        df = table.to_pandas(split_blocks=True)
+        for col in extra.get("object_columns", []):
+            if col in df.columns and df[col].dtype != object:
+                df[col] = df[col].astype(object)
+
+        os.utime(path)  # mark as recently used for pruning
+        return df, extra.get("dtype_report", {})
+
+    def get_or_ingest(
+        self,
+        digest: str,
+        ingest: Callable[[], Tuple[pd.DataFrame, DtypeReport]],
+    ) -> Tuple[pd.DataFrame, DtypeReport]:
+        """
+        Return the stored dataset, ingesting and storing it on first use.
+
+        Args:
+            digest: Content hash of the source upload.
+            ingest: Parses and optimizes the upload; called on a miss.
+
+        Returns:
+            Tuple of (DataFrame, dtype report). After a miss the frame is
+            reopened from the store so every session shares the mapped copy.
+        """
+        stored = self.open(digest)
+        if stored is not None:
+            logger.info("Dataset %s loaded from the store.", digest)
+            return stored
+
+        df, report = ingest()
+        try:
+            self.put(digest, df, report)
+        except (TypeError, ValueError, OSError) as exc:
+            logger.warning("Could not store dataset %s: %s", digest, exc)
+            return df, report
+        return self.open(digest) or (df, report)
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """Stored datasets with their size and last use, most recent first."""
+        items = []
+        for name in os.listdir(self.root):
+            if not name.endswith(".arrow"):
+                continue
+            stat = os.stat(os.path.join(self.root, name))
+            items.append(
+                {"digest": name[: -len(".arrow")], "bytes": stat.st_size, "last_used": stat.st_mtime}
+            )
+        return sorted(items, key=lambda item: item["last_used"], reverse=True)
+
+    def prune(self) -> None:
+        """Delete least recently used files beyond the disk budget."""
+        with self._lock:
+            entries = self.entries()
+            total = sum(item["bytes"] for item in entries)
+            # Never delete the most recent file, even if it alone is too big.
+            for item in reversed(entries[1:]):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(self.path_for(item["digest"]))
+                except OSError:
+                    continue
+                total -= item["bytes"]
+                logger.info("Pruned stored dataset %s.", item["digest"])
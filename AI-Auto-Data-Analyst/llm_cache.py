@@ -0,0 +1,261 @@
+"""
+Persistent cache for LLM responses (generated code and insight text).
+
+Responses are stored in a small SQLite database keyed by model name, the
+whitespace-normalized prompt and a dataset schema fingerprint, so repeated
+questions over the same kind of dataset skip the network round trip, also
+across app restarts. Entries expire after a TTL and are evicted in LRU order
+once the database exceeds its size budget.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator
+
+import pandas as pd
+
+from pipeline.llm_client import accepts_request_options
+from pipeline.tracing import annotate
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_MB = 256
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Collapse runs of whitespace so formatting-only changes share an entry."""
+    return re.sub(r"\s+", " ", prompt).strip()
+
+
+def schema_fingerprint(df: pd.DataFrame) -> str:
+    """
+    Fingerprint a dataset's schema (column names and dtypes, in order).
+
+    Args:
+        df: DataFrame the prompt was built from.
+
+    Returns:
+        Hex digest that changes whenever a column is added, renamed, removed
+        or changes type.
+    """
+    schema = "\x1f".join(f"{col}\x1e{dtype}" for col, dtype in df.dtypes.items())
+    return hashlib.blake2b(schema.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def cache_key(model_name: str, prompt: str, fingerprint: str = "") -> str:
+    """Build the cache key for one model call."""
+    payload = "\x00".join([model_name, fingerprint, normalize_prompt(prompt)])
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=20).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    SQLite-backed response store with TTL expiry and size-bounded LRU eviction.
+
+    Safe to share across threads (and across processes using the same file).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024,
+        ttl_seconds: float | None = DEFAULT_TTL_SECONDS,
+    ) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS responses_lru ON responses (last_access)"
+            )
+
+    def get(self, key: str) -> str | None:
+        """Return the cached response for ``key``, or None if absent/expired."""
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT response, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self.ttl_seconds is not None and now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE responses SET last_access = ? WHERE key = ?", (now, key)
+            )
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, model_name: str, response: str) -> None:
+        """Store a response and evict least recently used entries if needed."""
+        size = len(response.encode("utf-8"))
+        if size > self.max_bytes:
+            logger.info("Response of %d bytes exceeds LLM cache budget; not cached.", size)
+            return
+
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model_name, response, size, now, now),
+            )
+            if self.ttl_seconds is not None:
+                self._conn.execute(
+                    "DELETE FROM responses WHERE created < ?", (now - self.ttl_seconds,)
+                )
+            self._evict()
+
+    def _evict(self) -> None:
+        """Drop LRU entries until the stored responses fit the budget."""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM responses ORDER BY last_access"
+        ).fetchall():
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self.evictions += 1
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self) -> None:
+        """Remove every cached response."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM responses")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current usage."""
+        with self._lock:
+            entries, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        return {
+            "entries": entries,
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+@dataclass
+class CachedResponse:
+    """Minimal stand-in for a model response served from the cache."""
+
+    text: str
+
+    def __iter__(self) -> Iterator["CachedResponse"]:
+        # Like a resolved Gemini response: a "stream" of one chunk.
+        yield self
+
+
+class CachedModel:
+    """
+    Wrap a model so ``generate_content`` is served from an LLMResponseCache.
+
+    Works with any object exposing ``generate_content(prompt)`` that returns
+    something with a ``.text`` attribute (Gemini models or test stubs).
+    Streamed responses are stored once fully consumed. Failed calls and empty
+    responses are never cached.
+
+    Args:
+        model: Underlying model.
+        cache: Shared response cache.
+        fingerprint: Schema fingerprint of the dataset the prompts describe.
+        model_name: Cache namespace; defaults to ``model.model_name``.
+    """
+
+    def __init__(
+        self,
+        model: Any,
+        cache: LLMResponseCache,
+        fingerprint: str = "",
+        model_name: str | None = None,
+    ) -> None:
+        self.model = model
+        self.cache = cache
+        self.fingerprint = fingerprint
+        self.model_name = model_name or getattr(model, "model_name", None) or type(model).__name__
+
+    def generate_content(
+        self,
+        prompt: str,
+        stream: bool = False,
+        request_options: Dict[str, Any] | None = None,
+        **kwargs: Any,
+    ) -> Any:
+        """
+        Return a cached response for ``prompt`` or call the model.
+
+        ``request_options`` (e.g. the SDK deadline) only affect transport, so
+        they are forwarded when the model accepts them but are not part of
+        the cache key.
+        """
+        transport: Dict[str, Any] = {}
+        if request_options is not None and accepts_request_options(self.model):
+            transport["request_options"] = request_options
+        if kwargs:
+            # Non-default generation options are not part of the key.
+            return self.model.generate_content(prompt, stream=stream, **kwargs, **transport)
+
+        key = cache_key(self.model_name, prompt, self.fingerprint)
+        cached = self.cache.get(key)
+        annotate(cache_hit=cached is not None)
+        if cached is not None:
+            logger.info("LLM cache hit for %s.", self.model_name)
+            return CachedResponse(cached)
+
+        if stream:
+            return self._record_stream(
+                key, self.model.generate_content(prompt, stream=True, **transport)
+            )
+
+        response = self.model.generate_content(prompt, **transport)
+        text = response.text
+        if text:
+            self.cache.put(key, self.model_name, text)
+        return response
+
+    def _record_stream(self, key: str, chunks: Iterable[Any]) -> Iterator[Any]:
+        """Pass chunks through and cache the full text once the stream ends."""
+        parts = []
+        for chunk in chunks:
+            parts.append(chunk.text or "")
+            yield chunk
+        text = "".join(parts)
+        if text:
+            self.cache.put(key, self.model_name, text)
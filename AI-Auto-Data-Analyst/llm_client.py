@@ -0,0 +1,367 @@
+"""
+Resilient LLM client layer: timeouts, retry with backoff, streaming and
+concurrent dispatch.
+
+``LLMClient`` wraps any model exposing ``generate_content`` (Gemini, a
+``CachedModel`` or a test stub) and is itself a drop-in model, so the agents
+get timeouts and retries without changes. Streaming runs the blocking SDK
+iterator on a worker thread and hands chunks over through a queue, so text
+can be shown as soon as the first chunk arrives and a stalled stream times
+out or is cancelled instead of hanging the app.
+
+Concurrency is capped by call slots rather than by the pool's queue: a slot
+is taken before an attempt's clock starts and released only when the SDK call
+really returns, so time spent waiting for a slot never counts toward the
+timeout and abandoned calls keep counting against the limit. The timeout is
+also passed to the SDK as its request deadline, so a timed-out call ends
+instead of holding a worker indefinitely.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import inspect
+import logging
+import queue
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from concurrent.futures import wait as wait_futures
+from typing import Any, Callable, Dict, Iterator, Tuple
+
+from pipeline.tracing import bind_span, span
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 60.0
+DEFAULT_MAX_RETRIES = 2
+DEFAULT_MAX_WORKERS = 8
+# How long a timed-out attempt may take to release its worker before retrying.
+ABANDON_GRACE_SECONDS = 5.0
+
+
+@functools.lru_cache(maxsize=None)
+def retryable_errors() -> Tuple[type, ...]:
+    """
+    Exception types worth retrying. Resolved on the first failure, so the
+    Google API client is not imported just to construct a client.
+    """
+    try:
+        from google.api_core import exceptions as api_exceptions
+    except ImportError:  # pragma: no cover - only without the Gemini SDK
+        return (TimeoutError, ConnectionError)
+    return (
+        TimeoutError,
+        ConnectionError,
+        api_exceptions.TooManyRequests,
+        api_exceptions.InternalServerError,
+        api_exceptions.ServiceUnavailable,
+        api_exceptions.DeadlineExceeded,
+    )
+
+
+_CHUNK, _DONE, _ERROR = "chunk", "done", "error"
+_POLL_SECONDS = 0.1
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+_call_slots = threading.BoundedSemaphore(DEFAULT_MAX_WORKERS)
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Shared pool that runs blocking model calls."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=DEFAULT_MAX_WORKERS, thread_name_prefix="llm"
+            )
+        return _executor
+
+
+def _start(fn: Callable[..., Any], *args: Any) -> Future:
+    """
+    Run ``fn`` on the shared pool in a call slot the caller already acquired.
+    The slot is released when the call ends, not when the caller gives up.
+    """
+    try:
+        future = _get_executor().submit(fn, *args)
+    except BaseException:
+        _call_slots.release()
+        raise
+    future.add_done_callback(lambda _: _call_slots.release())
+    return future
+
+
+def _finished(future: Future) -> bool:
+    """Give an abandoned call a short grace period to end; True if it did."""
+    wait_futures([future], timeout=ABANDON_GRACE_SECONDS)
+    if not future.done():
+        logger.warning("Timed-out LLM call is still running; not retrying.")
+        return False
+    return True
+
+
+def accepts_request_options(model: Any) -> bool:
+    """Whether ``model.generate_content`` takes the SDK's ``request_options``."""
+    try:
+        params = inspect.signature(model.generate_content).parameters
+    except (AttributeError, TypeError, ValueError):
+        return False
+    return "request_options" in params
+
+
+class LLMClient:
+    """
+    Model wrapper adding timeouts, retries with exponential backoff and
+    streaming.
+
+    Args:
+        model: Object exposing ``generate_content(prompt, stream=...)``.
+        timeout: Seconds to wait for a response (or, when streaming, for each
+            chunk).
+        max_retries: Retries after transient errors or timeouts.
+        backoff: Base delay in seconds, doubled per attempt (with jitter).
+        max_backoff: Upper bound on a single delay.
+    """
+
+    def __init__(
+        self,
+        model: Any,
+        timeout: float = DEFAULT_TIMEOUT,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        backoff: float = 1.0,
+        max_backoff: float = 16.0,
+    ) -> None:
+        self.model = model
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._request_options = accepts_request_options(model)
+
+    @property
+    def model_name(self) -> str:
+        return getattr(self.model, "model_name", None) or type(self.model).__name__
+
+    def _delay(self, attempt: int) -> float:
+        return min(self.max_backoff, self.backoff * 2**attempt) * random.uniform(0.5, 1.0)
+
+    def _retry_or_raise(self, attempt: int, error: BaseException) -> float:
+        """Return the delay before the next attempt, or re-raise ``error``."""
+        if attempt >= self.max_retries:
+            raise error
+        delay = self._delay(attempt)
+        logger.warning(
+            "LLM call failed (%s: %s); retrying in %.1fs.", type(error).__name__, error, delay
+        )
+        return delay
+
+    def _call(self, prompt: str, stream: bool = False) -> Any:
+        """One model call, with the timeout forwarded as the SDK deadline."""
+        kwargs: Dict[str, Any] = {"stream": True} if stream else {}
+        if self._request_options:
+            kwargs["request_options"] = {"timeout": self.timeout}
+        return self.model.generate_content(prompt, **kwargs)
+
+    def generate_content(self, prompt: str) -> Any:
+        """
+        Blocking call with timeout and retries (drop-in for a Gemini model).
+
+        A timed-out attempt is only retried once its SDK call has actually
+        ended, so retries never pile up on workers still held by earlier ones.
+
+        Raises:
+            TimeoutError: If every attempt timed out, or a timed-out call did
+                not end within the grace period.
+        """
+        with span("llm.generate", model=self.model_name, prompt_chars=len(prompt)) as current:
+            call = bind_span(current, self._call)
+            attempt = 0
+            while True:
+                current.set(attempts=attempt + 1)
+                queued = time.perf_counter()
+                _call_slots.acquire()
+                current.set(queue_ms=round((time.perf_counter() - queued) * 1000, 1))
+                future = _start(call, prompt)
+                try:
+                    response = future.result(timeout=self.timeout)
+                    current.set(response_chars=len(getattr(response, "text", "") or ""))
+                    return response
+                except FutureTimeout:
+                    error: BaseException = TimeoutError(
+                        f"LLM call timed out after {self.timeout:g}s."
+                    )
+                    if not _finished(future):
+                        raise error from None
+                except retryable_errors() as exc:
+                    error = exc
+                time.sleep(self._retry_or_raise(attempt, error))
+                attempt += 1
+
+    async def agenerate(self, prompt: str) -> Any:
+        """
+        Async variant of :meth:`generate_content`. Cancelling the awaiting
+        task abandons the call and any pending retries.
+        """
+        attempt = 0
+        while True:
+            while not _call_slots.acquire(blocking=False):
+                await asyncio.sleep(_POLL_SECONDS)
+            call = asyncio.wrap_future(_start(self._call, prompt))
+            try:
+                return await asyncio.wait_for(asyncio.shield(call), self.timeout)
+            except asyncio.TimeoutError:
+                error: BaseException = TimeoutError(
+                    f"LLM call timed out after {self.timeout:g}s."
+                )
+                done, _ = await asyncio.wait({call}, timeout=ABANDON_GRACE_SECONDS)
+                if not done:
+                    logger.warning("Timed-out LLM call is still running; not retrying.")
+                    raise error from None
+            except retryable_errors() as exc:
+                error = exc
+            await asyncio.sleep(self._retry_or_raise(attempt, error))
+            attempt += 1
+
+    def stream(self, prompt: str, cancel: threading.Event | None = None) -> Iterator[str]:
+        """
+        Yield response text chunks as they arrive.
+
+        Failures before the first chunk are retried; once text has been
+        yielded, errors propagate. Setting ``cancel`` (or closing the
+        generator) stops reading the response.
+
+        Args:
+            prompt: Prompt text.
+            cancel: Optional event that aborts the stream when set.
+
+        Raises:
+            TimeoutError: If no chunk arrives within ``timeout`` seconds.
+        """
+        # Not activated: the consumer runs between chunks and its own spans
+        # must not nest under the stream.
+        with span(
+            "llm.stream",
+            activate=False,
+            model=self.model_name,
+            prompt_chars=len(prompt),
+            response_chars=0,
+        ) as current:
+            pump = bind_span(current, self._pump)
+            opened = time.perf_counter()
+            attempt = 0
+            while True:
+                current.set(attempts=attempt + 1)
+                stop = threading.Event()
+                chunks: queue.Queue = queue.Queue()
+                _call_slots.acquire()
+                reader = _start(pump, prompt, chunks, stop)
+                started = False
+                try:
+                    deadline = time.monotonic() + self.timeout
+                    while True:
+                        if cancel is not None and cancel.is_set():
+                            logger.info("LLM stream cancelled.")
+                            return
+                        try:
+                            kind, payload = chunks.get(timeout=_POLL_SECONDS)
+                        except queue.Empty:
+                            if time.monotonic() > deadline:
+                                raise TimeoutError(
+                                    f"No response chunk within {self.timeout:g}s."
+                                ) from None
+                            continue
+                        if kind == _DONE:
+                            return
+                        if kind == _ERROR:
+                            raise payload
+                        if not started:
+                            waited = time.perf_counter() - opened
+                            current.set(first_chunk_ms=round(waited * 1000, 1))
+                        started = True
+                        current.attrs["response_chars"] += len(payload)
+                        yield payload
+                        deadline = time.monotonic() + self.timeout
+                except retryable_errors() as exc:
+                    if started:
+                        raise
+                    error: BaseException = exc
+                finally:
+                    stop.set()
+                if not _finished(reader):
+                    raise error
+                time.sleep(self._retry_or_raise(attempt, error))
+                attempt += 1
+
+    def _pump(self, prompt: str, chunks: queue.Queue, stop: threading.Event) -> None:
+        """Worker: read the SDK stream and forward text chunks to ``chunks``."""
+        try:
+            try:
+                response = self._call(prompt, stream=True)
+            except TypeError:
+                # Models without streaming support deliver one chunk.
+                response = [self._call(prompt)]
+            for chunk in response:
+                if stop.is_set():
+                    return
+                text = chunk.text
+                if text:
+                    chunks.put((_CHUNK, text))
+            chunks.put((_DONE, None))
+        except Exception as exc:  # noqa: BLE001
+            chunks.put((_ERROR, exc))
+
+
+async def gather_calls(
+    calls: Dict[str, Callable[[], Any]],
+    timeout: float | None = None,
+) -> Dict[str, Any]:
+    """
+    Run blocking callables (e.g. agent queries) concurrently.
+
+    Args:
+        calls: Mapping from name to zero-argument callable.
+        timeout: Per-call timeout in seconds.
+
+    Returns:
+        Mapping from name to result, or to the exception the call raised.
+    """
+    loop = asyncio.get_running_loop()
+    pool = ThreadPoolExecutor(max_workers=max(len(calls), 1), thread_name_prefix="llm-dispatch")
+    try:
+        tasks = [
+            asyncio.wait_for(loop.run_in_executor(pool, fn), timeout) for fn in calls.values()
+        ]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    return dict(zip(calls, results))
+
+
+def run_concurrently(
+    calls: Dict[str, Callable[[], Any]],
+    timeout: float | None = None,
+) -> Dict[str, Any]:
+    """Synchronous entry point to :func:`gather_calls`."""
+    return asyncio.run(gather_calls(calls, timeout))
+
+
+def dispatch(calls: Dict[str, Callable[[], Any]]) -> Dict[str, Future]:
+    """
+    Start blocking callables in the background and return their futures,
+    so the caller can stream other output meanwhile.
+
+    Args:
+        calls: Mapping from name to zero-argument callable.
+
+    Returns:
+        Mapping from name to Future.
+    """
+    pool = ThreadPoolExecutor(max_workers=max(len(calls), 1), thread_name_prefix="llm-dispatch")
+    futures = {name: pool.submit(fn) for name, fn in calls.items()}
+    pool.shutdown(wait=False)
+    return futures
@@ -4,50 +4,53 @@ LLM (Gemini) integration for generating dataset insights.
 
 from __future__ import annotations
 
-import json
 import logging
-from typing import Dict, Any
+import threading
+from typing import TYPE_CHECKING, Any, Dict, Iterator
 
-import google.generativeai as genai
+from config import Settings
+from pipeline.llm_client import LLMClient
+from pipeline.llm_model import get_gemini_model
+from pipeline.summary_encoder import DEFAULT_TOKEN_BUDGET, EncodedSummary, encode_summary
 
-from config import Settings, settings as default_settings
+if TYPE_CHECKING:
+    import google.generativeai as genai
 
 logger = logging.getLogger(__name__)
 
 
-def init_gemini(settings: Settings = default_settings) -> genai.GenerativeModel:
+def init_gemini(settings: Settings | None = None) -> genai.GenerativeModel:
     """
-    Initialize the Gemini model.
+    Return the shared Gemini model.
 
     Args:
         settings: App settings with API key and model name.
 
     Returns:
-        Configured GenerativeModel instance.
+        Configured GenerativeModel instance (see ``llm_model``).
     """
-    logger.info("Initializing Gemini with model %s", settings.gemini_model_name)
-    genai.configure(api_key=settings.gemini_api_key)
-    model = genai.GenerativeModel(settings.gemini_model_name)
-    return model
+    return get_gemini_model(settings)
 
 
-def generate_insights(model: genai.GenerativeModel, summary: Dict[str, Any]) -> str:
-    """
-    Generate a natural-language EDA report from dataset summary.
+def _encode(
+    summary: Dict[str, Any] | EncodedSummary,
+    token_budget: int,
+) -> EncodedSummary:
+    if isinstance(summary, EncodedSummary):
+        return summary
+    return encode_summary(summary, token_budget)
 
-    Args:
-        model: Gemini generative model.
-        summary: Dataset summary as produced by profiling.build_summary.
 
-    Returns:
-        Human-readable multi-section report string.
-    """
-    prompt = f"""
+def _build_prompt(encoded: EncodedSummary) -> str:
+    """Build the insights prompt for an encoded dataset summary."""
+    return f"""
 You are a senior data analyst.
 
-You are given a dataset summary in JSON format:
+You are given a compact dataset summary. Tables use one row per column with
+"|"-separated fields (missing% is the percentage of missing values); columns
+judged less informative are summarized in aggregate at the end:
 
-{json.dumps(summary, indent=2)}
+{encoded.text}
 
 Please provide a structured analysis with headings:
 
@@ -61,6 +64,26 @@ Please provide a structured analysis with headings:
 Write clearly and concisely.
 """
 
+
+def generate_insights(
+    model: genai.GenerativeModel,
+    summary: Dict[str, Any] | EncodedSummary,
+    token_budget: int = DEFAULT_TOKEN_BUDGET,
+) -> str:
+    """
+    Generate a natural-language EDA report from dataset summary.
+
+    Args:
+        model: Gemini generative model.
+        summary: Dataset summary as produced by profiling.build_summary, or
+            one already encoded with ``summary_encoder.encode_summary``.
+        token_budget: Token budget for encoding a raw summary.
+
+    Returns:
+        Human-readable multi-section report string.
+    """
+    prompt = _build_prompt(_encode(summary, token_budget))
+
     try:
         logger.info("Requesting insights from Gemini.")
         response = model.generate_content(prompt)
@@ -70,3 +93,38 @@ Write clearly and concisely.
     except Exception as exc:  # noqa: BLE001
         logger.exception("Error while generating insights from Gemini.")
         return f"Error while generating insights from Gemini: {exc}"
+
+
+def stream_insights(
+    client: LLMClient,
+    summary: Dict[str, Any] | EncodedSummary,
+    cancel: threading.Event | None = None,
+    token_budget: int = DEFAULT_TOKEN_BUDGET,
+) -> Iterator[str]:
+    """
+    Stream the EDA report chunk by chunk as the model produces it.
+
+    Args:
+        client: LLM client wrapping the Gemini model.
+        summary: Dataset summary as produced by profiling.build_summary, or
+            one already encoded with ``summary_encoder.encode_summary``.
+        cancel: Optional event that stops the stream when set.
+        token_budget: Token budget for encoding a raw summary.
+
+    Yields:
+        Report text chunks; an error message chunk if the call fails.
+    """
+    logger.info("Streaming insights from Gemini.")
+    received = 0
+    try:
+        for chunk in client.stream(_build_prompt(_encode(summary, token_budget)), cancel=cancel):
+            received += len(chunk)
+            yield chunk
+    except Exception as exc:  # noqa: BLE001
+        logger.exception("Error while streaming insights from Gemini.")
+        yield f"\n\nError while generating insights from Gemini: {exc}"
+        return
+
+    if not received:
+        yield "(No response text received.)"
+    logger.info("Streamed insights from Gemini (%d characters).", received)
@@ -0,0 +1,60 @@
+"""
+Process-wide Gemini model registry.
+
+The Gemini SDK is slow to import and ``genai.configure`` sets global state, so
+the SDK is imported on the first model request and one configured model is
+shared by the insights, Q&A and plot agents (and every session).
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from typing import TYPE_CHECKING, Dict, Tuple
+
+from config import Settings, get_settings
+
+if TYPE_CHECKING:
+    import google.generativeai as genai
+
+logger = logging.getLogger(__name__)
+
+_models: Dict[Tuple[str, str], "genai.GenerativeModel"] = {}
+_models_lock = threading.Lock()
+
+
+class LLMNotConfigured(RuntimeError):
+    """Raised when a model is requested but no API key is configured."""
+
+
+def get_gemini_model(settings: Settings | None = None) -> "genai.GenerativeModel":
+    """
+    Return the shared Gemini model, configuring the SDK on first use.
+
+    Args:
+        settings: App settings with API key and model name (defaults to the
+            process-wide settings).
+
+    Returns:
+        Configured GenerativeModel instance.
+
+    Raises:
+        LLMNotConfigured: If no API key is set.
+    """
+    settings = settings or get_settings()
+    if not settings.llm_configured:
+        raise LLMNotConfigured(
+            "GEMINI_API_KEY is not set. Set it in your environment or .env file."
+        )
+
+    key = (settings.gemini_api_key, settings.gemini_model_name)
+    with _models_lock:
+        model = _models.get(key)
+        if model is None:
+            import google.generativeai as genai
+
+            logger.info("Initializing Gemini with model %s", settings.gemini_model_name)
+            genai.configure(api_key=settings.gemini_api_key)
+            model = genai.GenerativeModel(settings.gemini_model_name)
+            _models[key] = model
+        return model
@@ -0,0 +1,251 @@
+"""
+Process-wide dataset registry and memory governor for the Streamlit server.
+
+Sessions that upload the same file share one read-only frame through the
+result cache, keyed by content hash. The governor records which dataset each
+session is using and keeps everything derived from datasets (normalized
+frames, column indexes, figures, summaries, ...) under a global memory
+budget. When the budget is exceeded it evicts derived artifacts in LRU
+order, then the base frames of datasets no session is using. Base frames of
+datasets with active sessions are never evicted.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Tuple
+
+from pipeline.cache import ResultCache, dataset_memos
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SESSION_TTL_SECONDS = 30 * 60
+BASE_STAGES = ("frame",)
+
+_governor: "MemoryGovernor | None" = None
+_governor_lock = threading.Lock()
+
+
+@dataclass
+class Artifact:
+    """One evictable (or pinned) item tracked by the governor."""
+
+    source: str  # "result_cache" or the DatasetMemo name
+    dataset: Any
+    name: str
+    nbytes: int
+    last_used: float
+    base: bool
+    evict: Callable[[], int]
+
+
+class MemoryGovernor:
+    """
+    Tracks sessions per dataset and enforces a global memory budget.
+
+    Args:
+        result_cache: Process-wide cache holding frames and derived results.
+        budget_bytes: Target for the combined size of all tracked artifacts.
+        session_ttl: Seconds after which a silent session no longer pins its
+            dataset (Streamlit does not report closed sessions).
+    """
+
+    def __init__(
+        self,
+        result_cache: ResultCache,
+        budget_bytes: int,
+        session_ttl: float = DEFAULT_SESSION_TTL_SECONDS,
+    ) -> None:
+        self.result_cache = result_cache
+        self.budget_bytes = budget_bytes
+        self.session_ttl = session_ttl
+        self.evictions = 0
+        self.evicted_bytes = 0
+        self._sessions: Dict[str, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    # -- sessions -----------------------------------------------------------
+
+    def touch(self, session_id: str, digest: str) -> None:
+        """Record that ``session_id`` is currently working on ``digest``."""
+        with self._lock:
+            self._sessions[session_id] = (digest, time.time())
+
+    def active_sessions(self) -> Dict[str, str]:
+        """Map of live session id to dataset digest (expired ones dropped)."""
+        cutoff = time.time() - self.session_ttl
+        with self._lock:
+            for session_id in [s for s, (_, seen) in self._sessions.items() if seen < cutoff]:
+                del self._sessions[session_id]
+            return {session_id: digest for session_id, (digest, _) in self._sessions.items()}
+
+    # -- artifacts ----------------------------------------------------------
+
+    def artifacts(self) -> List[Artifact]:
+        """Everything the governor accounts for, with current sizes."""
+        self.result_cache.refresh_sizes(skip_stages=BASE_STAGES)
+        # Cache timestamps are monotonic; put everything on one clock.
+        offset = time.time() - time.monotonic()
+
+        items: List[Artifact] = []
+        for entry in self.result_cache.entries():
+            digest, stage = entry["digest"], entry["stage"]
+            items.append(
+                Artifact(
+                    source="result_cache",
+                    dataset=digest,
+                    name=stage,
+                    nbytes=entry["bytes"],
+                    last_used=entry["last_used"] + offset,
+                    base=stage in BASE_STAGES,
+                    evict=lambda d=digest, s=stage: self.result_cache.discard(d, s),
+                )
+            )
+        for memo in dataset_memos():
+            for entry in memo.entries():
+                key = entry["key"]
+                items.append(
+                    Artifact(
+                        source=memo.name,
+                        dataset=key,
+                        name=memo.name,
+                        nbytes=entry["bytes"],
+                        last_used=entry["last_used"] + offset,
+                        base=False,
+                        evict=lambda m=memo, k=key: m.forget(k),
+                    )
+                )
+        return items
+
+    def enforce(self) -> List[Artifact]:
+        """
+        Evict artifacts until the tracked total fits the budget.
+
+        Derived artifacts go first (least recently used first), then base
+        frames of datasets without an active session.
+
+        Returns:
+            The evicted artifacts.
+        """
+        items = self.artifacts()
+        total = sum(item.nbytes for item in items)
+        if total <= self.budget_bytes:
+            return []
+
+        pinned = set(self.active_sessions().values())
+        candidates = sorted(
+            (item for item in items if not (item.base and item.dataset in pinned)),
+            key=lambda item: (item.base, item.last_used),
+        )
+
+        evicted = []
+        for item in candidates:
+            if total <= self.budget_bytes:
+                break
+            item.evict()
+            total -= item.nbytes
+            evicted.append(item)
+            self.evictions += 1
+            self.evicted_bytes += item.nbytes
+            logger.info(
+                "Memory governor evicted %s/%s (%.1f MB).",
+                str(item.dataset)[:8],
+                item.name,
+                item.nbytes / 1e6,
+            )
+
+        if total > self.budget_bytes:
+            logger.warning(
+                "Memory still over budget after eviction (%.1f / %.1f MB); "
+                "only frames of active datasets remain.",
+                total / 1e6,
+                self.budget_bytes / 1e6,
+            )
+        return evicted
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Summarize memory use per dataset and per session.
+
+        Shared artifacts are attributed to sessions in equal parts.
+
+        Returns:
+            Dict with ``budget_bytes``, ``total_bytes``, ``evictions``,
+            ``datasets``, ``sessions`` and ``artifacts`` tables.
+        """
+        items = self.artifacts()
+        sessions = self.active_sessions()
+        users: Dict[Any, int] = {}
+        for digest in sessions.values():
+            users[digest] = users.get(digest, 0) + 1
+
+        datasets: Dict[Any, Dict[str, Any]] = {}
+        for item in items:
+            row = datasets.setdefault(
+                item.dataset,
+                {"dataset": str(item.dataset), "sessions": users.get(item.dataset, 0),
+                 "base_bytes": 0, "derived_bytes": 0},
+            )
+            row["base_bytes" if item.base else "derived_bytes"] += item.nbytes
+
+        session_rows = []
+        for session_id, digest in sessions.items():
+            row = datasets.get(digest, {"base_bytes": 0, "derived_bytes": 0})
+            session_rows.append(
+                {
+                    "session": session_id,
+                    "dataset": digest,
+                    "attributed_bytes": (row["base_bytes"] + row["derived_bytes"])
+                    // max(users.get(digest, 1), 1),
+                }
+            )
+
+        return {
+            "budget_bytes": self.budget_bytes,
+            "total_bytes": sum(item.nbytes for item in items),
+            "evictions": self.evictions,
+            "evicted_bytes": self.evicted_bytes,
+            "datasets": list(datasets.values()),
+            "sessions": session_rows,
+            "artifacts": [
+                {
+                    "source": item.source,
+                    "dataset": str(item.dataset),
+                    "name": item.name,
+                    "bytes": item.nbytes,
+                    "idle_seconds": round(time.time() - item.last_used, 1),
+                    "base": item.base,
+                }
+                for item in sorted(items, key=lambda item: -item.nbytes)
+            ],
+        }
+
+
+def configure_governor(
+    result_cache: ResultCache,
+    budget_bytes: int,
+    session_ttl: float = DEFAULT_SESSION_TTL_SECONDS,
+) -> MemoryGovernor:
+    """
+    Create the process-wide governor on first call and return it.
+
+    Args:
+        result_cache: Process-wide result cache.
+        budget_bytes: Global memory budget.
+        session_ttl: Idle seconds before a session stops pinning its dataset.
+    """
+    global _governor
+    with _governor_lock:
+        if _governor is None or _governor.result_cache is not result_cache:
+            _governor = MemoryGovernor(result_cache, budget_bytes, session_ttl)
+        _governor.budget_bytes = budget_bytes
+        _governor.session_ttl = session_ttl
+        return _governor
+
+
+def get_governor() -> MemoryGovernor | None:
+    """Return the process-wide governor, or None before the app configured it."""
+    return _governor
@@ -0,0 +1,100 @@
+"""
+Shared text normalization for the Q&A and plot agents.
+
+Text columns are stripped, lowercased and have a trailing 's' removed so that
+user questions are robust to case and simple pluralization. Only the unique
+values of each column are normalized; rows are mapped back through integer
+codes, so the per-row work is a single array take. The normalized frame is
+computed once per dataset and reused by both agents.
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import Hashable
+
+import numpy as np
+import pandas as pd
+
+from pipeline.cache import DatasetMemo
+
+logger = logging.getLogger(__name__)
+
+_normalized_frames = DatasetMemo("normalized_frame")
+
+
+def normalize_text_values(values: pd.Index | np.ndarray) -> np.ndarray:
+    """
+    Normalize an array of (unique) values: str, strip, lowercase, rstrip 's'.
+
+    Args:
+        values: Values to normalize.
+
+    Returns:
+        Object array of normalized strings.
+    """
+    normalized = (
+        pd.Index(values, dtype=object)
+        .astype(str)
+        .str.strip()
+        .str.lower()
+        .str.rstrip("s")  # simple singular/plural handling
+    )
+    return np.asarray(normalized, dtype=object)
+
+
+def normalize_text_df(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Create a normalized view of df where:
+    - all object/category columns are stripped, lowercased,
+      and have a trailing 's' removed for simple plurals.
+
+    Missing values are rendered as ``astype(str)`` renders them. Other columns
+    are shared with ``df`` rather than copied.
+
+    Args:
+        df: Input DataFrame (not modified).
+
+    Returns:
+        Normalized DataFrame.
+    """
+    df_norm = df.copy(deep=False)
+
+    obj_cols = df.select_dtypes(include=["object", "category"]).columns
+    for col in obj_cols:
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            categories = series.cat.categories
+            # Extra slot for missing values (code -1).
+            lookup = np.append(
+                normalize_text_values(categories), normalize_text_values([np.nan])
+            )
+            codes = series.cat.codes.to_numpy()
+            codes = np.where(codes < 0, len(categories), codes)
+        else:
+            # Missing values become their own unique so they normalize
+            # exactly as ``astype(str)`` would render them.
+            codes, uniques = pd.factorize(series, use_na_sentinel=False)
+            lookup = normalize_text_values(uniques)
+
+        df_norm[col] = pd.Series(lookup.take(codes), index=df.index, dtype=object)
+
+    logger.info("Normalized %d text columns.", len(obj_cols))
+    return df_norm
+
+
+def get_normalized_frame(df: pd.DataFrame, dataset_key: Hashable | None = None) -> pd.DataFrame:
+    """
+    Return the normalized frame for ``df``, computing it at most once per
+    dataset version.
+
+    Args:
+        df: Original DataFrame. Treated as read-only.
+        dataset_key: Stable identifier of the dataset version (e.g. the upload
+            content hash). Defaults to the identity of ``df``.
+
+    Returns:
+        Shared normalized DataFrame. Callers that may mutate it should take a
+        shallow copy first.
+    """
+    return _normalized_frames.get_or_compute(df, normalize_text_df, dataset_key)
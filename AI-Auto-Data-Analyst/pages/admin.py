@@ -0,0 +1,44 @@
+"""
+Admin page: memory use of shared datasets and sessions on this server.
+"""
+
+from __future__ import annotations
+
+import pandas as pd
+import streamlit as st
+
+from pipeline.memory_governor import get_governor
+
+
+st.set_page_config(page_title="Auto Analyst – Admin", layout="wide")
+st.title("🛠️ Memory Governor")
+
+governor = get_governor()
+if governor is None:
+    st.info("No dataset has been loaded on this server yet.")
+    st.stop()
+
+if st.button("Enforce budget now"):
+    evicted = governor.enforce()
+    st.success(f"Evicted {len(evicted)} artifacts.")
+
+report = governor.report()
+
+col1, col2, col3, col4 = st.columns(4)
+col1.metric("Tracked memory", f"{report['total_bytes'] / 1e6:,.1f} MB")
+col2.metric("Budget", f"{report['budget_bytes'] / 1e6:,.0f} MB")
+col3.metric("Active sessions", len(report["sessions"]))
+col4.metric(
+    "Evictions", report["evictions"], help=f"{report['evicted_bytes'] / 1e6:,.1f} MB freed"
+)
+st.progress(min(report["total_bytes"] / max(report["budget_bytes"], 1), 1.0))
+
+st.subheader("Datasets")
+st.dataframe(pd.DataFrame(report["datasets"]), use_container_width=True)
+
+st.subheader("Sessions")
+st.caption("Shared frames and artifacts are split evenly between the sessions using them.")
+st.dataframe(pd.DataFrame(report["sessions"]), use_container_width=True)
+
+st.subheader("Artifacts")
+st.dataframe(pd.DataFrame(report["artifacts"]), use_container_width=True)
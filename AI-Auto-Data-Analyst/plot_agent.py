@@ -1,6 +1,11 @@
 """
-Plot agent: uses Gemini to generate matplotlib/seaborn code
-and returns a matplotlib Figure for Streamlit to display.
+Plot agent: uses Gemini to generate plotting code and returns a chart for
+Streamlit to display.
+
+The prompt steers the model to the aggregated chart builders in
+``aggregated_charts`` (exposed as ``charts``), which downsample or aggregate
+before drawing, so chart latency does not grow with the number of rows.
+matplotlib/seaborn remain available for chart types the builders lack.
 """
 
 from __future__ import annotations
@@ -8,24 +13,28 @@ from __future__ import annotations
 import json
 import logging
 import re
-from typing import Any, Tuple, Dict
+from typing import TYPE_CHECKING, Any, Dict, List, Tuple
 
-import google.generativeai as genai
-import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 
-from config import Settings, settings as default_settings
+from config import Settings
+from pipeline.aggregated_charts import DEFAULT_MAX_POINTS, MAX_POINTS_LIMIT, AggregatedChart
+from pipeline.column_metadata import get_column_summary
+from pipeline.column_retrieval import referenced_columns, select_prompt_columns, suggest_columns
+from pipeline.llm_model import get_gemini_model
+from pipeline.normalization import get_normalized_frame
+from pipeline.sandbox import SandboxExecutor, execute_plot_code
+from pipeline.tracing import annotate, span, traced
+
+if TYPE_CHECKING:
+    import google.generativeai as genai
 
 logger = logging.getLogger(__name__)
 
 
-def init_plot_model(settings: Settings = default_settings) -> genai.GenerativeModel:
-    """Initialize Gemini model for visualization prompts."""
-    genai.configure(api_key=settings.gemini_api_key)
-    model = genai.GenerativeModel(settings.gemini_model_name)
-    return model
+def init_plot_model(settings: Settings | None = None) -> genai.GenerativeModel:
+    """Return the shared Gemini model for visualization prompts."""
+    return get_gemini_model(settings)
 
 
 def _clean_model_code(raw_code: str) -> str:
@@ -36,73 +45,36 @@ def _clean_model_code(raw_code: str) -> str:
     return code
 
 
-def _normalize_text_df(df: pd.DataFrame) -> pd.DataFrame:
-    """
-    Create a normalized copy of df where:
-    - all object/category columns are stripped, lowercased,
-      and have a trailing 's' removed for simple plurals.
-    """
-    df_norm = df.copy()
-
-    obj_cols = df_norm.select_dtypes(include=["object", "category"]).columns
-    for col in obj_cols:
-        df_norm[col] = (
-            df_norm[col]
-            .astype(str)
-            .str.strip()
-            .str.lower()
-            .str.rstrip("s")
-        )
-
-    return df_norm
-
-
-def _build_column_summary(df: pd.DataFrame) -> Dict[str, Dict[str, Any]]:
-    """Summarise columns + some sample values for the model."""
-    summary: Dict[str, Dict[str, Any]] = {}
-    for col in df.columns:
-        series = df[col]
-        info: Dict[str, Any] = {"dtype": str(series.dtype)}
-        if series.dtype == "object" or pd.api.types.is_categorical_dtype(series):
-            info["sample_values"] = (
-                series.dropna().astype(str).unique()[:20].tolist()
-            )
-        summary[col] = info
-    return summary
-
-
-def run_plot_query(
-    model: genai.GenerativeModel,
+def _build_prompt(
     question: str,
-    df: pd.DataFrame,
-) -> Tuple[str, Any]:
-    """
-    Ask Gemini to generate plotting code to visualise df, then execute it.
-
-    Returns:
-        (generated_code, result)
-        where result is:
-          - a matplotlib Figure,
-          - a list of Figures, or
-          - an error / info string.
-    """
-    df_norm = _normalize_text_df(df)
-
-    column_names = df_norm.columns.tolist()
-    col_summary = _build_column_summary(df_norm)
+    column_names: List[Any],
+    col_summary: Dict[str, Dict[str, Any]],
+    total_columns: int,
+    rows: int,
+) -> str:
+    """Build the plotting prompt describing only ``column_names``."""
+    described = {col: col_summary[col] for col in column_names}
+    scope = ""
+    if len(column_names) < total_columns:
+        scope = (
+            f"\n(df has {total_columns} columns in total; only the "
+            f"{len(column_names)} most relevant to the request are listed.)\n"
+        )
 
-    prompt = f"""
+    return f"""
 You are a data visualization expert with access to a pandas DataFrame named df.
 
 The DataFrame df has already been NORMALIZED:
 - text columns are stripped and lowercased
 - simple plural 's' has been removed (e.g. "laptop" and "laptops" → "laptop")
 
+df has {rows:,} rows.
+
 Here are the columns in df:
 {column_names}
-
+{scope}
 Here is additional information about the columns:
-{json.dumps(col_summary, indent=2)}
+{json.dumps(described, indent=2)}
 
 User request for a chart:
 \"\"\"{question}\"\"\"
@@ -110,56 +82,167 @@ User request for a chart:
 
 INSTRUCTIONS:
 
-1. Use pandas, numpy (np), matplotlib.pyplot as plt, and optionally seaborn as sns.
-2. Do NOT import any modules (assume they are already imported).
-3. Use ONLY the DataFrame named df (the normalized one).
-4. Create ONE main matplotlib Figure object and assign it to a variable called `fig`.
-   - You may create subplots inside that figure if needed.
-5. Do NOT call plt.show() or save figures to disk.
-6. The last line of your code should leave `fig` defined as the Figure to display.
+1. PREFER the aggregated chart API `charts`. It downsamples or aggregates
+   before drawing, so it stays fast on any number of rows. Assign the result
+   to a variable called `chart`:
+
+       chart = charts.line(df, x, y, color=None, max_points={DEFAULT_MAX_POINTS}, method="lttb")
+           # y over x (sorted by x), downsampled; method "lttb" or "minmax";
+           # color = column drawing one line per group; x and y must be
+           # numeric or datetime (use charts.bar for categories)
+       chart = charts.scatter(df, x, y, color=None, max_points={DEFAULT_MAX_POINTS}, bins=64)
+           # points when small, a density grid of row counts when large
+       chart = charts.bar(df, x, y=None, agg="sum", top_n=20)
+           # agg of y per x value (agg: sum, mean, median, min, max, count);
+           # y=None counts rows
+       chart = charts.histogram(df, column, bins=50)
+       chart = charts.box(df, y, by=None, top_n=20)
+
+   x, y, color, column and by are column names. Every builder also accepts
+   title="...". max_points is capped at {MAX_POINTS_LIMIT}. Filter df first
+   if the request asks for a subset, e.g.
+   `chart = charts.line(df[df['product'] == 'laptop'], 'date', 'units_sold')`.
+
+2. ONLY if the request cannot be expressed with `charts`, use matplotlib
+   (plt) or seaborn (sns) with pandas (pd) and numpy (np):
+   - aggregate (groupby) or sample df down to at most {MAX_POINTS_LIMIT} rows
+     before plotting, never plot every row;
+   - create ONE matplotlib Figure and assign it to a variable called `fig`
+     (subplots inside it are fine);
+   - do NOT call plt.show() or save figures to disk.
+3. Do NOT import any modules (assume they are already available).
+4. Use ONLY the DataFrame named df (the normalized one).
 
 Return ONLY the Python code, no explanations, no comments, no markdown.
 """
 
-    logger.info("Asking Gemini to generate plot code for: %s", question)
-    response = model.generate_content(prompt)
-    raw_code = response.text or ""
+
+def _generate_code(model: genai.GenerativeModel, prompt: str) -> str:
+    """Send ``prompt`` to the model and return the cleaned plot code."""
+    with span("plot.generate_code", prompt_chars=len(prompt)) as current:
+        response = model.generate_content(prompt)
+        raw_code = response.text or ""
+        current.set(response_chars=len(raw_code))
     code = _clean_model_code(raw_code)
 
     logger.debug("Raw plot code from Gemini: %s", raw_code)
     logger.info("Cleaned plot code to execute: %s", code)
+    return code
 
-    # Restricted execution environment
-    safe_globals = {"__builtins__": {}}
-    safe_locals = {
-        "df": df_norm,
-        "pd": pd,
-        "np": np,
-        "plt": plt,
-        "sns": sns,
-    }
 
-    try:
-        compiled = compile(code, "<plot_code>", "exec")
-        exec(compiled, safe_globals, safe_locals)
+def _execute_code(
+    code: str,
+    df_norm: pd.DataFrame,
+    executor: SandboxExecutor | None,
+    dataset_key: str | None,
+) -> Any:
+    """
+    Run generated plot code in-process, or in the sandbox when one is given.
 
-        fig = safe_locals.get("fig", None)
+    Returns:
+        An AggregatedChart, a Figure or list of Figures (in-process), PNG
+        bytes or a list of PNG bytes (sandbox), or None if the code produced
+        no chart.
+    """
+    if executor is not None:
+        with span("plot.execute", sandbox=True):
+            result = executor.run(code, df_norm, "plot", dataset_key)
+        if isinstance(result, AggregatedChart):
+            annotate(chart=result.kind, marks=result.marks)
+        return result
+
+    with span("plot.execute", sandbox=False):
+        safe_locals = execute_plot_code(code, df_norm)
+    from matplotlib.figure import Figure  # loaded by execute_plot_code
+
+    chart = safe_locals.get("chart", None)
+    if isinstance(chart, AggregatedChart):
+        annotate(chart=chart.kind, marks=chart.marks)
+        return chart
+
+    # One figure
+    fig = safe_locals.get("fig", None)
+    if isinstance(fig, Figure):
+        return fig
+
+    # If model created multiple figures, allow list
+    figs = safe_locals.get("figs", None)
+    if isinstance(figs, list) and all(
+        isinstance(f, Figure) for f in figs
+    ):
+        return figs
+    return None
+
+
+@traced("plot.run_plot_query")
+def run_plot_query(
+    model: genai.GenerativeModel,
+    question: str,
+    df: pd.DataFrame,
+    dataset_key: str | None = None,
+    executor: SandboxExecutor | None = None,
+) -> Tuple[str, Any]:
+    """
+    Ask Gemini to generate plotting code to visualise df, then execute it.
 
-        # One figure
-        from matplotlib.figure import Figure
-        if isinstance(fig, Figure):
-            return code, fig
+    Returns:
+        (generated_code, result)
+        where result is:
+          - an AggregatedChart (bounded data, rendered with Altair or
+            matplotlib),
+          - a matplotlib Figure,
+          - a list of Figures,
+          - PNG bytes or a list of PNG bytes (when run in ``executor``), or
+          - an error / info string.
+
+    ``dataset_key`` identifies the dataset version so the normalized frame is
+    shared with the Q&A agent instead of being rebuilt per request. On wide
+    datasets only the columns relevant to the request are described; code
+    that uses a column left out of the prompt is regenerated once with it.
+    ``executor`` optionally runs the code in a process sandbox with time and
+    memory limits.
+    """
+    annotate(rows=len(df), cols=df.shape[1])
+    with span("plot.normalize"):
+        df_norm = get_normalized_frame(df, dataset_key)
 
-        # If model created multiple figures, allow list
-        figs = safe_locals.get("figs", None)
-        if isinstance(figs, list) and all(
-            isinstance(f, Figure) for f in figs
-        ):
-            return code, figs
+    total_columns = df_norm.shape[1]
+    col_summary = get_column_summary(df_norm, dataset_key)
+    column_names = select_prompt_columns(df_norm, question, dataset_key)
+
+    def build_prompt(names: List[Any]) -> str:
+        return _build_prompt(question, names, col_summary, total_columns, len(df_norm))
+
+    logger.info("Asking Gemini to generate plot code for: %s", question)
+    code = _generate_code(model, build_prompt(column_names))
+
+    missing = referenced_columns(code, df_norm.columns, column_names)
+    if missing:
+        logger.info("Generated plot code uses columns left out of the prompt: %s", missing)
+        column_names = column_names + missing
+        code = _generate_code(model, build_prompt(column_names))
+
+    try:
+        try:
+            result = _execute_code(code, df_norm, executor, dataset_key)
+        except KeyError as exc:
+            # Only worth a retry when the prompt left columns out.
+            if len(column_names) == total_columns:
+                raise
+            extra = suggest_columns(df_norm, str(exc), column_names, dataset_key)
+            if not extra:
+                raise
+            logger.info("Retrying plot with columns similar to %s: %s", exc, extra)
+            column_names = column_names + extra
+            code = _generate_code(model, build_prompt(column_names))
+            result = _execute_code(code, df_norm, executor, dataset_key)
+
+        if result is not None:
+            return code, result
 
         # Fallback if nothing usable is returned
         return code, (
-            "The code ran but did not produce a `fig` or `figs` object. "
+            "The code ran but did not produce a `chart`, `fig` or `figs` object. "
             "Please try rephrasing your chart request."
         )
 
@@ -5,27 +5,69 @@ Dataset profiling: builds JSON-serializable summaries for LLMs and UI.
 from __future__ import annotations
 
 import logging
-from typing import Dict, Any
+import os
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Sequence, Tuple
 
 import numpy as np
 import pandas as pd
 
+from pipeline.dataset_stats import DatasetStats
+
 logger = logging.getLogger(__name__)
 
+# Upper bound for the float64 buffer materialized per column block; taller
+# columns are scanned in row blocks of this size.
+DEFAULT_BLOCK_BYTES = 64 * 1024 * 1024
+# Cap on the extra memory all profiling threads may hold at once.
+DEFAULT_MEMORY_BUDGET_BYTES = 1024 * 1024 * 1024
+# Peak working memory of a column block relative to its float64 buffer
+# (buffer, NaN mask and the zero-filled copy used for the moments).
+BLOCK_PEAK_FACTOR = 2.2
+DEFAULT_QUANTILE_SAMPLE_SIZE = 100_000
+QUANTILES = (25.0, 50.0, 75.0)
+
 
-def build_summary(df: pd.DataFrame) -> Dict[str, Any]:
+def build_summary(
+    df: pd.DataFrame | None,
+    n_jobs: int | None = None,
+    approx_quantiles: bool = False,
+    quantile_sample_size: int = DEFAULT_QUANTILE_SAMPLE_SIZE,
+    stats: DatasetStats | None = None,
+) -> Dict[str, Any]:
     """
     Build a compact summary of the dataset suitable for:
     - Display in UI
     - Passing to LLMs as JSON
 
+    Numeric statistics are computed by a fused engine: columns are processed
+    in blocks, each block is materialized once as a float64 array and every
+    statistic is derived from it with vectorized numpy reductions. Blocks are
+    spread across a thread pool (numpy releases the GIL for these kernels).
+
     Args:
         df: Input DataFrame.
+        n_jobs: Worker threads for column blocks (defaults to CPU count).
+        approx_quantiles: Estimate quartiles from a uniform row sample instead
+            of the full column. Recommended for very large inputs.
+        quantile_sample_size: Rows sampled when ``approx_quantiles`` is set.
+        stats: Precomputed (possibly incrementally merged) statistics. When
+            given, the summary is emitted from them and ``df`` is not scanned.
 
     Returns:
         Dictionary with rows, cols, dtypes, missing values, numeric summary.
     """
-    if df.empty:
+    if stats is not None:
+        summary = stats.to_summary()
+        logger.info(
+            "Built summary from dataset stats: %d rows, %d cols",
+            summary["rows"],
+            summary["cols"],
+        )
+        return summary
+
+    if df is None or df.empty:
         logger.warning("build_summary called with empty DataFrame.")
         return {
             "rows": 0,
@@ -37,13 +79,29 @@ def build_summary(df: pd.DataFrame) -> Dict[str, Any]:
 
     rows, cols = df.shape
     dtypes = df.dtypes.astype(str).to_dict()
-    missing_values = df.isna().sum().to_dict()
+
+    numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
+    numeric_set = set(numeric_cols)
+    other_cols = [col for col in df.columns if col not in numeric_set]
 
     try:
-        numeric_summary = df.describe(include=[np.number]).to_dict()
+        numeric_summary, numeric_missing = _profile_numeric(
+            df,
+            numeric_cols,
+            n_jobs=n_jobs,
+            approx_quantiles=approx_quantiles,
+            quantile_sample_size=quantile_sample_size,
+        )
     except Exception:  # noqa: BLE001
         logger.exception("Failed to compute numeric summary.")
         numeric_summary = {}
+        numeric_missing = df[numeric_cols].isna().sum().to_dict()
+
+    other_missing = df[other_cols].isna().sum().to_dict() if other_cols else {}
+    missing_values = {
+        col: int(numeric_missing[col] if col in numeric_set else other_missing[col])
+        for col in df.columns
+    }
 
     summary: Dict[str, Any] = {
         "rows": rows,
@@ -61,3 +119,184 @@ def build_summary(df: pd.DataFrame) -> Dict[str, Any]:
     )
     return summary
 
+
+def _profile_numeric(
+    df: pd.DataFrame,
+    numeric_cols: List[Any],
+    n_jobs: int | None,
+    approx_quantiles: bool,
+    quantile_sample_size: int,
+) -> Tuple[Dict[Any, Dict[str, float]], Dict[Any, int]]:
+    """Compute describe()-style stats and missing counts for numeric columns."""
+    if not numeric_cols:
+        return {}, {}
+
+    rows = len(df)
+    column_bytes = rows * 8
+    sample_idx = None
+    if approx_quantiles and rows > quantile_sample_size:
+        rng = np.random.default_rng(0)
+        sample_idx = np.sort(rng.choice(rows, size=quantile_sample_size, replace=False))
+
+    if column_bytes > DEFAULT_BLOCK_BYTES:
+        # Tall columns: moments from row blocks, one column per task.
+        row_block = max(DEFAULT_BLOCK_BYTES // 8, 1)
+        tasks = [[col] for col in numeric_cols]
+        quantile_bytes = 0 if sample_idx is not None else 2 * column_bytes
+        task_peak = BLOCK_PEAK_FACTOR * DEFAULT_BLOCK_BYTES + quantile_bytes
+
+        def run(cols: List[Any]) -> Tuple[Dict[Any, Dict[str, float]], Dict[Any, int]]:
+            return _profile_tall_column(df, cols[0], sample_idx, row_block)
+
+    else:
+        block_cols = max(1, DEFAULT_BLOCK_BYTES // max(column_bytes, 1))
+        tasks = [
+            numeric_cols[i : i + block_cols] for i in range(0, len(numeric_cols), block_cols)
+        ]
+        task_peak = BLOCK_PEAK_FACTOR * block_cols * column_bytes
+
+        def run(cols: List[Any]) -> Tuple[Dict[Any, Dict[str, float]], Dict[Any, int]]:
+            return _profile_block(df, cols, sample_idx)
+
+    # Threads are capped so their combined working memory fits the budget.
+    memory_workers = max(1, int(DEFAULT_MEMORY_BUDGET_BYTES // max(task_peak, 1)))
+    workers = min(n_jobs or os.cpu_count() or 1, len(tasks), memory_workers)
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(run, tasks))
+    else:
+        results = [run(task) for task in tasks]
+
+    numeric_summary: Dict[Any, Dict[str, float]] = {}
+    missing: Dict[Any, int] = {}
+    for block_summary, block_missing in results:
+        numeric_summary.update(block_summary)
+        missing.update(block_missing)
+    return numeric_summary, missing
+
+
+def _profile_block(
+    df: pd.DataFrame,
+    cols: Sequence[Any],
+    sample_idx: np.ndarray | None,
+) -> Tuple[Dict[Any, Dict[str, float]], Dict[Any, int]]:
+    """Profile one block of numeric columns from a single float64 buffer."""
+    # Column-major buffer: one contiguous row per column keeps every reduction
+    # (and especially the quantile partition) cache-friendly.
+    values = np.ascontiguousarray(
+        df[list(cols)].to_numpy(dtype="float64", na_value=np.nan).T
+    )
+    nan_mask = np.isnan(values)
+    missing = nan_mask.sum(axis=1)
+    count = values.shape[1] - missing
+    has_nan = missing > 0
+
+    with warnings.catch_warnings(), np.errstate(invalid="ignore", divide="ignore"):
+        warnings.simplefilter("ignore", RuntimeWarning)
+        if has_nan.any():
+            # Fill once and derive every moment from the filled buffer instead
+            # of letting each nan* reduction make its own copy.
+            filled = np.where(nan_mask, 0.0, values)
+            mean = filled.sum(axis=1) / count
+            filled -= mean[:, None]
+            filled[nan_mask] = 0.0
+            std = np.sqrt(np.einsum("ij,ij->i", filled, filled) / (count - 1))
+            # fmin/fmax skip NaNs without materializing filled copies.
+            col_min = np.fmin.reduce(values, axis=1)
+            col_max = np.fmax.reduce(values, axis=1)
+            empty = count == 0
+            mean[empty] = std[empty] = col_min[empty] = col_max[empty] = np.nan
+            del filled
+        else:
+            mean = values.mean(axis=1)
+            std = values.std(axis=1, ddof=1)
+            col_min = values.min(axis=1)
+            col_max = values.max(axis=1)
+
+        q_values = values if sample_idx is None else values[:, sample_idx]
+        quartiles = np.full((len(QUANTILES), len(cols)), np.nan)
+        dense = ~has_nan
+        if dense.all() and q_values.shape[1]:
+            quartiles = np.percentile(q_values, QUANTILES, axis=1)
+        elif dense.any() and q_values.shape[1]:
+            quartiles[:, dense] = np.percentile(q_values[dense], QUANTILES, axis=1)
+        for i in np.flatnonzero(has_nan & (count > 0)):
+            column = q_values[i]
+            column = column[~np.isnan(column)]
+            if column.size:
+                quartiles[:, i] = np.percentile(column, QUANTILES)
+
+    block_summary: Dict[Any, Dict[str, float]] = {}
+    for i, col in enumerate(cols):
+        block_summary[col] = {
+            "count": float(count[i]),
+            "mean": float(mean[i]),
+            "std": float(std[i]),
+            "min": float(col_min[i]),
+            "25%": float(quartiles[0, i]),
+            "50%": float(quartiles[1, i]),
+            "75%": float(quartiles[2, i]),
+            "max": float(col_max[i]),
+        }
+
+    return block_summary, {col: int(missing[i]) for i, col in enumerate(cols)}
+
+
+def _profile_tall_column(
+    df: pd.DataFrame,
+    col: Any,
+    sample_idx: np.ndarray | None,
+    row_block: int,
+) -> Tuple[Dict[Any, Dict[str, float]], Dict[Any, int]]:
+    """
+    Profile one column too tall for a single block.
+
+    Moments are computed per row block and merged (Chan et al.), so only one
+    block is materialized at a time. Exact quartiles still need the column's
+    non-missing values once; with ``sample_idx`` only the sample is gathered.
+    """
+    series = df[col]
+    count, mean, m2, missing = 0, 0.0, 0.0, 0
+    col_min, col_max = np.inf, -np.inf
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for start in range(0, len(series), row_block):
+            chunk = series.iloc[start : start + row_block].to_numpy(
+                dtype="float64", na_value=np.nan
+            )
+            valid = chunk[~np.isnan(chunk)]
+            missing += len(chunk) - len(valid)
+            if not valid.size:
+                continue
+            block_mean = float(valid.mean())
+            block_m2 = float(np.square(valid - block_mean).sum())
+            merged = count + valid.size
+            delta = block_mean - mean
+            mean += delta * valid.size / merged
+            m2 += block_m2 + delta * delta * count * valid.size / merged
+            count = merged
+            col_min = min(col_min, float(valid.min()))
+            col_max = max(col_max, float(valid.max()))
+
+    quartiles = [np.nan] * len(QUANTILES)
+    if count:
+        if sample_idx is None:
+            values = series.to_numpy(dtype="float64", na_value=np.nan)
+        else:
+            values = series.take(sample_idx).to_numpy(dtype="float64", na_value=np.nan)
+        # Boolean indexing copies, so the percentile may partition in place.
+        values = values[~np.isnan(values)]
+        if values.size:
+            quartiles = np.percentile(values, QUANTILES, overwrite_input=True).tolist()
+        del values
+
+    stats = {
+        "count": float(count),
+        "mean": mean if count else np.nan,
+        "std": float(np.sqrt(m2 / (count - 1))) if count > 1 else np.nan,
+        "min": col_min if count else np.nan,
+        "25%": float(quartiles[0]),
+        "50%": float(quartiles[1]),
+        "75%": float(quartiles[2]),
+        "max": col_max if count else np.nan,
+    }
+    return {col: stats}, {col: int(missing)}
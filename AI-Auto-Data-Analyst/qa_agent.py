@@ -7,6 +7,7 @@ Key behaviors:
 - User questions do NOT need to match case or simple pluralization.
 - We normalize all string columns to lowercase / singular inside the agent.
 - Friendly error messages instead of raw tracebacks.
+- Large datasets can be answered with DuckDB SQL instead of pandas code.
 """
 
 from __future__ import annotations
@@ -14,107 +15,54 @@ from __future__ import annotations
 import json
 import logging
 import re
-from typing import Any, Tuple, Dict
+from typing import TYPE_CHECKING, Any, Dict, List, Tuple
 
-import google.generativeai as genai
-import numpy as np
 import pandas as pd
 
-from config import Settings, settings as default_settings
+from config import Settings
+from pipeline.column_metadata import get_column_summary
+from pipeline.column_retrieval import referenced_columns, select_prompt_columns, suggest_columns
+from pipeline.llm_model import get_gemini_model
+from pipeline.normalization import get_normalized_frame
+from pipeline.sandbox import SandboxExecutor, execute_query_code
+from pipeline.sql_engine import get_sql_engine, select_engine
+from pipeline.tracing import annotate, span, traced
+
+if TYPE_CHECKING:
+    import google.generativeai as genai
 
 logger = logging.getLogger(__name__)
 
 
-def init_qa_model(settings: Settings = default_settings) -> genai.GenerativeModel:
-    """Initialize Gemini model for Q&A."""
-    genai.configure(api_key=settings.gemini_api_key)
-    model = genai.GenerativeModel(settings.gemini_model_name)
-    return model
+def init_qa_model(settings: Settings | None = None) -> genai.GenerativeModel:
+    """Return the shared Gemini model for Q&A."""
+    return get_gemini_model(settings)
 
 
 def _clean_model_code(raw_code: str) -> str:
     """Remove markdown fences / language tags from LLM output."""
     code = (raw_code or "").strip()
-    code = re.sub(r"```python", "", code, flags=re.IGNORECASE)
+    code = re.sub(r"```(?:python|sql)", "", code, flags=re.IGNORECASE)
     code = re.sub(r"```", "", code).strip()
     return code
 
 
-def _normalize_text_df(df: pd.DataFrame) -> pd.DataFrame:
-    """
-    Create a normalized copy of df where:
-    - all object/category columns are stripped, lowercased,
-      and have a trailing 's' removed for simple plurals.
-    """
-    df_norm = df.copy()
-
-    obj_cols = df_norm.select_dtypes(include=["object", "category"]).columns
-    for col in obj_cols:
-        df_norm[col] = (
-            df_norm[col]
-            .astype(str)
-            .str.strip()
-            .str.lower()
-            .str.rstrip("s")  # simple singular/plural handling
-        )
-
-    return df_norm
-
-
-def _build_column_summary(df: pd.DataFrame) -> Dict[str, Dict[str, Any]]:
-    """
-    Build a lightweight summary of columns and sample values so the model
-    knows what kinds of values actually exist in the dataset.
-    """
-    summary: Dict[str, Dict[str, Any]] = {}
-
-    for col in df.columns:
-        series = df[col]
-        col_info: Dict[str, Any] = {
-            "dtype": str(series.dtype),
-        }
-
-        # For text-like columns, include some unique values
-        if series.dtype == "object" or pd.api.types.is_categorical_dtype(series):
-            uniq = (
-                series.dropna()
-                .astype(str)
-                .unique()[:20]
-                .tolist()
-            )
-            col_info["sample_values"] = uniq
-
-        summary[col] = col_info
-
-    return summary
-
-
-def run_data_query(
-    model: genai.GenerativeModel,
+def _build_prompt(
     question: str,
-    df: pd.DataFrame,
-) -> Tuple[str, Any]:
-    """
-    Ask Gemini to generate code to answer a question about df, then execute it.
-
-    We use a normalized copy of df for string comparisons so that user
-    questions are robust to case and simple pluralization.
-
-    Args:
-        model: Gemini model.
-        question: Natural-language question.
-        df: Original DataFrame (not modified).
-
-    Returns:
-        Tuple of (generated_code, execution_result or error_message).
-    """
-    # Normalize text columns for robust matching
-    df_norm = _normalize_text_df(df)
-
-    column_names = df_norm.columns.tolist()
-    col_summary = _build_column_summary(df_norm)
+    column_names: List[Any],
+    col_summary: Dict[str, Dict[str, Any]],
+    total_columns: int,
+) -> str:
+    """Build the code-generation prompt describing only ``column_names``."""
+    described = {col: col_summary[col] for col in column_names}
+    scope = ""
+    if len(column_names) < total_columns:
+        scope = (
+            f"\n(df has {total_columns} columns in total; only the "
+            f"{len(column_names)} most relevant to the question are listed.)\n"
+        )
 
-    prompt = f"""
+    return f"""
 You are a data analyst with access to a pandas DataFrame named df.
 
 The DataFrame df you will use has already been NORMALIZED as follows:
@@ -125,9 +73,9 @@ The DataFrame df you will use has already been NORMALIZED as follows:
 
 Here are the column names in df:
 {column_names}
-
+{scope}
 Here is additional information about the columns and some sample values:
-{json.dumps(col_summary, indent=2)}
+{json.dumps(described, indent=2)}
 
 User question:
 \"\"\"{question}\"\"\"
@@ -155,33 +103,181 @@ Return ONLY the Python code that produces the answer.
 Do NOT include explanations, comments, markdown, or backticks.
 """
 
-    logger.info("Asking Gemini to generate code for question: %s", question)
 
-    response = model.generate_content(prompt)
-    raw_code = response.text or ""
+def _build_sql_prompt(
+    question: str,
+    column_names: List[Any],
+    col_summary: Dict[str, Dict[str, Any]],
+    total_columns: int,
+    column_types: Dict[str, str],
+) -> str:
+    """Build the SQL-generation prompt describing only ``column_names``."""
+    described = {
+        col: {**col_summary[col], "sql_type": column_types.get(str(col))}
+        for col in column_names
+    }
+    scope = ""
+    if len(column_names) < total_columns:
+        scope = (
+            f"\n(df has {total_columns} columns in total; only the "
+            f"{len(column_names)} most relevant to the question are listed.)\n"
+        )
+
+    return f"""
+You are a data analyst with access to a DuckDB table named df.
+
+The table df has already been NORMALIZED as follows:
+- All text / categorical columns are stripped of leading/trailing spaces.
+- All text is converted to lowercase.
+- A trailing 's' is removed from text values to handle simple singular/plural,
+  e.g. "laptop" and "laptops" are both stored as "laptop".
+
+Here are the column names in df:
+{column_names}
+{scope}
+Here is additional information about the columns and some sample values:
+{json.dumps(described, indent=2)}
+
+User question:
+\"\"\"{question}\"\"\"
+
+
+INSTRUCTIONS FOR WRITING SQL:
+
+1. Write ONE DuckDB SQL SELECT statement that reads ONLY from the table `df`.
+2. Quote column names with double quotes exactly as shown above.
+3. Because the text values in df are already lowercase and singularized where
+   possible, you can compare them directly to lowercase singular strings.
+   For example:
+
+       SELECT SUM("units_sold") FROM df WHERE "product" = 'laptop' AND "region" = 'north'
+
+4. Return a single value when the question asks for one number or name;
+   for rankings or breakdowns, return the grouping column(s) and values with
+   ORDER BY and LIMIT as appropriate.
+
+Return ONLY the SQL statement.
+Do NOT include explanations, comments, markdown, or backticks.
+"""
+
+
+def _generate_code(model: genai.GenerativeModel, prompt: str) -> str:
+    """Send ``prompt`` to the model and return the cleaned code."""
+    with span("qa.generate_code", prompt_chars=len(prompt)) as current:
+        response = model.generate_content(prompt)
+        raw_code = response.text or ""
+        current.set(response_chars=len(raw_code))
     code = _clean_model_code(raw_code)
 
     logger.debug("Raw code from Gemini: %s", raw_code)
     logger.info("Cleaned code to execute: %s", code)
+    return code
 
-    # Restricted execution environment
-    safe_globals = {"__builtins__": {}}
-    safe_locals = {
-        "df": df_norm,  # IMPORTANT: use normalized DataFrame here
-        "pd": pd,
-        "np": np,
-    }
+
+def _execute_code(
+    code: str,
+    df_norm: pd.DataFrame,
+    executor: SandboxExecutor | None,
+    dataset_key: str | None,
+) -> Any:
+    """Run generated code in-process, or in the sandbox when one is given."""
+    with span("qa.execute", engine="pandas", sandbox=executor is not None):
+        if executor is None:
+            return execute_query_code(code, df_norm)
+        return executor.run(code, df_norm, "query", dataset_key)
+
+
+@traced("qa.run_data_query")
+def run_data_query(
+    model: genai.GenerativeModel,
+    question: str,
+    df: pd.DataFrame,
+    dataset_key: str | None = None,
+    executor: SandboxExecutor | None = None,
+    engine: str = "auto",
+) -> Tuple[str, Any]:
+    """
+    Ask Gemini to generate code to answer a question about df, then execute it.
+
+    We use a normalized copy of df for string comparisons so that user
+    questions are robust to case and simple pluralization. On wide datasets
+    only the columns most relevant to the question are described; if the
+    generated code uses a column that was left out (or one that does not
+    exist), the code is regenerated once with the missing columns added.
+    Large datasets can be answered with SQL instead of pandas code; the SQL
+    result is shaped like a pandas answer (scalar, Series or DataFrame).
+
+    Args:
+        model: Gemini model.
+        question: Natural-language question.
+        df: Original DataFrame (not modified).
+        dataset_key: Identifier of the dataset version (e.g. upload hash) used
+            to share the normalized frame across questions and agents.
+        executor: Optional process sandbox that runs the code under time and
+            memory limits; defaults to executing in this process.
+        engine: "pandas" (generated pandas code), "sql" (generated DuckDB SQL
+            over a Parquet copy of the data) or "auto" (SQL for large
+            datasets).
+
+    Returns:
+        Tuple of (generated_code, execution_result or error_message).
+    """
+    annotate(rows=len(df), cols=df.shape[1])
+
+    # Normalize text columns for robust matching (computed once per dataset)
+    with span("qa.normalize"):
+        df_norm = get_normalized_frame(df, dataset_key)
+
+    total_columns = df_norm.shape[1]
+    col_summary = get_column_summary(df_norm, dataset_key)
+    column_names = select_prompt_columns(df_norm, question, dataset_key)
+
+    resolved_engine = select_engine(len(df_norm), engine)
+    annotate(engine=resolved_engine)
+    if resolved_engine == "sql":
+        with span("qa.sql_engine"):
+            sql_engine = get_sql_engine(df_norm, dataset_key)
+
+        def build_prompt(names: List[Any]) -> str:
+            return _build_sql_prompt(
+                question, names, col_summary, total_columns, sql_engine.column_types
+            )
+
+        def execute(code: str) -> Any:
+            with span("qa.execute", engine="sql"):
+                return sql_engine.query(code)
+
+    else:
+
+        def build_prompt(names: List[Any]) -> str:
+            return _build_prompt(question, names, col_summary, total_columns)
+
+        def execute(code: str) -> Any:
+            return _execute_code(code, df_norm, executor, dataset_key)
+
+    logger.info("Asking Gemini to generate code for question: %s", question)
+    code = _generate_code(model, build_prompt(column_names))
+
+    missing = referenced_columns(code, df_norm.columns, column_names)
+    if missing:
+        logger.info("Generated code uses columns left out of the prompt: %s", missing)
+        column_names = column_names + missing
+        code = _generate_code(model, build_prompt(column_names))
 
     try:
-        # First, try evaluating as a single expression
         try:
-            compiled = compile(code, "<llm_code>", "eval")
-            result = eval(compiled, safe_globals, safe_locals)
-        except SyntaxError:
-            # Otherwise treat it as a statement block and expect `result`
-            compiled = compile(code, "<llm_code>", "exec")
-            exec(compiled, safe_globals, safe_locals)
-            result = safe_locals.get("result", None)
+            result = execute(code)
+        except KeyError as exc:
+            # Only worth a retry when the prompt left columns out.
+            if len(column_names) == total_columns:
+                raise
+            extra = suggest_columns(df_norm, str(exc), column_names, dataset_key)
+            if not extra:
+                raise
+            logger.info("Retrying with columns similar to %s: %s", exc, extra)
+            column_names = column_names + extra
+            code = _generate_code(model, build_prompt(column_names))
+            result = execute(code)
 
         # If the result is a pandas object and empty, explain that nicely.
         if isinstance(result, (pd.Series, pd.DataFrame)) and result.empty:
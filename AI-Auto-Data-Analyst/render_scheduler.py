@@ -0,0 +1,208 @@
+"""
+Parallel chart rendering on a process pool with the Agg backend.
+
+Numeric source columns are copied once into a shared-memory block; each
+worker attaches to it by name and reads columns as zero-copy numpy views, so
+the DataFrame is never pickled per job. Workers draw with the same helpers as
+``visualization`` and return PNG bytes.
+"""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import multiprocessing as mp
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from pipeline.visualization import (
+    LazyFigure,
+    _draw_boxplot,
+    _draw_categorical_bars,
+    _draw_histogram,
+    figure_to_png,
+    top_category_counts,
+)
+
+logger = logging.getLogger(__name__)
+
+ChartJob = Tuple[str, str]  # (kind, column)
+NUMERIC_KINDS = ("histogram", "boxplot")
+
+_pool: ProcessPoolExecutor | None = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+# Worker-side attachments, keyed by shared-memory block name.
+_attached: Dict[str, Tuple[shared_memory.SharedMemory, np.ndarray]] = {}
+
+
+def _init_worker() -> None:
+    """Switch each worker to the non-interactive Agg backend."""
+    import matplotlib
+
+    matplotlib.use("Agg")
+
+
+def _column_view(shm_name: str, shape: Tuple[int, int], index: int) -> np.ndarray:
+    """Attach (once per block) and return a zero-copy view of one column."""
+    if shm_name not in _attached:
+        # Only the most recent block is kept attached in each worker.
+        while _attached:
+            _, (old_shm, _) = _attached.popitem()
+            old_shm.close()
+        shm = shared_memory.SharedMemory(name=shm_name)
+        _attached[shm_name] = (shm, np.ndarray(shape, dtype="float64", buffer=shm.buf))
+    return _attached[shm_name][1][index]
+
+
+def _render_job(
+    kind: str,
+    col: str,
+    shm_name: str | None,
+    shape: Tuple[int, int],
+    index: int,
+    payload: Any,
+) -> bytes:
+    """Worker entry point: draw one chart and return it as PNG bytes."""
+    from matplotlib.figure import Figure
+
+    if kind == "histogram":
+        fig = Figure(figsize=(6, 4))
+        _draw_histogram(fig, pd.Series(_column_view(shm_name, shape, index)), col)
+    elif kind == "boxplot":
+        fig = Figure(figsize=(6, 2.5))
+        _draw_boxplot(fig, pd.Series(_column_view(shm_name, shape, index)), col)
+    elif kind == "bar":
+        counts, top_n = payload
+        fig = Figure(figsize=(6, 4))
+        _draw_categorical_bars(fig, counts, col, top_n)
+    else:
+        raise ValueError(f"Unknown chart kind: {kind}")
+
+    return figure_to_png(fig)
+
+
+def _get_pool(max_workers: int) -> ProcessPoolExecutor:
+    """Return the shared spawn-based pool, (re)creating it if needed."""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != max_workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False, cancel_futures=True)
+            # spawn: never fork a multi-threaded server process.
+            _pool = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=mp.get_context("spawn"),
+                initializer=_init_worker,
+            )
+            _pool_workers = max_workers
+            logger.info("Started chart rendering pool with %d workers.", max_workers)
+        return _pool
+
+
+def shutdown_pool() -> None:
+    """Stop the rendering pool (registered to run at interpreter exit)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+atexit.register(shutdown_pool)
+
+
+def render_charts_parallel(
+    df: pd.DataFrame,
+    jobs: Sequence[ChartJob],
+    max_workers: int | None = None,
+    top_n: int = 10,
+) -> Dict[ChartJob, bytes]:
+    """
+    Render many per-column charts concurrently.
+
+    Args:
+        df: Source data.
+        jobs: (kind, column) pairs; kind is "histogram", "boxplot" or "bar".
+        max_workers: Pool size (defaults to CPU count).
+        top_n: Categories shown per bar chart.
+
+    Returns:
+        Mapping from job to PNG bytes. Failed jobs are logged and omitted.
+    """
+    if not jobs:
+        return {}
+
+    numeric_cols = list(dict.fromkeys(col for kind, col in jobs if kind in NUMERIC_KINDS))
+    col_index = {col: i for i, col in enumerate(numeric_cols)}
+    shape = (len(numeric_cols), len(df))
+
+    shm: shared_memory.SharedMemory | None = None
+    if numeric_cols and len(df):
+        shm = shared_memory.SharedMemory(create=True, size=shape[0] * shape[1] * 8)
+        block = np.ndarray(shape, dtype="float64", buffer=shm.buf)
+        for col, i in col_index.items():
+            block[i] = df[col].to_numpy(dtype="float64", na_value=np.nan)
+        del block
+
+    pool = _get_pool(max_workers or os.cpu_count() or 1)
+    results: Dict[ChartJob, bytes] = {}
+    try:
+        futures = {}
+        for kind, col in jobs:
+            payload = None
+            if kind == "bar":
+                payload = (top_category_counts(df[col], top_n), top_n)
+            futures[(kind, col)] = pool.submit(
+                _render_job,
+                kind,
+                col,
+                shm.name if shm is not None else None,
+                shape,
+                col_index.get(col, -1),
+                payload,
+            )
+        for job, future in futures.items():
+            try:
+                results[job] = future.result()
+            except Exception:  # noqa: BLE001
+                logger.exception("Failed to render %s for column %s.", *job)
+    finally:
+        if shm is not None:
+            shm.close()
+            shm.unlink()
+
+    logger.info("Rendered %d/%d charts on the process pool.", len(results), len(jobs))
+    return results
+
+
+def prerender(
+    df: pd.DataFrame,
+    figures: Iterable[LazyFigure],
+    max_workers: int | None = None,
+) -> None:
+    """
+    Render not-yet-drawn LazyFigures in parallel and prime their PNG caches.
+
+    Args:
+        df: Source data the figures were built from.
+        figures: LazyFigure handles carrying ``kind`` and ``column`` metadata.
+        max_workers: Pool size (defaults to CPU count).
+    """
+    pending: Dict[ChartJob, List[LazyFigure]] = {}
+    for fig in figures:
+        if not fig.rendered and fig.kind is not None:
+            pending.setdefault((fig.kind, fig.column), []).append(fig)
+
+    pngs = render_charts_parallel(df, list(pending), max_workers=max_workers)
+    for job, png in pngs.items():
+        for fig in pending[job]:
+            fig.prime(png)
+
@@ -0,0 +1,471 @@
+"""
+Execution of LLM-generated code, in-process or in isolated worker processes.
+
+``execute_query_code`` and ``execute_plot_code`` hold the restricted-exec
+semantics shared by the Q&A and plot agents. ``SandboxExecutor`` runs the
+same functions in a pool of pre-warmed spawn workers with a wall-clock limit
+and a private-RSS limit; a worker that exceeds either is killed and replaced
+while the server keeps serving other users.
+
+Each dataset is written once as an Arrow IPC stream into a shared-memory
+block; workers attach to it by name and keep the decoded frame until a
+different dataset arrives, so nothing is pickled per query. Results are
+bounded in rows and bytes before they are sent back.
+"""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import multiprocessing as mp
+import pickle
+import queue
+import threading
+import time
+from collections import OrderedDict
+from multiprocessing import shared_memory
+from typing import Any, Dict, Hashable, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 2
+DEFAULT_TIMEOUT_SECONDS = 30.0
+DEFAULT_MEMORY_LIMIT_MB = 2048
+DEFAULT_MAX_RESULT_ROWS = 10_000
+DEFAULT_MAX_RESULT_BYTES = 16 * 1024 * 1024
+MAX_PUBLISHED_DATASETS = 2
+_POLL_SECONDS = 0.05
+_READY_TIMEOUT_SECONDS = 120.0
+
+
+class ExecutionTimeout(TimeoutError):
+    """Generated code ran longer than the wall-clock limit."""
+
+
+class ExecutionMemoryError(MemoryError):
+    """Generated code exceeded the worker memory limit."""
+
+
+class WorkerCrashed(RuntimeError):
+    """A worker process died while running generated code."""
+
+
+def execute_query_code(code: str, df: pd.DataFrame) -> Any:
+    """
+    Run generated Q&A code against ``df`` and return its answer.
+
+    The code is evaluated as an expression when possible, otherwise executed
+    as a block whose answer is left in ``result``.
+    """
+    # Restricted execution environment
+    safe_globals = {"__builtins__": {}}
+    safe_locals = {
+        # The shallow copy keeps column additions/removals by generated code
+        # out of the shared frame.
+        "df": df.copy(deep=False),
+        "pd": pd,
+        "np": np,
+    }
+
+    # First, try evaluating as a single expression
+    try:
+        compiled = compile(code, "<llm_code>", "eval")
+        return eval(compiled, safe_globals, safe_locals)
+    except SyntaxError:
+        # Otherwise treat it as a statement block and expect `result`
+        compiled = compile(code, "<llm_code>", "exec")
+        exec(compiled, safe_globals, safe_locals)
+        return safe_locals.get("result", None)
+
+
+def execute_plot_code(code: str, df: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Run generated plot code against ``df`` and return its locals.
+
+    Besides matplotlib and seaborn, the code gets ``charts``, the aggregated
+    chart builders whose cost does not grow with the row count.
+    """
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    from pipeline.aggregated_charts import charts
+
+    # Restricted execution environment
+    safe_globals = {"__builtins__": {}}
+    safe_locals = {
+        "df": df.copy(deep=False),
+        "pd": pd,
+        "np": np,
+        "plt": plt,
+        "sns": sns,
+        "charts": charts,
+    }
+
+    compiled = compile(code, "<plot_code>", "exec")
+    exec(compiled, safe_globals, safe_locals)
+    return safe_locals
+
+
+# ---------------------------------------------------------------------------
+# Worker side
+# ---------------------------------------------------------------------------
+
+# Most recently used dataset block: (name, attachment, decoded frame).
+_worker_frame: Tuple[str, shared_memory.SharedMemory, pd.DataFrame] | None = None
+
+
+def _attach_frame(shm_name: str, size: int, fmt: str) -> pd.DataFrame:
+    """Decode a published dataset once per worker and keep it for reuse."""
+    global _worker_frame
+    if _worker_frame is not None:
+        if _worker_frame[0] == shm_name:
+            return _worker_frame[2]
+        _, old_shm, _ = _worker_frame
+        _worker_frame = None
+        try:
+            old_shm.close()
+        except BufferError:
+            # Something generated code kept still views the block; the
+            # mapping is released when the worker exits.
+            pass
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    if fmt == "arrow":
+        import pyarrow as pa
+
+        # Arrow columns may stay zero-copy views of the block, so it stays
+        # attached while the frame is in use.
+        reader = pa.ipc.open_stream(pa.py_buffer(shm.buf[:size]))
+        frame = reader.read_all().to_pandas()
+    else:
+        frame = pickle.loads(shm.buf[:size])
+    _worker_frame = (shm_name, shm, frame)
+    return frame
+
+
+def _bound_result(result: Any, max_rows: int, max_bytes: int) -> Tuple[Any, int | None]:
+    """Truncate long pandas results and oversized payloads."""
+    total_rows = None
+    if isinstance(result, (pd.DataFrame, pd.Series)) and len(result) > max_rows:
+        total_rows = len(result)
+        result = result.head(max_rows)
+    if len(pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)) > max_bytes:
+        text = repr(result)
+        result = text[: max_bytes // 4] + "\n... (result truncated)"
+    return result, total_rows
+
+
+def _run_task(task: Dict[str, Any]) -> Tuple[Any, int | None]:
+    df = _attach_frame(task["shm_name"], task["size"], task["format"])
+    if task["kind"] == "query":
+        result = execute_query_code(task["code"], df)
+        return _bound_result(result, task["max_rows"], task["max_bytes"])
+
+    import matplotlib.pyplot as plt
+    from matplotlib.figure import Figure
+
+    from pipeline.aggregated_charts import AggregatedChart
+    from pipeline.visualization import figure_to_png
+
+    try:
+        safe_locals = execute_plot_code(task["code"], df)
+        # Aggregated charts hold only their reduced data and are sent as is.
+        chart = safe_locals.get("chart", None)
+        if isinstance(chart, AggregatedChart):
+            return chart, None
+        fig = safe_locals.get("fig", None)
+        if isinstance(fig, Figure):
+            return figure_to_png(fig), None
+        figs = safe_locals.get("figs", None)
+        if isinstance(figs, list) and figs and all(isinstance(f, Figure) for f in figs):
+            return [figure_to_png(f) for f in figs], None
+        return None, None
+    finally:
+        plt.close("all")
+
+
+def _worker_main(conn: Any) -> None:
+    """Worker loop: warm up imports, then run tasks until the pipe closes."""
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot  # noqa: F401
+    import pyarrow  # noqa: F401
+    import seaborn  # noqa: F401
+
+    conn.send(("ready", None))
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        try:
+            conn.send(("ok", _run_task(task)))
+        except Exception as exc:  # noqa: BLE001
+            try:
+                conn.send(("error", exc))
+            except Exception:  # noqa: BLE001 - unpicklable exception
+                conn.send(("error", RuntimeError(f"{type(exc).__name__}: {exc}")))
+
+
+# ---------------------------------------------------------------------------
+# Parent side
+# ---------------------------------------------------------------------------
+
+
+class _Worker:
+    """One spawn worker process and its pipe."""
+
+    def __init__(self) -> None:
+        ctx = mp.get_context("spawn")
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.ready = False
+
+    def wait_ready(self) -> None:
+        if self.ready:
+            return
+        if not self.conn.poll(_READY_TIMEOUT_SECONDS):
+            raise WorkerCrashed("Execution worker did not start in time.")
+        self.conn.recv()
+        self.ready = True
+
+    def private_rss(self) -> int:
+        """Resident memory not shared with other processes (bytes)."""
+        import psutil
+
+        info = psutil.Process(self.process.pid).memory_info()
+        return info.rss - getattr(info, "shared", 0)
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join(timeout=5)
+        self.conn.close()
+
+
+class SandboxExecutor:
+    """
+    Pool of pre-warmed worker processes that run generated code under
+    wall-clock and memory limits.
+
+    Args:
+        workers: Number of worker processes.
+        timeout: Wall-clock limit per execution in seconds.
+        memory_limit_mb: Private RSS limit per worker.
+        max_result_rows: Rows kept from DataFrame/Series results.
+        max_result_bytes: Pickled size limit for results.
+    """
+
+    def __init__(
+        self,
+        workers: int = DEFAULT_WORKERS,
+        timeout: float = DEFAULT_TIMEOUT_SECONDS,
+        memory_limit_mb: float = DEFAULT_MEMORY_LIMIT_MB,
+        max_result_rows: int = DEFAULT_MAX_RESULT_ROWS,
+        max_result_bytes: int = DEFAULT_MAX_RESULT_BYTES,
+    ) -> None:
+        self.timeout = timeout
+        self.memory_limit = int(memory_limit_mb * 1024 * 1024)
+        self.max_result_rows = max_result_rows
+        self.max_result_bytes = max_result_bytes
+
+        self._idle: queue.Queue = queue.Queue()
+        self._all: List[_Worker] = []
+        self._lock = threading.Lock()
+        self._datasets: "OrderedDict[Hashable, Tuple[shared_memory.SharedMemory, int, str]]" = OrderedDict()
+        self._in_use: Dict[str, int] = {}
+        self._closed = False
+
+        for _ in range(max(workers, 1)):
+            self._add_worker()
+        logger.info("Started %d sandbox workers.", len(self._all))
+
+    def _add_worker(self) -> None:
+        worker = _Worker()
+        with self._lock:
+            self._all.append(worker)
+        self._idle.put(worker)
+
+    def _retire(self, worker: _Worker) -> None:
+        """Kill a worker and start a warm replacement."""
+        worker.kill()
+        with self._lock:
+            if worker in self._all:
+                self._all.remove(worker)
+        if not self._closed:
+            self._add_worker()
+
+    # -- datasets -----------------------------------------------------------
+
+    def _publish(self, df: pd.DataFrame, key: Hashable) -> Tuple[str, int, str]:
+        """Write ``df`` to shared memory once per dataset key."""
+        with self._lock:
+            if key in self._datasets:
+                self._datasets.move_to_end(key)
+                shm, size, fmt = self._datasets[key]
+                self._in_use[shm.name] = self._in_use.get(shm.name, 0) + 1
+                return shm.name, size, fmt
+
+        try:
+            import pyarrow as pa
+
+            table = pa.Table.from_pandas(df, preserve_index=True)
+            sink = pa.BufferOutputStream()
+            with pa.ipc.new_stream(sink, table.schema) as writer:
+                writer.write_table(table)
+            payload = memoryview(sink.getvalue())
+            fmt = "arrow"
+        except (ImportError, TypeError, ValueError) as exc:
+            # Arrow rejects e.g. mixed-type object columns; pickle instead.
+            logger.info("Arrow export failed (%s); publishing pickled frame.", exc)
+            payload = memoryview(pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL))
+            fmt = "pickle"
+
+        size = payload.nbytes
+        shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        shm.buf[:size] = payload.cast("B")
+        del payload
+
+        with self._lock:
+            self._datasets[key] = (shm, size, fmt)
+            self._in_use[shm.name] = self._in_use.get(shm.name, 0) + 1
+            self._evict_datasets()
+        logger.info("Published dataset %s to shared memory (%.1f MB, %s).", key, size / 1e6, fmt)
+        return shm.name, size, fmt
+
+    def _release(self, shm_name: str) -> None:
+        with self._lock:
+            self._in_use[shm_name] -= 1
+            self._evict_datasets()
+
+    def _evict_datasets(self) -> None:
+        """Unlink the oldest idle blocks beyond MAX_PUBLISHED_DATASETS (lock held)."""
+        for key in list(self._datasets):
+            if len(self._datasets) <= MAX_PUBLISHED_DATASETS:
+                break
+            shm = self._datasets[key][0]
+            if self._in_use.get(shm.name, 0) == 0:
+                del self._datasets[key]
+                self._in_use.pop(shm.name, None)
+                shm.close()
+                shm.unlink()
+
+    # -- execution ----------------------------------------------------------
+
+    def run(
+        self,
+        code: str,
+        df: pd.DataFrame,
+        kind: str = "query",
+        dataset_key: Hashable | None = None,
+    ) -> Any:
+        """
+        Execute generated code in a worker and return its (bounded) result.
+
+        Args:
+            code: Generated Python code.
+            df: Frame bound to ``df`` in the code.
+            kind: "query" (returns the answer) or "plot" (returns PNG bytes,
+                a list of PNG bytes, or None if no figure was produced).
+            dataset_key: Stable identifier of ``df`` so it is published once.
+
+        Returns:
+            The execution result.
+
+        Raises:
+            ExecutionTimeout: The wall-clock limit was exceeded.
+            ExecutionMemoryError: The memory limit was exceeded.
+            WorkerCrashed: The worker died.
+            Exception: Whatever the generated code raised.
+        """
+        if self._closed:
+            raise RuntimeError("SandboxExecutor has been shut down.")
+        key = (dataset_key, "keyed") if dataset_key is not None else (id(df), time.monotonic())
+        shm_name, size, fmt = self._publish(df, key)
+        worker = self._idle.get()
+        try:
+            worker.wait_ready()
+            task = {
+                "kind": kind,
+                "code": code,
+                "shm_name": shm_name,
+                "size": size,
+                "format": fmt,
+                "max_rows": self.max_result_rows,
+                "max_bytes": self.max_result_bytes,
+            }
+            status, payload = self._wait(worker, task)
+        except BaseException:
+            self._retire(worker)
+            raise
+        finally:
+            self._release(shm_name)
+
+        self._idle.put(worker)
+        if status == "error":
+            raise payload
+        result, total_rows = payload
+        if total_rows is not None:
+            logger.info("Result truncated to %d of %d rows.", self.max_result_rows, total_rows)
+        return result
+
+    def _wait(self, worker: _Worker, task: Dict[str, Any]) -> Tuple[str, Any]:
+        """Send a task and watch the worker until it answers or hits a limit."""
+        worker.conn.send(task)
+        deadline = time.monotonic() + self.timeout
+        while not worker.conn.poll(_POLL_SECONDS):
+            if not worker.process.is_alive():
+                raise WorkerCrashed("Execution worker exited unexpectedly.")
+            if time.monotonic() > deadline:
+                raise ExecutionTimeout(
+                    f"Generated code exceeded the {self.timeout:g}s time limit and was stopped."
+                )
+            try:
+                rss = worker.private_rss()
+            except Exception:  # noqa: BLE001 - process just exited
+                continue
+            if rss > self.memory_limit:
+                raise ExecutionMemoryError(
+                    f"Generated code exceeded the {self.memory_limit / 2**20:.0f} MB "
+                    "memory limit and was stopped."
+                )
+        try:
+            return worker.conn.recv()
+        except EOFError:
+            raise WorkerCrashed("Execution worker exited unexpectedly.") from None
+
+    def shutdown(self) -> None:
+        """Stop all workers and release shared memory."""
+        self._closed = True
+        with self._lock:
+            workers, self._all = self._all, []
+            datasets = list(self._datasets.values())
+            self._datasets.clear()
+        for worker in workers:
+            worker.kill()
+        for shm, _, _ in datasets:
+            shm.close()
+            shm.unlink()
+
+
+_executors: List[SandboxExecutor] = []
+
+
+def create_executor(**kwargs: Any) -> SandboxExecutor:
+    """Create a SandboxExecutor that is shut down at interpreter exit."""
+    executor = SandboxExecutor(**kwargs)
+    _executors.append(executor)
+    return executor
+
+
+@atexit.register
+def _shutdown_executors() -> None:
+    for executor in _executors:
+        executor.shutdown()
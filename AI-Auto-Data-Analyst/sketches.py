@@ -0,0 +1,280 @@
+"""
+Mergeable streaming sketches used for bounded-memory profiling.
+
+- QuantileSketch: a KLL-style compactor sketch for approximate quantiles.
+- SpaceSaving: a heavy-hitter summary returning top values with error bounds.
+
+Both can be updated chunk by chunk, merged with sketches built over other
+data, and serialized to plain JSON-compatible dicts.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+class QuantileSketch:
+    """
+    Approximate quantiles over a stream of floats in O(k log(n / k)) memory.
+
+    Items live in a hierarchy of compactors; level ``h`` items carry weight
+    ``2**h``. When a level overflows it is sorted and every other item is
+    promoted, which keeps rank errors around ``1 / k`` of the stream length.
+    """
+
+    def __init__(self, k: int = 200, seed: int = 0) -> None:
+        self.k = k
+        self.n = 0
+        self._levels: List[np.ndarray] = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, values: Iterable[float] | np.ndarray) -> "QuantileSketch":
+        """
+        Add values to the sketch. NaNs are ignored.
+
+        Args:
+            values: Array-like of numbers.
+
+        Returns:
+            The sketch itself, for chaining.
+        """
+        arr = np.asarray(values, dtype="float64").ravel()
+        arr = arr[~np.isnan(arr)]
+        if arr.size:
+            self.n += int(arr.size)
+            self._levels[0] = np.concatenate([self._levels[0], arr])
+            self._compress()
+        return self
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        """
+        Fold another sketch into this one.
+
+        Args:
+            other: Sketch built over a disjoint part of the data.
+
+        Returns:
+            The sketch itself, for chaining.
+        """
+        while len(self._levels) < len(other._levels):
+            self._levels.append(np.empty(0))
+        for level, items in enumerate(other._levels):
+            self._levels[level] = np.concatenate([self._levels[level], items])
+        self.n += other.n
+        self._compress()
+        return self
+
+    def quantiles(self, qs: Sequence[float]) -> List[float]:
+        """
+        Estimate quantiles.
+
+        Args:
+            qs: Quantile fractions in [0, 1].
+
+        Returns:
+            Estimated values (NaN for an empty sketch).
+        """
+        if self.n == 0:
+            return [float("nan")] * len(qs)
+
+        values = np.concatenate(self._levels)
+        weights = np.concatenate(
+            [np.full(items.size, 2.0 ** level) for level, items in enumerate(self._levels)]
+        )
+        order = np.argsort(values, kind="stable")
+        values = values[order]
+        cum_weights = np.cumsum(weights[order])
+        total = cum_weights[-1]
+
+        out: List[float] = []
+        for q in qs:
+            idx = int(np.searchsorted(cum_weights, q * total, side="left"))
+            out.append(float(values[min(idx, values.size - 1)]))
+        return out
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize to a JSON-compatible dict."""
+        return {
+            "k": self.k,
+            "n": self.n,
+            "levels": [items.tolist() for items in self._levels],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "QuantileSketch":
+        """Rebuild a sketch serialized with ``to_dict``."""
+        sketch = cls(k=int(data["k"]))
+        sketch.n = int(data["n"])
+        sketch._levels = [np.asarray(items, dtype="float64") for items in data["levels"]]
+        return sketch
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self._levels) - level - 1
+        return max(2, int(np.ceil(self.k * (2.0 / 3.0) ** depth)))
+
+    def _compress(self) -> None:
+        level = 0
+        while level < len(self._levels):
+            items = self._levels[level]
+            if items.size > self._capacity(level):
+                if level + 1 == len(self._levels):
+                    self._levels.append(np.empty(0))
+                items = np.sort(items)
+                # An odd leftover stays at this level so total weight is kept.
+                keep = items[-1:] if items.size % 2 else items[:0]
+                body = items[:-1] if items.size % 2 else items
+                promoted = body[int(self._rng.integers(2)) :: 2]
+                self._levels[level] = keep
+                self._levels[level + 1] = np.concatenate([self._levels[level + 1], promoted])
+            level += 1
+
+
+class SpaceSaving:
+    """
+    Heavy-hitter summary keeping at most ``capacity`` monitored values.
+
+    Reported counts never underestimate the true count, and
+    ``count - error`` never overestimates it. Any value that is not monitored
+    occurred at most ``floor`` times.
+    """
+
+    def __init__(self, capacity: int = 1_000) -> None:
+        self.capacity = capacity
+        self.n = 0
+        self.floor = 0
+        self._counts: Dict[Any, int] = {}
+        self._errors: Dict[Any, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def update(self, values: Iterable[Any] | pd.Series) -> "SpaceSaving":
+        """
+        Count a chunk of values. NaNs are ignored.
+
+        The chunk is aggregated exactly, truncated to ``capacity`` entries and
+        merged, so memory is bounded by the chunk plus the summary.
+
+        Args:
+            values: Array-like of hashable values.
+
+        Returns:
+            The summary itself, for chaining.
+        """
+        series = values if isinstance(values, pd.Series) else pd.Series(values)
+        counts = series.value_counts(dropna=True, sort=True)
+        if counts.empty:
+            return self
+
+        chunk = SpaceSaving(self.capacity)
+        chunk.n = int(counts.sum())
+        kept = counts.iloc[: self.capacity]
+        chunk._counts = {key: int(c) for key, c in kept.items()}
+        chunk._errors = dict.fromkeys(chunk._counts, 0)
+        if len(counts) > self.capacity:
+            chunk.floor = int(counts.iloc[self.capacity])
+        return self.merge(chunk)
+
+    def merge(self, other: "SpaceSaving") -> "SpaceSaving":
+        """
+        Fold another summary into this one.
+
+        Args:
+            other: Summary built over a disjoint part of the data.
+
+        Returns:
+            The summary itself, for chaining.
+        """
+        counts: Dict[Any, int] = {}
+        errors: Dict[Any, int] = {}
+        for key in self._counts.keys() | other._counts.keys():
+            counts[key] = self._counts.get(key, self.floor) + other._counts.get(key, other.floor)
+            errors[key] = self._errors.get(key, self.floor) + other._errors.get(key, other.floor)
+
+        floor = self.floor + other.floor
+        if len(counts) > self.capacity:
+            ranked = sorted(counts, key=counts.__getitem__, reverse=True)
+            floor = max(floor, counts[ranked[self.capacity]])
+            for key in ranked[self.capacity :]:
+                del counts[key]
+                del errors[key]
+
+        self._counts = counts
+        self._errors = errors
+        self.floor = floor
+        self.n += other.n
+        return self
+
+    def top(self, n: int = 10) -> List[Tuple[Any, int, int]]:
+        """
+        Return the ``n`` most frequent values.
+
+        Returns:
+            List of (value, estimated_count, max_overestimate) tuples, most
+            frequent first.
+        """
+        ranked = sorted(self._counts.items(), key=lambda item: item[1], reverse=True)
+        return [(key, count, self._errors[key]) for key, count in ranked[:n]]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize to a JSON-compatible dict (values must be JSON-friendly)."""
+        return {
+            "capacity": self.capacity,
+            "n": self.n,
+            "floor": self.floor,
+            "items": [[key, count, self._errors[key]] for key, count in self._counts.items()],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SpaceSaving":
+        """Rebuild a summary serialized with ``to_dict``."""
+        summary = cls(capacity=int(data["capacity"]))
+        summary.n = int(data["n"])
+        summary.floor = int(data["floor"])
+        for key, count, error in data["items"]:
+            summary._counts[key] = int(count)
+            summary._errors[key] = int(error)
+        return summary
+
+
+DEFAULT_CHUNK_ROWS = 1_000_000
+
+
+def top_values(
+    values: pd.Series | Iterable[pd.Series],
+    top_n: int = 10,
+    capacity: int | None = None,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+) -> List[Tuple[Any, int, int]]:
+    """
+    Most frequent values of a column with bounded memory.
+
+    The column (or stream of chunks) is fed to a SpaceSaving summary chunk by
+    chunk, so high-cardinality columns never build a full hash table.
+    Categorical columns are counted exactly from their codes.
+
+    Args:
+        values: A Series, or an iterable of Series chunks.
+        top_n: Number of values to return.
+        capacity: Monitored values in the summary (defaults to 10 * top_n,
+            at least 100). Larger capacity means tighter error bounds.
+        chunk_rows: Chunk length used when a single Series is given.
+
+    Returns:
+        List of (value, estimated_count, max_overestimate), most frequent first.
+        The true count lies in ``[count - error, count]``.
+    """
+    if isinstance(values, pd.Series):
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            counts = values.value_counts(dropna=True).head(top_n)
+            return [(key, int(count), 0) for key, count in counts.items() if count > 0]
+        series = values
+        values = (series.iloc[i : i + chunk_rows] for i in range(0, len(series), chunk_rows))
+
+    summary = SpaceSaving(capacity or max(10 * top_n, 100))
+    for chunk in values:
+        summary.update(chunk)
+    return summary.top(top_n)
@@ -0,0 +1,200 @@
+"""
+Columnar SQL backend (DuckDB) for the Q&A agent on large datasets.
+
+The normalized frame is written once per dataset version to Parquet and
+registered as a table named ``df``, so generated SQL runs multi-threaded,
+scans only the referenced columns and can spill to disk instead of
+materializing pandas intermediates. Connections have file-system access
+disabled and accept only read-only statements.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+import threading
+from typing import Any, Dict, Hashable
+
+import pandas as pd
+
+from pipeline.cache import DatasetMemo
+
+logger = logging.getLogger(__name__)
+
+ENGINES = ("auto", "pandas", "sql")
+DEFAULT_SQL_MIN_ROWS = 5_000_000
+DEFAULT_CACHE_DIR = os.path.join(".cache", "duckdb")
+DEFAULT_TIMEOUT_SECONDS = 60.0
+DEFAULT_MAX_RESULT_ROWS = 10_000
+
+_engines = DatasetMemo("sql_engine")
+
+_MISSING_COLUMN = re.compile(r'Referenced column "([^"]+)" not found')
+
+
+def select_engine(n_rows: int, engine: str = "auto", min_rows: int = DEFAULT_SQL_MIN_ROWS) -> str:
+    """
+    Resolve the Q&A execution engine for a dataset.
+
+    Args:
+        n_rows: Rows in the dataset.
+        engine: "pandas", "sql" or "auto" (SQL from ``min_rows`` rows on).
+        min_rows: Size threshold for "auto".
+
+    Returns:
+        "pandas" or "sql".
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine {engine!r}; expected one of {ENGINES}.")
+    if engine == "auto":
+        return "sql" if n_rows >= min_rows else "pandas"
+    return engine
+
+
+def shape_result(frame: pd.DataFrame) -> Any:
+    """
+    Shape a SQL result like typical pandas answers: a scalar for a single
+    cell, a Series for a single column, otherwise the DataFrame.
+    """
+    if frame.shape == (1, 1):
+        return frame.iloc[0, 0]
+    if frame.shape[1] == 1:
+        return frame.iloc[:, 0]
+    return frame
+
+
+class SQLEngine:
+    """
+    DuckDB connection with one dataset registered as table ``df``.
+
+    Args:
+        df: Normalized frame to query.
+        parquet_path: Where to persist the dataset; if None the frame is
+            registered in memory.
+        threads: DuckDB worker threads (defaults to CPU count).
+        memory_limit_mb: DuckDB memory limit before spilling to disk.
+    """
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        parquet_path: str | None = None,
+        threads: int | None = None,
+        memory_limit_mb: float | None = None,
+    ) -> None:
+        import duckdb
+
+        self._duckdb = duckdb
+        self._lock = threading.Lock()
+        self.con = duckdb.connect()
+        self.con.execute(f"SET threads = {int(threads or os.cpu_count() or 1)}")
+        if memory_limit_mb:
+            self.con.execute(f"SET memory_limit = '{int(memory_limit_mb)}MB'")
+
+        source = self._arrow_source(df, parquet_path)
+        self.con.register("df", source if source is not None else df)
+        # Generated SQL may only read the registered table.
+        self.con.execute("SET enable_external_access = false")
+        self.con.execute("SET lock_configuration = true")
+
+        described = self.con.execute("DESCRIBE df").fetchall()
+        self.column_types: Dict[str, str] = {row[0]: row[1] for row in described}
+
+    @staticmethod
+    def _arrow_source(df: pd.DataFrame, parquet_path: str | None) -> Any:
+        """Parquet-backed Arrow dataset, or None to register ``df`` directly."""
+        if parquet_path is None:
+            return None
+        try:
+            import pyarrow as pa
+            import pyarrow.dataset as ds
+            import pyarrow.parquet as pq
+
+            if not os.path.exists(parquet_path):
+                os.makedirs(os.path.dirname(os.path.abspath(parquet_path)), exist_ok=True)
+                tmp_path = f"{parquet_path}.{os.getpid()}.tmp"
+                pq.write_table(pa.Table.from_pandas(df, preserve_index=False), tmp_path)
+                os.replace(tmp_path, parquet_path)
+                logger.info("Wrote SQL dataset to %s.", parquet_path)
+            return ds.dataset(parquet_path, format="parquet")
+        except (ImportError, TypeError, ValueError, OSError) as exc:
+            # e.g. mixed-type object columns Arrow cannot convert
+            logger.info("Parquet export failed (%s); registering the frame in memory.", exc)
+            return None
+
+    def query(
+        self,
+        sql: str,
+        timeout: float | None = DEFAULT_TIMEOUT_SECONDS,
+        max_rows: int = DEFAULT_MAX_RESULT_ROWS,
+    ) -> Any:
+        """
+        Run one read-only SELECT statement and return a shaped result.
+
+        Args:
+            sql: Generated SQL.
+            timeout: Seconds after which the query is interrupted.
+            max_rows: Rows fetched at most.
+
+        Returns:
+            Scalar, Series or DataFrame (see :func:`shape_result`).
+
+        Raises:
+            ValueError: If ``sql`` is not a single SELECT statement.
+            KeyError: If the statement references an unknown column.
+            TimeoutError: If the query was interrupted by the timeout.
+        """
+        statements = self.con.extract_statements(sql)
+        if len(statements) != 1 or statements[0].type != self._duckdb.StatementType.SELECT:
+            raise ValueError("Only a single SELECT statement is allowed.")
+
+        with self._lock:
+            timer = None
+            if timeout is not None:
+                timer = threading.Timer(timeout, self.con.interrupt)
+                timer.start()
+            try:
+                frame = self.con.sql(sql).limit(max_rows).df()
+            except self._duckdb.InterruptException:
+                raise TimeoutError(f"SQL query exceeded the {timeout:g}s time limit.") from None
+            except self._duckdb.BinderException as exc:
+                # Surface unknown columns like pandas does, so callers can
+                # handle both engines the same way.
+                match = _MISSING_COLUMN.search(str(exc))
+                if match:
+                    raise KeyError(match.group(1)) from exc
+                raise
+            finally:
+                if timer is not None:
+                    timer.cancel()
+        return shape_result(frame)
+
+
+def get_sql_engine(
+    df_norm: pd.DataFrame,
+    dataset_key: Hashable | None = None,
+    cache_dir: str | None = DEFAULT_CACHE_DIR,
+    memory_limit_mb: float | None = None,
+) -> SQLEngine:
+    """
+    Return the cached SQL engine for a (normalized) frame.
+
+    Args:
+        df_norm: Frame to register as table ``df``.
+        dataset_key: Stable identifier of the dataset version; names the
+            Parquet file so it is reused across restarts.
+        cache_dir: Directory for Parquet files (None keeps data in memory).
+        memory_limit_mb: DuckDB memory limit.
+
+    Returns:
+        Shared SQLEngine.
+    """
+
+    def build(frame: pd.DataFrame) -> SQLEngine:
+        path = None
+        if dataset_key is not None and cache_dir:
+            path = os.path.join(cache_dir, f"{dataset_key}.parquet")
+        return SQLEngine(frame, parquet_path=path, memory_limit_mb=memory_limit_mb)
+
+    return _engines.get_or_compute(df_norm, build, dataset_key)
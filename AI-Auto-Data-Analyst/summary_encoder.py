@@ -0,0 +1,279 @@
+"""
+Token-budgeted encoding of dataset summaries for LLM prompts.
+
+``build_summary`` output pretty-printed as JSON costs tokens for every
+statistic of every column, so insight prompts (and their latency) grow with
+the column count. The encoder ranks columns by how informative they are
+(missingness, spread, outliers, correlation strength), writes the top ones
+as compact pipe-separated rows and collapses the rest into aggregate
+statements, stopping at a fixed token budget.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import math
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOKEN_BUDGET = 2000
+# Rough average for English text and numbers; avoids a tokenizer dependency.
+CHARS_PER_TOKEN = 4
+# Tokens kept free for the aggregate lines about collapsed columns.
+COLLAPSED_RESERVE_TOKENS = 120
+
+WEIGHT_MISSING = 2.0
+WEIGHT_SPREAD = 1.0
+WEIGHT_OUTLIERS = 1.5
+WEIGHT_CORRELATION = 2.0
+
+NUMERIC_FIELDS = ("mean", "std", "min", "25%", "50%", "75%", "max")
+# Values beyond this many IQRs outside the quartiles count as far outliers.
+OUTLIER_IQR = 3.0
+# Weaker correlations are used for ranking but not listed.
+MIN_LISTED_CORRELATION = 0.3
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate the number of model tokens in ``text``."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+@dataclass
+class EncodedSummary:
+    """A prompt-ready summary plus how much it was compressed."""
+
+    text: str
+    tokens: int
+    original_tokens: int
+    detailed_columns: List[str] = field(default_factory=list)
+    collapsed_columns: List[str] = field(default_factory=list)
+
+    @property
+    def compression_ratio(self) -> float:
+        """Tokens of the full JSON summary per token of the encoding."""
+        return self.original_tokens / max(self.tokens, 1)
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for logging and the UI."""
+        return {
+            "tokens": self.tokens,
+            "original_tokens": self.original_tokens,
+            "compression_ratio": round(self.compression_ratio, 2),
+            "detailed_columns": len(self.detailed_columns),
+            "collapsed_columns": len(self.collapsed_columns),
+        }
+
+
+def _finite(value: Any) -> bool:
+    return isinstance(value, (int, float)) and math.isfinite(value)
+
+
+def _outlier_score(stats: Dict[str, float]) -> float:
+    """How far min/max reach beyond the outer IQR fences, in IQRs (log-scaled)."""
+    q1, q3 = stats.get("25%"), stats.get("75%")
+    lo, hi = stats.get("min"), stats.get("max")
+    if not all(_finite(v) for v in (q1, q3, lo, hi)):
+        return 0.0
+    iqr = q3 - q1
+    if iqr <= 0:
+        return 1.0 if hi > lo else 0.0
+    reach = max(0.0, hi - (q3 + OUTLIER_IQR * iqr), (q1 - OUTLIER_IQR * iqr) - lo) / iqr
+    return min(math.log1p(reach) / 3.0, 1.0)
+
+
+def _spread_score(stats: Dict[str, float]) -> float:
+    """Coefficient of variation, log-scaled to [0, 1]."""
+    mean, std = stats.get("mean"), stats.get("std")
+    if not (_finite(mean) and _finite(std)):
+        return 0.0
+    cv = std / abs(mean) if mean else (1.0 if std else 0.0)
+    return min(math.log1p(cv) / math.log1p(10.0), 1.0)
+
+
+def column_scores(summary: Dict[str, Any]) -> Dict[Any, float]:
+    """
+    Rank columns by informativeness.
+
+    Args:
+        summary: Output of ``build_summary``, optionally with
+            ``top_correlations`` (list of {"a", "b", "r"}).
+
+    Returns:
+        Mapping from column to score (higher is more informative).
+    """
+    rows = max(int(summary.get("rows") or 0), 1)
+    missing = summary.get("missing_values", {})
+    numeric = summary.get("numeric_summary", {})
+
+    strongest: Dict[str, float] = {}
+    for pair in summary.get("top_correlations", []) or []:
+        r = abs(float(pair.get("r", 0.0)))
+        for col in (pair.get("a"), pair.get("b")):
+            strongest[str(col)] = max(strongest.get(str(col), 0.0), r)
+
+    scores: Dict[Any, float] = {}
+    for col in summary.get("dtypes", {}):
+        score = WEIGHT_MISSING * min(missing.get(col, 0) / rows, 1.0)
+        score += WEIGHT_CORRELATION * strongest.get(str(col), 0.0)
+        stats = numeric.get(col)
+        if stats:
+            score += WEIGHT_SPREAD * _spread_score(stats)
+            score += WEIGHT_OUTLIERS * _outlier_score(stats)
+        scores[col] = score
+    return scores
+
+
+def _cell(value: Any) -> str:
+    if isinstance(value, float):
+        return f"{value:.4g}" if math.isfinite(value) else ""
+    return str(value).replace("|", "/").replace("\n", " ")
+
+
+def _collapsed_lines(
+    summary: Dict[str, Any],
+    collapsed: List[Any],
+    budget_chars: int,
+) -> List[str]:
+    """Aggregate statements about columns left out of the tables."""
+    if not collapsed:
+        return []
+    dtypes = summary.get("dtypes", {})
+    numeric = summary.get("numeric_summary", {})
+    missing = summary.get("missing_values", {})
+    rows = max(int(summary.get("rows") or 0), 1)
+
+    n_numeric = sum(1 for col in collapsed if col in numeric)
+    dtype_counts = Counter(str(dtypes.get(col)) for col in collapsed)
+    with_missing = [col for col in collapsed if missing.get(col, 0)]
+    constant = [
+        col for col in collapsed if col in numeric and numeric[col].get("std") == 0
+    ]
+    outliers = [col for col in collapsed if col in numeric and _outlier_score(numeric[col]) > 0]
+
+    lines = [
+        f"{len(collapsed)} less informative columns collapsed "
+        f"({n_numeric} numeric, {len(collapsed) - n_numeric} other); dtypes: "
+        + ", ".join(f"{dtype}×{n}" for dtype, n in dtype_counts.most_common())
+    ]
+    if with_missing:
+        worst = max(with_missing, key=lambda col: missing[col])
+        lines.append(
+            f"{len(with_missing)} of them have missing values "
+            f"(max {100 * missing[worst] / rows:.1f}% in {_cell(worst)})"
+        )
+    else:
+        lines.append("none of them have missing values")
+    if constant:
+        lines.append(f"{len(constant)} of them are constant")
+    if outliers:
+        lines.append(f"{len(outliers)} of them have far outliers (beyond {OUTLIER_IQR:g} IQR)")
+
+    # Name as many collapsed columns as the remaining budget allows.
+    used = sum(len(line) + 1 for line in lines)
+    names: List[str] = []
+    for col in collapsed:
+        name = _cell(col)
+        used += len(name) + 2
+        if used > budget_chars:
+            break
+        names.append(name)
+    if names:
+        more = len(collapsed) - len(names)
+        lines.append("names: " + ", ".join(names) + (f", … (+{more})" if more else ""))
+    return lines
+
+
+def encode_summary(
+    summary: Dict[str, Any],
+    token_budget: int = DEFAULT_TOKEN_BUDGET,
+) -> EncodedSummary:
+    """
+    Encode a dataset summary as compact tables within a token budget.
+
+    Args:
+        summary: Output of ``build_summary``, optionally with
+            ``top_correlations``.
+        token_budget: Approximate upper bound on the encoding's tokens.
+
+    Returns:
+        EncodedSummary with the text and compression statistics.
+    """
+    original_tokens = estimate_tokens(json.dumps(summary, indent=2, default=str))
+    budget_chars = token_budget * CHARS_PER_TOKEN
+    reserve_chars = COLLAPSED_RESERVE_TOKENS * CHARS_PER_TOKEN
+
+    dtypes = summary.get("dtypes", {})
+    numeric = summary.get("numeric_summary", {})
+    missing = summary.get("missing_values", {})
+    rows = max(int(summary.get("rows") or 0), 1)
+
+    lines = [f"rows={summary.get('rows', 0)} cols={summary.get('cols', len(dtypes))}"]
+    used = len(lines[0]) + 1
+
+    correlations = [
+        pair
+        for pair in summary.get("top_correlations", []) or []
+        if abs(pair.get("r", 0.0)) >= MIN_LISTED_CORRELATION
+    ]
+    if correlations:
+        header = "strongest correlations (a|b|r):"
+        lines.append(header)
+        used += len(header) + 1
+        for pair in correlations:
+            line = "|".join(_cell(pair.get(k)) for k in ("a", "b")) + f"|{pair.get('r', 0):.2f}"
+            if used + len(line) + 1 > budget_chars // 4:
+                break
+            lines.append(line)
+            used += len(line) + 1
+
+    scores = column_scores(summary)
+    ranked = sorted(dtypes, key=lambda col: -scores.get(col, 0.0))
+
+    num_rows: List[Tuple[Any, str]] = []
+    other_rows: List[Tuple[Any, str]] = []
+    num_header = "numeric columns (name|dtype|missing%|" + "|".join(NUMERIC_FIELDS) + "):"
+    other_header = "other columns (name|dtype|missing%):"
+    headers = len(num_header) + len(other_header) + 2
+    collapsed: List[Any] = []
+    for col in ranked:
+        cells = [_cell(col), _cell(dtypes[col]), f"{100 * missing.get(col, 0) / rows:.3g}"]
+        if col in numeric:
+            cells += [_cell(float(numeric[col].get(k, float("nan")))) for k in NUMERIC_FIELDS]
+        line = "|".join(cells)
+        if collapsed or used + headers + len(line) + 1 > budget_chars - reserve_chars:
+            collapsed.append(col)
+            continue
+        (num_rows if col in numeric else other_rows).append((col, line))
+        used += len(line) + 1
+
+    if num_rows:
+        lines.append(num_header)
+        lines.extend(line for _, line in num_rows)
+    if other_rows:
+        lines.append(other_header)
+        lines.extend(line for _, line in other_rows)
+    remaining = max(budget_chars - used - headers, reserve_chars)
+    lines.extend(_collapsed_lines(summary, collapsed, remaining))
+
+    text = "\n".join(lines)
+    encoded = EncodedSummary(
+        text=text,
+        tokens=estimate_tokens(text),
+        original_tokens=original_tokens,
+        detailed_columns=[str(col) for col, _ in num_rows + other_rows],
+        collapsed_columns=[str(col) for col in collapsed],
+    )
+    logger.info(
+        "Encoded summary: %d -> %d tokens (%.1fx), %d columns detailed, %d collapsed.",
+        encoded.original_tokens,
+        encoded.tokens,
+        encoded.compression_ratio,
+        len(encoded.detailed_columns),
+        len(encoded.collapsed_columns),
+    )
+    return encoded
@@ -0,0 +1,55 @@
+"""Correlation results checked against pandas' pairwise-complete ``corr``."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pipeline.correlation import compute_correlations
+
+
+def _frame_with_missing(rows: int = 2000, missing: float = 0.5) -> pd.DataFrame:
+    rng = np.random.default_rng(42)
+    base = rng.normal(size=rows)
+    df = pd.DataFrame(
+        {
+            "a": base,
+            "b": base * 3.0 + rng.normal(scale=0.05, size=rows),
+            "c": -base + rng.normal(scale=0.5, size=rows),
+            "d": rng.normal(size=rows),
+        }
+    )
+    for col in ["a", "b", "c"]:
+        df.loc[rng.random(rows) < missing, col] = np.nan
+    return df
+
+
+def _as_matrix(result) -> pd.DataFrame:
+    frame = result.heatmap_frame()
+    return frame.loc[sorted(frame.index), sorted(frame.columns)]
+
+
+@pytest.mark.parametrize("block_cols", [1, 256])
+def test_matches_pandas_with_missing_values(block_cols):
+    df = _frame_with_missing()
+    result = compute_correlations(df, list(df.columns), block_cols=block_cols)
+
+    expected = df.corr()
+    np.testing.assert_allclose(_as_matrix(result).to_numpy(), expected.to_numpy(), atol=1e-4)
+    for a, b, r in result.top_pairs:
+        assert r == pytest.approx(expected.loc[a, b], abs=1e-4)
+
+
+def test_top_pair_not_shrunk_by_missing_values():
+    df = _frame_with_missing()
+    result = compute_correlations(df, list(df.columns), top_k=1)
+
+    [(a, b, r)] = result.top_pairs
+    assert {a, b} == {"a", "b"}
+    assert r > 0.99
+
+
+def test_matches_pandas_without_missing_values():
+    df = _frame_with_missing(missing=0.0)
+    result = compute_correlations(df, list(df.columns))
+
+    np.testing.assert_allclose(_as_matrix(result).to_numpy(), df.corr().to_numpy(), atol=1e-4)
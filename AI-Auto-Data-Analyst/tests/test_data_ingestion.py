@@ -0,0 +1,34 @@
+"""Bounded CSV loading when a column changes type partway through the file."""
+
+import io
+
+import pandas as pd
+
+from pipeline.data_ingestion import load_csv, optimize_dtypes
+
+ROWS = 300_000
+
+
+def _drifting_csv(value) -> str:
+    body = "".join(f"{i},{value(i)}\n" for i in range(ROWS))
+    return "a,b\n" + body + "1,maybe\n"
+
+
+def test_widened_boolean_column_has_one_representation():
+    df = load_csv(io.StringIO(_drifting_csv(lambda i: i % 3 == 0)), memory_limit_mb=8)
+
+    assert len(df) == ROWS + 1
+    assert set(df["b"].map(type)) == {str}
+    assert df["b"].value_counts().to_dict() == {"False": 200_000, "True": 100_000, "maybe": 1}
+
+    optimized, _ = optimize_dtypes(df)
+    assert list(optimized["b"].cat.categories) == ["False", "True", "maybe"]
+
+
+def test_widened_float_column_keeps_source_text():
+    text = _drifting_csv(lambda i: i * 0.5)
+    df = load_csv(io.StringIO(text), memory_limit_mb=8)
+
+    expected = pd.read_csv(io.StringIO(text), dtype={"b": str})["b"]
+    assert set(df["b"].map(type)) == {str}
+    assert df["b"].tolist() == expected.tolist()
@@ -0,0 +1,46 @@
+"""Storing ingested frames whose columns Arrow cannot convert directly."""
+
+import io
+
+import pandas as pd
+
+from pipeline.data_ingestion import load_csv, optimize_dtypes
+from pipeline.dataset_store import DatasetStore
+
+
+def test_mixed_type_categories_are_stored_as_text(tmp_path):
+    store = DatasetStore(str(tmp_path))
+    df = pd.DataFrame(
+        {
+            "b": pd.Categorical([False, True, "False", "maybe"]),
+            "m": pd.Series([1, "a", None, 2.5], dtype=object),
+        }
+    )
+
+    store.put("mixed", df)
+    stored, _ = store.open("mixed")
+
+    assert isinstance(stored["b"].dtype, pd.CategoricalDtype)
+    assert stored["b"].astype(object).tolist() == ["False", "True", "False", "maybe"]
+    assert stored["m"].tolist()[:2] == ["1", "a"]
+    assert pd.isna(stored["m"].iloc[2])
+
+
+def test_widened_csv_column_round_trips_through_the_store(tmp_path):
+    rows = 300_000
+    text = "a,b\n" + "".join(f"{i},{i % 3 == 0}\n" for i in range(rows)) + "1,maybe\n"
+    df, report = optimize_dtypes(load_csv(io.StringIO(text), memory_limit_mb=8))
+
+    store = DatasetStore(str(tmp_path))
+    calls = []
+
+    def ingest():
+        calls.append(1)
+        return df, report
+
+    store.get_or_ingest("widened", ingest)
+    stored, _ = store.get_or_ingest("widened", ingest)
+
+    assert calls == [1]
+    assert "widened" in store
+    assert stored["b"].value_counts().to_dict() == {"False": 200_000, "True": 100_000, "maybe": 1}
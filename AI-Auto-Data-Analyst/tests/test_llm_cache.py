@@ -0,0 +1,87 @@
+"""Response cache behaviour with a counting stub model."""
+
+import time
+
+import pytest
+
+from pipeline.llm_cache import CachedModel, LLMResponseCache, cache_key
+
+
+class StubResponse:
+    def __init__(self, text: str) -> None:
+        self.text = text
+
+
+class CountingModel:
+    model_name = "stub"
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def generate_content(self, prompt: str, stream: bool = False) -> StubResponse:
+        self.calls += 1
+        return StubResponse(f"answer to {prompt}")
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return LLMResponseCache(str(tmp_path / "responses.sqlite"))
+
+
+def test_repeat_prompt_is_served_from_cache(cache):
+    model = CountingModel()
+    cached = CachedModel(model, cache, fingerprint="schema-a")
+
+    first = cached.generate_content("top products?")
+    second = cached.generate_content("top   products?\n")
+
+    assert second.text == first.text
+    assert model.calls == 1
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_other_schema_fingerprint_misses(cache):
+    model = CountingModel()
+    CachedModel(model, cache, fingerprint="schema-a").generate_content("top products?")
+    CachedModel(model, cache, fingerprint="schema-b").generate_content("top products?")
+
+    assert model.calls == 2
+    assert cache.stats()["hits"] == 0
+    assert cache.stats()["misses"] == 2
+
+
+def test_entries_expire_after_ttl(tmp_path):
+    cache = LLMResponseCache(str(tmp_path / "responses.sqlite"), ttl_seconds=0.05)
+    model = CountingModel()
+    cached = CachedModel(model, cache)
+
+    cached.generate_content("q")
+    time.sleep(0.1)
+    cached.generate_content("q")
+
+    assert model.calls == 2
+    assert cache.stats()["hits"] == 0
+    assert cache.stats()["entries"] == 1
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    cache = LLMResponseCache(str(tmp_path / "responses.sqlite"), max_bytes=25)
+    keys = [cache_key("stub", prompt) for prompt in ("a", "b", "c")]
+
+    cache.put(keys[0], "stub", "x" * 10)
+    time.sleep(0.01)
+    cache.put(keys[1], "stub", "y" * 10)
+    time.sleep(0.01)
+    assert cache.get(keys[0]) == "x" * 10  # a is now more recent than b
+    time.sleep(0.01)
+    cache.put(keys[2], "stub", "z" * 10)
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) == "x" * 10
+    assert cache.get(keys[2]) == "z" * 10
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["entries"] == 2
+    assert stats["bytes"] == 20
+    assert (stats["hits"], stats["misses"]) == (3, 1)
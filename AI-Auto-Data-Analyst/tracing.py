@@ -0,0 +1,306 @@
+"""
+Lightweight tracing for the Auto Analyst pipeline.
+
+Stages are wrapped in nested spans that record wall time, CPU time, memory
+(RSS change and growth of the peak RSS), and free-form attributes such as
+rows and columns processed, prompt and response sizes or cache hits. Spans
+nest through a context variable, so a helper deep inside an agent attaches
+to whatever stage is running. Finished root spans are kept in a bounded
+history, and per-stage totals are exported as JSON or Prometheus text.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HISTORY = 50
+METRIC_PREFIX = "auto_analyst"
+
+_current: contextvars.ContextVar["Span | None"] = contextvars.ContextVar(
+    "auto_analyst_span", default=None
+)
+
+
+def _rss_bytes() -> int:
+    """Current resident set size, or 0 if psutil is unavailable."""
+    try:
+        import psutil
+    except ImportError:  # pragma: no cover - psutil is a listed requirement
+        return 0
+    return psutil.Process(os.getpid()).memory_info().rss
+
+
+def _peak_rss_bytes() -> int:
+    """Peak resident set size of this process so far (0 where unsupported)."""
+    try:
+        import resource
+    except ImportError:  # pragma: no cover - Windows
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+@dataclass
+class Span:
+    """One timed stage; ``children`` are the stages it ran."""
+
+    name: str
+    attrs: Dict[str, Any] = field(default_factory=dict)
+    started_at: float = 0.0
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    rss_delta_bytes: int = 0
+    peak_rss_delta_bytes: int = 0
+    error: str | None = None
+    children: List["Span"] = field(default_factory=list)
+
+    def set(self, **attrs: Any) -> "Span":
+        """Attach attributes (rows, cols, prompt_chars, cache_hit, ...)."""
+        self.attrs.update(attrs)
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-friendly nested representation."""
+        return {
+            "name": self.name,
+            "started_at": self.started_at,
+            "wall_ms": round(self.wall_seconds * 1000, 3),
+            "cpu_ms": round(self.cpu_seconds * 1000, 3),
+            "rss_delta_bytes": self.rss_delta_bytes,
+            "peak_rss_delta_bytes": self.peak_rss_delta_bytes,
+            "attrs": self.attrs,
+            "error": self.error,
+            "children": [child.to_dict() for child in self.children],
+        }
+
+    def walk(self, depth: int = 0) -> Iterator[Tuple[int, "Span"]]:
+        """Yield ``(depth, span)`` for this span and its descendants."""
+        yield depth, self
+        for child in self.children:
+            yield from child.walk(depth + 1)
+
+
+class Tracer:
+    """
+    Collects spans, keeps recent traces and aggregates per-stage totals.
+
+    Args:
+        history: Number of finished root spans kept for inspection.
+    """
+
+    def __init__(self, history: int = DEFAULT_HISTORY) -> None:
+        self.enabled = True
+        self._traces: "deque[Span]" = deque(maxlen=history)
+        self._totals: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, activate: bool = True, **attrs: Any) -> Iterator[Span]:
+        """
+        Time the enclosed block as a child of the current span.
+
+        Args:
+            name: Stage name, e.g. "ingest.read_csv".
+            activate: Make the span current inside the block. Pass False
+                when the block yields (generators), so spans the consumer
+                opens meanwhile do not nest under it.
+            **attrs: Initial attributes.
+
+        Yields:
+            The span, so the block can add attributes as it learns them.
+        """
+        span = Span(name, dict(attrs), started_at=time.time())
+        if not self.enabled:
+            yield span
+            return
+
+        parent = _current.get()
+        token = _current.set(span) if activate else None
+        rss, peak = _rss_bytes(), _peak_rss_bytes()
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield span
+        except BaseException as exc:
+            span.error = f"{type(exc).__name__}: {exc}"
+            raise
+        finally:
+            span.wall_seconds = time.perf_counter() - wall
+            # Process-wide: includes worker threads the stage started.
+            span.cpu_seconds = time.process_time() - cpu
+            span.rss_delta_bytes = _rss_bytes() - rss
+            span.peak_rss_delta_bytes = _peak_rss_bytes() - peak
+            if token is not None:
+                _current.reset(token)
+            self._finish(span, parent)
+
+    def _finish(self, span: Span, parent: Span | None) -> None:
+        with self._lock:
+            if parent is not None:
+                parent.children.append(span)
+            else:
+                self._traces.append(span)
+
+            totals = self._totals.setdefault(
+                span.name,
+                {
+                    "count": 0,
+                    "errors": 0,
+                    "wall_seconds": 0.0,
+                    "cpu_seconds": 0.0,
+                    "max_peak_rss_delta_bytes": 0,
+                    "cache_hits": 0,
+                    "cache_misses": 0,
+                    "rows": 0,
+                    "prompt_chars": 0,
+                    "response_chars": 0,
+                },
+            )
+            totals["count"] += 1
+            totals["errors"] += span.error is not None
+            totals["wall_seconds"] += span.wall_seconds
+            totals["cpu_seconds"] += span.cpu_seconds
+            totals["max_peak_rss_delta_bytes"] = max(
+                totals["max_peak_rss_delta_bytes"], span.peak_rss_delta_bytes
+            )
+            if "cache_hit" in span.attrs:
+                totals["cache_hits" if span.attrs["cache_hit"] else "cache_misses"] += 1
+            for key in ("rows", "prompt_chars", "response_chars"):
+                value = span.attrs.get(key)
+                if isinstance(value, (int, float)):
+                    totals[key] += value
+
+        logger.debug(
+            "span %s: %.1f ms wall, %.1f ms cpu %s",
+            span.name,
+            span.wall_seconds * 1000,
+            span.cpu_seconds * 1000,
+            span.attrs,
+        )
+
+    def traces(self) -> List[Span]:
+        """Finished root spans, oldest first."""
+        with self._lock:
+            return list(self._traces)
+
+    def totals(self) -> Dict[str, Dict[str, float]]:
+        """Per-stage aggregates since start (or the last :meth:`reset`)."""
+        with self._lock:
+            return {name: dict(values) for name, values in self._totals.items()}
+
+    def reset(self) -> None:
+        """Drop recorded traces and totals."""
+        with self._lock:
+            self._traces.clear()
+            self._totals.clear()
+
+    def to_json(self, indent: int | None = 2) -> str:
+        """Recent traces and per-stage totals as a JSON document."""
+        return json.dumps(
+            {
+                "traces": [span.to_dict() for span in self.traces()],
+                "totals": self.totals(),
+            },
+            indent=indent,
+            default=str,
+        )
+
+    def to_prometheus(self) -> str:
+        """Per-stage totals in the Prometheus text exposition format."""
+        metrics = (
+            ("spans", "counter", "count", "Finished spans."),
+            ("span_errors", "counter", "errors", "Spans that raised."),
+            ("span_wall_seconds", "counter", "wall_seconds", "Wall-clock time in the stage."),
+            ("span_cpu_seconds", "counter", "cpu_seconds", "Process CPU time in the stage."),
+            (
+                "span_peak_rss_delta_bytes",
+                "gauge",
+                "max_peak_rss_delta_bytes",
+                "Largest growth of peak RSS during one span.",
+            ),
+            ("span_cache_hits", "counter", "cache_hits", "Spans served from a cache."),
+            ("span_cache_misses", "counter", "cache_misses", "Spans that missed a cache."),
+            ("span_rows", "counter", "rows", "Rows processed."),
+            ("span_prompt_chars", "counter", "prompt_chars", "Prompt characters sent."),
+            ("span_response_chars", "counter", "response_chars", "Response characters received."),
+        )
+        totals = self.totals()
+        lines: List[str] = []
+        for metric, kind, key, help_text in metrics:
+            name = f"{METRIC_PREFIX}_{metric}"
+            if kind == "counter":
+                name += "_total"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for stage, values in sorted(totals.items()):
+                label = stage.replace("\\", "\\\\").replace('"', '\\"')
+                lines.append(f'{name}{{span="{label}"}} {values[key]:g}')
+        return "\n".join(lines) + "\n"
+
+
+_tracer = Tracer()
+
+
+def get_tracer() -> Tracer:
+    """Return the process-wide tracer."""
+    return _tracer
+
+
+def span(name: str, activate: bool = True, **attrs: Any):
+    """Shortcut for ``get_tracer().span(...)``."""
+    return _tracer.span(name, activate=activate, **attrs)
+
+
+def current_span() -> Span | None:
+    """The innermost running span in this context, if any."""
+    return _current.get()
+
+
+def annotate(**attrs: Any) -> None:
+    """Add attributes to the current span (no-op outside a span)."""
+    active = _current.get()
+    if active is not None:
+        active.set(**attrs)
+
+
+def bind_span(target: Span, fn: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Wrap ``fn`` so it runs with ``target`` as the current span, e.g. on a
+    pool thread that does not inherit the caller's context.
+    """
+
+    @functools.wraps(fn)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        token = _current.set(target)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _current.reset(token)
+
+    return wrapper
+
+
+def traced(name: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Decorator running the function inside a span called ``name``."""
+
+    def decorator(fn: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with _tracer.span(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -1,101 +1,573 @@
 """
 Visualization pipeline using matplotlib / seaborn.
 Returns matplotlib Figure objects so UI layers can decide how to render them.
+
+The ``lazy_*`` variants return LazyFigure handles instead: nothing is drawn
+until a UI section asks for the image, and the figure is rendered once to PNG
+bytes and then discarded. Handles never hold the DataFrame; it is passed to
+``png()`` at render time, so a cached handle does not keep the frame alive.
+
+Columns longer than LARGE_DATA_ROWS are drawn from precomputed aggregates
+(numpy bin counts, a KDE fitted on a bounded reservoir sample, box statistics)
+instead of handing every raw point to seaborn.
 """
 
 from __future__ import annotations
 
+import io
 import logging
-from typing import List, Dict
+import threading
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Tuple, Union
 
-import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
-import seaborn as sns
+
+from pipeline.correlation import CorrelationResult, compute_correlations
+from pipeline.sketches import QuantileSketch, top_values
+
+# matplotlib and seaborn are imported when a chart is actually drawn, so
+# building LazyFigure handles does not pay their import cost.
+if TYPE_CHECKING:
+    from matplotlib.figure import Figure
 
 logger = logging.getLogger(__name__)
 
+LARGE_DATA_ROWS = 1_000_000
+DEFAULT_BINS = 50
+KDE_SAMPLE_SIZE = 10_000
+KDE_GRID_POINTS = 256
+MAX_FLIERS = 500
+
+ArrayOrChunks = Union[np.ndarray, pd.Series, Iterable[np.ndarray]]
+
+
+@dataclass
+class HistogramAggregate:
+    """Precomputed histogram bins plus a KDE curve scaled to bin counts."""
+
+    edges: np.ndarray
+    counts: np.ndarray
+    kde_x: np.ndarray
+    kde_y: np.ndarray
+
+
+class LazyFigure:
+    """
+    A chart that is only drawn when first requested.
+
+    The builder receives a fresh ``Figure`` (not registered with pyplot, so
+    no global state accumulates) and the source frame, the result is
+    rasterized to PNG bytes and the figure is dropped. ``kind`` and ``column``
+    describe per-column charts so that ``render_scheduler.prerender`` can draw
+    them on a process pool.
+    """
+
+    def __init__(
+        self,
+        builder: Callable[[Figure, pd.DataFrame | None], None],
+        figsize: tuple = (6, 4),
+        kind: str | None = None,
+        column: str | None = None,
+        needs_frame: bool = True,
+    ) -> None:
+        self._builder = builder
+        self._figsize = figsize
+        self.kind = kind
+        self.column = column
+        self.needs_frame = needs_frame
+        self._png: bytes | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def rendered(self) -> bool:
+        """Whether the PNG has already been produced."""
+        return self._png is not None
+
+    def png(self, df: pd.DataFrame | None = None) -> bytes:
+        """
+        Render (once) and return the chart as PNG bytes.
+
+        Args:
+            df: Frame the chart is drawn from; only needed for the first render.
+
+        Raises:
+            ValueError: If the chart is not rendered yet and needs ``df``.
+        """
+        with self._lock:
+            if self._png is None:
+                if df is None and self.needs_frame:
+                    raise ValueError(
+                        f"{self.kind or 'chart'} for {self.column!r} needs the frame to render"
+                    )
+                from matplotlib.figure import Figure
+
+                fig = Figure(figsize=self._figsize)
+                self._builder(fig, df)
+                self._png = figure_to_png(fig)
+            return self._png
+
+    def prime(self, png: bytes) -> None:
+        """Store PNG bytes rendered elsewhere so the builder never runs."""
+        with self._lock:
+            if self._png is None:
+                self._png = png
+
+    def __sizeof__(self) -> int:
+        return object.__sizeof__(self) + (len(self._png) if self._png else 0)
+
+
+def figure_to_png(fig: Figure, dpi: int = 100) -> bytes:
+    """
+    Rasterize a figure to PNG bytes and close it.
+
+    Args:
+        fig: Figure to render.
+        dpi: Output resolution.
+
+    Returns:
+        PNG image bytes.
+    """
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", dpi=dpi, bbox_inches="tight")
+    if getattr(fig.canvas, "manager", None) is not None:
+        # Only figures created through pyplot are registered with it.
+        import matplotlib.pyplot as plt
+
+        plt.close(fig)
+    return buffer.getvalue()
+
+
+def _as_chunks(values: ArrayOrChunks) -> Iterable[np.ndarray]:
+    """Yield float64 arrays from either one array-like or an iterable of chunks."""
+    if isinstance(values, (np.ndarray, pd.Series)):
+        values = [values]
+    for chunk in values:
+        arr = np.asarray(
+            chunk.to_numpy(dtype="float64", na_value=np.nan)
+            if isinstance(chunk, pd.Series)
+            else chunk,
+            dtype="float64",
+        )
+        yield arr[np.isfinite(arr)]
+
+
+def _reservoir_update(
+    reservoir: np.ndarray,
+    seen: int,
+    chunk: np.ndarray,
+    size: int,
+    rng: np.random.Generator,
+) -> Tuple[np.ndarray, int]:
+    """Vectorized reservoir sampling (Algorithm R) over one chunk."""
+    if reservoir.size < size:
+        take = min(size - reservoir.size, chunk.size)
+        reservoir = np.concatenate([reservoir, chunk[:take]])
+        seen += take
+        chunk = chunk[take:]
+    if chunk.size:
+        slots = rng.integers(0, seen + np.arange(1, chunk.size + 1))
+        hit = slots < size
+        reservoir[slots[hit]] = chunk[hit]
+        seen += chunk.size
+    return reservoir, seen
+
+
+def compute_histogram(
+    values: ArrayOrChunks,
+    bins: int = DEFAULT_BINS,
+    value_range: Tuple[float, float] | None = None,
+    kde_sample_size: int = KDE_SAMPLE_SIZE,
+    seed: int = 0,
+) -> HistogramAggregate:
+    """
+    Compute histogram bins and a sampled KDE without keeping raw points.
+
+    Args:
+        values: One array/Series, or an iterable of chunks for streaming.
+        bins: Number of equal-width bins.
+        value_range: (min, max) of the data. Required when streaming chunks
+            (e.g. from DatasetStats); derived from the data otherwise.
+        kde_sample_size: Size of the reservoir sample the KDE is fitted on.
+        seed: Random seed for the reservoir.
+
+    Returns:
+        HistogramAggregate ready for drawing.
+    """
+    if value_range is None:
+        if not isinstance(values, (np.ndarray, pd.Series)):
+            raise ValueError("value_range is required when streaming chunks.")
+        finite = next(iter(_as_chunks(values)))
+        value_range = (float(finite.min()), float(finite.max())) if finite.size else (0.0, 1.0)
+
+    lo, hi = value_range
+    if lo == hi:
+        lo, hi = lo - 0.5, hi + 0.5
+    edges = np.linspace(lo, hi, bins + 1)
+    counts = np.zeros(bins, dtype="int64")
+
+    rng = np.random.default_rng(seed)
+    reservoir = np.empty(0)
+    seen = 0
+    for chunk in _as_chunks(values):
+        counts += np.histogram(chunk, bins=edges)[0]
+        reservoir, seen = _reservoir_update(reservoir, seen, chunk, kde_sample_size, rng)
+
+    kde_x = np.linspace(lo, hi, KDE_GRID_POINTS)
+    kde_y = np.zeros_like(kde_x)
+    if reservoir.size > 1 and reservoir.std() > 0:
+        # Gaussian KDE with Scott's bandwidth, scaled to histogram counts.
+        bandwidth = reservoir.std(ddof=1) * reservoir.size ** (-1 / 5)
+        z = (kde_x[:, None] - reservoir[None, :]) / bandwidth
+        density = np.exp(-0.5 * z * z).sum(axis=1) / (reservoir.size * bandwidth * np.sqrt(2 * np.pi))
+        kde_y = density * counts.sum() * (edges[1] - edges[0])
+
+    return HistogramAggregate(edges=edges, counts=counts, kde_x=kde_x, kde_y=kde_y)
+
+
+def compute_box_stats(
+    values: ArrayOrChunks,
+    label: str = "",
+    whis: float = 1.5,
+    max_fliers: int = MAX_FLIERS,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """
+    Compute quartiles, whiskers and a bounded set of fliers for ``Axes.bxp``.
+
+    A single array is summarized exactly. Chunked input is summarized in one
+    streaming pass: quartiles come from a quantile sketch, whiskers are the
+    Tukey fences clipped to the data range and fliers are drawn from a
+    reservoir sample.
+
+    Args:
+        values: One array/Series, or an iterable of chunks for streaming.
+        label: Box label.
+        whis: Whisker reach in IQRs.
+        max_fliers: Maximum outlier points kept for drawing.
+        seed: Random seed for flier sampling.
+
+    Returns:
+        A stats dict accepted by ``matplotlib.axes.Axes.bxp``.
+    """
+    rng = np.random.default_rng(seed)
+
+    if isinstance(values, (np.ndarray, pd.Series)):
+        data = next(iter(_as_chunks(values)))
+        if not data.size:
+            data = np.array([np.nan])
+        q1, med, q3 = np.percentile(data, [25, 50, 75])
+        iqr = q3 - q1
+        inside = data[(data >= q1 - whis * iqr) & (data <= q3 + whis * iqr)]
+        whislo = float(inside.min()) if inside.size else float(q1)
+        whishi = float(inside.max()) if inside.size else float(q3)
+        fliers = data[(data < whislo) | (data > whishi)]
+    else:
+        sketch = QuantileSketch()
+        reservoir = np.empty(0)
+        seen = 0
+        data_min, data_max = np.inf, -np.inf
+        for chunk in _as_chunks(values):
+            if not chunk.size:
+                continue
+            sketch.update(chunk)
+            data_min = min(data_min, float(chunk.min()))
+            data_max = max(data_max, float(chunk.max()))
+            reservoir, seen = _reservoir_update(reservoir, seen, chunk, KDE_SAMPLE_SIZE, rng)
+        q1, med, q3 = sketch.quantiles([0.25, 0.5, 0.75])
+        iqr = q3 - q1
+        whislo = max(data_min, q1 - whis * iqr)
+        whishi = min(data_max, q3 + whis * iqr)
+        fliers = reservoir[(reservoir < whislo) | (reservoir > whishi)]
+
+    if fliers.size > max_fliers:
+        fliers = rng.choice(fliers, size=max_fliers, replace=False)
+
+    return {
+        "label": label,
+        "q1": float(q1),
+        "med": float(med),
+        "q3": float(q3),
+        "whislo": float(whislo),
+        "whishi": float(whishi),
+        "fliers": fliers,
+    }
+
+
+def _draw_histogram_aggregate(fig: Figure, agg: HistogramAggregate, col: str) -> None:
+    ax = fig.subplots()
+    ax.bar(agg.edges[:-1], agg.counts, width=np.diff(agg.edges), align="edge", alpha=0.6)
+    ax.plot(agg.kde_x, agg.kde_y)
+    ax.set_title(f"Histogram of {col}")
+    ax.set_xlabel(col)
+    ax.set_ylabel("Frequency")
 
-def create_histograms(df: pd.DataFrame, numeric_cols: List[str]) -> Dict[str, plt.Figure]:
+
+def _draw_box_stats(fig: Figure, stats: Dict[str, Any], col: str) -> None:
+    ax = fig.subplots()
+    try:
+        ax.bxp([stats], orientation="horizontal")
+    except TypeError:  # matplotlib < 3.10
+        ax.bxp([stats], vert=False)
+    ax.set_yticks([])
+    ax.set_xlabel(col)
+    ax.set_title(f"Boxplot of {col}")
+
+
+def _draw_histogram(fig: Figure, series: pd.Series, col: str) -> None:
+    if len(series) > LARGE_DATA_ROWS:
+        _draw_histogram_aggregate(fig, compute_histogram(series), col)
+        return
+
+    import seaborn as sns
+
+    ax = fig.subplots()
+    sns.histplot(series.dropna(), kde=True, ax=ax)
+    ax.set_title(f"Histogram of {col}")
+    ax.set_xlabel(col)
+    ax.set_ylabel("Frequency")
+
+
+def _draw_boxplot(fig: Figure, series: pd.Series, col: str) -> None:
+    if len(series) > LARGE_DATA_ROWS:
+        _draw_box_stats(fig, compute_box_stats(series), col)
+        return
+
+    import seaborn as sns
+
+    ax = fig.subplots()
+    sns.boxplot(x=series.dropna(), ax=ax)
+    ax.set_title(f"Boxplot of {col}")
+
+
+def _draw_correlation_heatmap(fig: Figure, result: CorrelationResult) -> None:
+    import seaborn as sns
+
+    ax = fig.subplots()
+    sns.heatmap(result.heatmap_frame(), annot=False, cmap="coolwarm", vmin=-1, vmax=1, ax=ax)
+    shown, total = len(result.heatmap_columns), len(result.columns)
+    if shown < total:
+        ax.set_title(f"Correlation Heatmap (top {shown} of {total} columns)")
+    else:
+        ax.set_title("Correlation Heatmap")
+
+
+def top_category_counts(series: pd.Series, top_n: int = 10) -> pd.DataFrame:
+    """
+    Top-N value counts via the bounded-memory heavy-hitter engine.
+
+    Returns:
+        DataFrame indexed by value with ``count`` (upper bound) and ``error``
+        (maximum overestimate) columns, most frequent first.
+    """
+    top = top_values(series, top_n=top_n)
+    return pd.DataFrame(
+        [(count, error) for _, count, error in top],
+        index=[str(value) for value, _, _ in top],
+        columns=["count", "error"],
+    )
+
+
+def _draw_categorical_bars(fig: Figure, counts: pd.DataFrame, col: str, top_n: int) -> None:
+    ax = fig.subplots()
+    positions = np.arange(len(counts))
+    ax.bar(positions, counts["count"])
+    if counts["error"].any():
+        # True counts lie in [count - error, count].
+        ax.errorbar(
+            positions,
+            counts["count"],
+            yerr=[counts["error"], np.zeros(len(counts))],
+            fmt="none",
+            ecolor="black",
+            capsize=3,
+        )
+    ax.set_xticks(positions)
+    ax.set_xticklabels(counts.index, rotation=90)
+    ax.set_title(f"Top {top_n} categories in {col}")
+    ax.set_xlabel(col)
+    ax.set_ylabel("Count")
+
+
+def create_histograms(df: pd.DataFrame, numeric_cols: List[str]) -> Dict[str, Figure]:
     """
     Create histogram plots for each numeric column.
 
     Returns:
         Mapping from column name to matplotlib Figure.
     """
-    figures: Dict[str, plt.Figure] = {}
+    import matplotlib.pyplot as plt
+
+    figures: Dict[str, Figure] = {}
 
     for col in numeric_cols:
-        fig, ax = plt.subplots(figsize=(6, 4))
-        sns.histplot(df[col].dropna(), kde=True, ax=ax)
-        ax.set_title(f"Histogram of {col}")
-        ax.set_xlabel(col)
-        ax.set_ylabel("Frequency")
+        fig = plt.figure(figsize=(6, 4))
+        _draw_histogram(fig, df[col], col)
         figures[col] = fig
 
     logger.info("Created %d histogram plots.", len(figures))
     return figures
 
 
-def create_boxplots(df: pd.DataFrame, numeric_cols: List[str]) -> Dict[str, plt.Figure]:
+def create_boxplots(df: pd.DataFrame, numeric_cols: List[str]) -> Dict[str, Figure]:
     """
     Create boxplots for numeric columns.
 
     Returns:
         Mapping from column name to matplotlib Figure.
     """
-    figures: Dict[str, plt.Figure] = {}
+    import matplotlib.pyplot as plt
+
+    figures: Dict[str, Figure] = {}
 
     for col in numeric_cols:
-        fig, ax = plt.subplots(figsize=(6, 2.5))
-        sns.boxplot(x=df[col].dropna(), ax=ax)
-        ax.set_title(f"Boxplot of {col}")
+        fig = plt.figure(figsize=(6, 2.5))
+        _draw_boxplot(fig, df[col], col)
         figures[col] = fig
 
     logger.info("Created %d boxplot plots.", len(figures))
     return figures
 
 
-def create_correlation_heatmap(df: pd.DataFrame, numeric_cols: List[str]) -> plt.Figure | None:
+def create_correlation_heatmap(
+    df: pd.DataFrame,
+    numeric_cols: List[str],
+    correlations: CorrelationResult | None = None,
+) -> Figure | None:
     """
     Create a correlation heatmap using numeric columns.
 
+    On wide frames only the most connected columns are shown, in clustered
+    order (see ``correlation.compute_correlations``).
+
+    Args:
+        df: Input DataFrame.
+        numeric_cols: Numeric columns to correlate.
+        correlations: Optional precomputed result to reuse.
+
     Returns:
         A matplotlib Figure or None if not enough numeric columns.
     """
+    import matplotlib.pyplot as plt
+
     if len(numeric_cols) < 2:
         logger.info("Not enough numeric columns for correlation heatmap.")
         return None
 
-    corr = df[numeric_cols].corr()
+    corr = correlations or compute_correlations(df, numeric_cols)
+    if corr is None:
+        return None
 
-    fig, ax = plt.subplots(figsize=(8, 6))
-    sns.heatmap(corr, annot=False, cmap="coolwarm", ax=ax)
-    ax.set_title("Correlation Heatmap")
+    fig = plt.figure(figsize=(8, 6))
+    _draw_correlation_heatmap(fig, corr)
 
     logger.info("Created correlation heatmap.")
     return fig
 
 
-def create_categorical_bars(df: pd.DataFrame, categorical_cols: List[str], top_n: int = 10) -> Dict[str, plt.Figure]:
+def create_categorical_bars(df: pd.DataFrame, categorical_cols: List[str], top_n: int = 10) -> Dict[str, Figure]:
     """
     Create bar charts for categorical variables (top N categories).
 
     Returns:
         Mapping from column name to matplotlib Figure.
     """
-    figures: Dict[str, plt.Figure] = {}
+    import matplotlib.pyplot as plt
+
+    figures: Dict[str, Figure] = {}
 
     for col in categorical_cols:
-        value_counts = df[col].value_counts().head(top_n)
+        counts = top_category_counts(df[col], top_n)
 
-        fig, ax = plt.subplots(figsize=(6, 4))
-        value_counts.plot(kind="bar", ax=ax)
-        ax.set_title(f"Top {top_n} categories in {col}")
-        ax.set_xlabel(col)
-        ax.set_ylabel("Count")
+        fig = plt.figure(figsize=(6, 4))
+        _draw_categorical_bars(fig, counts, col, top_n)
         figures[col] = fig
 
     logger.info("Created %d categorical bar plots.", len(figures))
     return figures
 
+
+def lazy_histograms(numeric_cols: List[str]) -> Dict[str, LazyFigure]:
+    """
+    Deferred histogram for each numeric column.
+
+    Returns:
+        Mapping from column name to LazyFigure.
+    """
+    return {
+        col: LazyFigure(
+            lambda fig, df, col=col: _draw_histogram(fig, df[col], col),
+            figsize=(6, 4),
+            kind="histogram",
+            column=col,
+        )
+        for col in numeric_cols
+    }
+
+
+def lazy_boxplots(numeric_cols: List[str]) -> Dict[str, LazyFigure]:
+    """
+    Deferred boxplot for each numeric column.
+
+    Returns:
+        Mapping from column name to LazyFigure.
+    """
+    return {
+        col: LazyFigure(
+            lambda fig, df, col=col: _draw_boxplot(fig, df[col], col),
+            figsize=(6, 2.5),
+            kind="boxplot",
+            column=col,
+        )
+        for col in numeric_cols
+    }
+
+
+def lazy_correlation_heatmap(
+    numeric_cols: List[str],
+    correlations: CorrelationResult | None = None,
+) -> LazyFigure | None:
+    """
+    Deferred correlation heatmap; unless ``correlations`` is given, the
+    correlations are also computed lazily from the frame passed to ``png()``.
+
+    Returns:
+        A LazyFigure or None if not enough numeric columns.
+    """
+    if len(numeric_cols) < 2:
+        logger.info("Not enough numeric columns for correlation heatmap.")
+        return None
+
+    def build(fig: Figure, df: pd.DataFrame | None) -> None:
+        corr = correlations or compute_correlations(df, numeric_cols)
+        if corr is None:
+            ax = fig.subplots()
+            ax.text(0.5, 0.5, "No non-constant numeric columns", ha="center", va="center")
+            ax.set_axis_off()
+            return
+        _draw_correlation_heatmap(fig, corr)
+
+    return LazyFigure(build, figsize=(8, 6), needs_frame=correlations is None)
+
+
+def lazy_categorical_bars(
+    categorical_cols: List[str],
+    top_n: int = 10,
+) -> Dict[str, LazyFigure]:
+    """
+    Deferred top-N bar chart for each categorical column.
+
+    Returns:
+        Mapping from column name to LazyFigure.
+    """
+    return {
+        col: LazyFigure(
+            lambda fig, df, col=col: _draw_categorical_bars(
+                fig, top_category_counts(df[col], top_n), col, top_n
+            ),
+            figsize=(6, 4),
+            kind="bar",
+            column=col,
+        )
+        for col in categorical_cols
+    }